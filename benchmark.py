@@ -0,0 +1,242 @@
+import argparse
+import itertools
+import json
+import multiprocessing
+import platform
+import queue as queue_module
+import resource
+import subprocess
+import sys
+import time
+import traceback
+from datetime import datetime, timezone
+
+from main import build_simulation
+from simulation.run_config import RunConfig
+
+MAP_SIZES = [(1100, 700), (2200, 1400), (4400, 2800)]
+FLEET_SIZES = [16, 64, 256, 1000, 5000]
+INTENSITIES = [1.0, 4.0]
+MODES = ["reactive", "intelligent"]
+
+QUICK_MAP_SIZES = [(1100, 700)]
+QUICK_FLEET_SIZES = [16, 64]
+QUICK_INTENSITIES = [1.0]
+
+
+def _percentile(sorted_values: list[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(q * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS reports bytes.
+    return peak / (1024.0 * 1024.0) if sys.platform == "darwin" else peak / 1024.0
+
+
+def config_key(case: dict) -> str:
+    return f"{case['mode']}|{case['width']}x{case['height']}|n={case['patrol_count']}|i={case['intensity']}"
+
+
+def run_case(case: dict, ticks: int, max_seconds: float, seed: int) -> dict:
+    config = RunConfig(
+        mode=case["mode"],
+        seed=seed,
+        ticks=ticks,
+        width=case["width"],
+        height=case["height"],
+        patrol_count=case["patrol_count"],
+        sue={"intensity_scale": case["intensity"]},
+    )
+    build_start = time.perf_counter()
+    world, predictor, dispatcher, sue = build_simulation(config)
+    build_seconds = time.perf_counter() - build_start
+
+    latencies: list[float] = []
+    truncated = False
+    run_start = time.perf_counter()
+    for tick in range(1, ticks + 1):
+        start = time.perf_counter()
+        world.step(tick, 1.0, predictor, dispatcher, sue=sue)
+        latencies.append(time.perf_counter() - start)
+        if time.perf_counter() - run_start > max_seconds:
+            truncated = tick < ticks
+            break
+    elapsed = sum(latencies)
+
+    ordered = sorted(latencies)
+    return {
+        **case,
+        "key": config_key(case),
+        "ticks": len(latencies),
+        "truncated": truncated,
+        "build_seconds": build_seconds,
+        "ticks_per_sec": (len(latencies) / elapsed) if elapsed > 0 else 0.0,
+        "latency_ms_p50": _percentile(ordered, 0.50) * 1000.0,
+        "latency_ms_p90": _percentile(ordered, 0.90) * 1000.0,
+        "latency_ms_p99": _percentile(ordered, 0.99) * 1000.0,
+        "latency_ms_max": (ordered[-1] * 1000.0) if ordered else 0.0,
+        "peak_rss_mb": _peak_rss_mb(),
+        "incidents_total": world.metrics_engine.incidents_total,
+    }
+
+
+def failed_case(case: dict, error: str) -> dict:
+    # Same columns as run_case, so reports and --compare keep working; ticks=0 is never compared.
+    return {
+        **case,
+        "key": config_key(case),
+        "ticks": 0,
+        "truncated": False,
+        "failed": True,
+        "error": error,
+        "build_seconds": 0.0,
+        "ticks_per_sec": 0.0,
+        "latency_ms_p50": 0.0,
+        "latency_ms_p90": 0.0,
+        "latency_ms_p99": 0.0,
+        "latency_ms_max": 0.0,
+        "peak_rss_mb": 0.0,
+        "incidents_total": 0,
+    }
+
+
+def _case_worker(queue, case, ticks, max_seconds, seed) -> None:
+    try:
+        result = run_case(case, ticks, max_seconds, seed)
+    except BaseException:
+        result = failed_case(case, traceback.format_exc())
+    queue.put(result)
+
+
+def run_isolated(case: dict, ticks: int, max_seconds: float, seed: int, case_timeout: float | None = None) -> dict:
+    # A fresh interpreter per case so peak RSS belongs to that configuration only. The child can
+    # die without reporting (OOM killer, signal), so the parent polls instead of blocking.
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    process = ctx.Process(target=_case_worker, args=(queue, case, ticks, max_seconds, seed))
+    process.start()
+    deadline = None if case_timeout is None else time.monotonic() + case_timeout
+    result = None
+    while result is None:
+        try:
+            result = queue.get(timeout=1.0)
+        except queue_module.Empty:
+            if process.exitcode is not None:
+                # A result put right before exiting may still be in the pipe.
+                try:
+                    result = queue.get(timeout=1.0)
+                except queue_module.Empty:
+                    result = failed_case(case, f"el proceso termino con codigo {process.exitcode} sin informar resultado")
+            elif deadline is not None and time.monotonic() > deadline:
+                process.terminate()
+                result = failed_case(case, f"sin resultado tras {case_timeout:.0f}s")
+    process.join()
+    return result
+
+
+def build_matrix(quick: bool, fleets: list[int] | None, modes: list[str]) -> list[dict]:
+    map_sizes = QUICK_MAP_SIZES if quick else MAP_SIZES
+    fleet_sizes = fleets or (QUICK_FLEET_SIZES if quick else FLEET_SIZES)
+    intensities = QUICK_INTENSITIES if quick else INTENSITIES
+    return [
+        {"mode": mode, "width": width, "height": height, "patrol_count": fleet, "intensity": intensity}
+        for (width, height), fleet, intensity, mode in itertools.product(map_sizes, fleet_sizes, intensities, modes)
+    ]
+
+
+def _git_revision() -> str | None:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list[str]:
+    regressions: list[str] = []
+    previous = {row["key"]: row for row in baseline.get("results", [])}
+    for row in current["results"]:
+        old = previous.get(row["key"])
+        if old is None or old["ticks"] == 0 or row["ticks"] == 0 or row.get("failed"):
+            continue
+        speed_ratio = row["ticks_per_sec"] / old["ticks_per_sec"] if old["ticks_per_sec"] else 1.0
+        p99_ratio = row["latency_ms_p99"] / old["latency_ms_p99"] if old["latency_ms_p99"] else 1.0
+        status = "ok"
+        if speed_ratio < 1.0 - threshold or p99_ratio > 1.0 + threshold:
+            status = "REGRESSION"
+            regressions.append(row["key"])
+        print(f"{status:<10} {row['key']:<48} ticks/s x{speed_ratio:.2f}  p99 x{p99_ratio:.2f}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de escalamiento de World.step")
+    parser.add_argument("--quick", action="store_true", help="matriz reducida para iterar rapido")
+    parser.add_argument("--fleet", type=int, action="append", default=None)
+    parser.add_argument("--mode", choices=MODES, action="append", default=None)
+    parser.add_argument("--ticks", type=int, default=120)
+    parser.add_argument("--max-seconds", type=float, default=60.0, help="tope de tiempo por configuracion")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", type=str, default="bench_results.json")
+    parser.add_argument("--compare", type=str, default=None, help="resultado previo contra el cual comparar")
+    parser.add_argument("--threshold", type=float, default=0.10, help="degradacion relativa tolerada")
+    parser.add_argument("--in-process", action="store_true", help="no aislar cada caso en su propio proceso")
+    parser.add_argument("--case-timeout", type=float, default=None, help="tope de tiempo real por caso aislado, construccion incluida")
+    args = parser.parse_args()
+
+    cases = build_matrix(args.quick, args.fleet, args.mode or MODES)
+    if args.in_process:
+        print("--in-process: sin columna rss, el pico de memoria del proceso mezcla todos los casos")
+    results = []
+    for case in cases:
+        if args.in_process:
+            row = run_case(case, args.ticks, args.max_seconds, args.seed)
+            # ru_maxrss is a process-wide high-water mark, not this case's peak.
+            row["peak_rss_mb"] = None
+        else:
+            row = run_isolated(case, args.ticks, args.max_seconds, args.seed, args.case_timeout)
+        results.append(row)
+        if row.get("failed"):
+            print(f"{row['key']:<48} FALLO: {row['error'].strip().splitlines()[-1]}", flush=True)
+            continue
+        flag = " (truncated)" if row["truncated"] else ""
+        rss = "" if row["peak_rss_mb"] is None else f"  rss {row['peak_rss_mb']:7.1f}MB"
+        print(
+            f"{row['key']:<48} {row['ticks_per_sec']:9.1f} ticks/s  "
+            f"p50 {row['latency_ms_p50']:8.2f}ms  p99 {row['latency_ms_p99']:8.2f}ms{rss}{flag}"
+        )
+
+    report = {
+        "meta": {
+            "revision": _git_revision(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "ticks": args.ticks,
+            "seed": args.seed,
+            "in_process": args.in_process,
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    failed = [row["key"] for row in results if row.get("failed")]
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} configuraciones empeoraron mas de {args.threshold:.0%}")
+            sys.exit(1)
+    if failed:
+        print(f"{len(failed)} configuraciones fallaron: {', '.join(failed)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,21 @@
-import subprocess
+import argparse
 import csv
 
-RUNS = 30   # numero de simulaciones por modo
-
-def run(mode, seed):
-    cmd = [
-        "python",
-        "main.py",
-        "--mode", mode,
-        "--seed", str(seed),
-    ]
+from main import run_headless
+from result_cache import ResultCache
+from simulation.run_config import RunConfig
 
-    result = subprocess.run(cmd, capture_output=True, text=True)
+RUNS = 30   # numero de simulaciones por modo
 
-    lines = result.stdout.strip().split("\n")
-    header = lines[-2]
-    data = lines[-1]
+def run(mode, seed, cache=None):
+    config = RunConfig(mode=mode, seed=seed)
 
-    return header, data
+    if cache is None:
+        return run_headless(config)
+    return cache.get_or_run(config, run_headless)
 
 
-def run_all(mode):
+def run_all(mode, cache=None):
     filename = f"results_{mode}.csv"
 
     with open(filename, "w", newline="") as f:
@@ -29,15 +24,20 @@ def run_all(mode):
         for seed in range(RUNS):
             print(f"{mode} seed {seed}")
 
-            header, data = run(mode, seed)
+            metrics = run(mode, seed, cache)
 
             if writer is None:
                 writer = csv.writer(f)
-                writer.writerow(header.split(","))
+                writer.writerow(metrics.keys())
 
-            writer.writerow(data.split(","))
+            writer.writerow(metrics.values())
 
 
 if __name__ == "__main__":
-    run_all("reactive")
-    run_all("intelligent")
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--no-cache", action="store_true")
+    args = parser.parse_args()
+
+    cache = None if args.no_cache else ResultCache()
+    run_all("reactive", cache)
+    run_all("intelligent", cache)
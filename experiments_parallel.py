@@ -1,58 +1,103 @@
-import subprocess
+import argparse
 import csv
+import json
 from multiprocessing import Pool, cpu_count
 
+from main import simulate, simulate_ensemble
+from result_cache import ResultCache, source_fingerprint
+from simulation.quantile_sketch import ResponseTimeSketches
+from simulation.run_config import RunConfig
+
 RUNS = 30
 TICKS = 3600
 
 
 def run_single(args):
     mode, seed = args
+    world = simulate(RunConfig(mode=mode, seed=seed, ticks=TICKS))
+    return world.metrics_engine.snapshot(), world.metrics_engine.response_sketches.to_dict()
 
-    cmd = [
-        "python",
-        "main.py",
-        "--mode", mode,
-        "--seed", str(seed),
-        "--ticks", str(TICKS),
-        "--headless",
-    ]
-
-    result = subprocess.run(cmd, capture_output=True, text=True)
-
-    lines = result.stdout.strip().split("\n")
 
-    header = lines[-2]
-    data = lines[-1]
+def run_ensemble(configs):
+    # All seeds in one process, advanced in lockstep; SUE, risk and coverage are batched.
+    worlds = simulate_ensemble(configs)
+    return [(world.metrics_engine.snapshot(), world.metrics_engine.response_sketches.to_dict()) for world in worlds]
 
-    return header, data
 
-
-def run_all(mode):
+def run_all(mode, cache=None, ensemble=False):
     filename = f"results_{mode}.csv"
 
-    tasks = [(mode, seed) for seed in range(RUNS)]
+    configs = [RunConfig(mode=mode, seed=seed, ticks=TICKS) for seed in range(RUNS)]
+    results = {}
+    sketches = {}
+    pending = []
+    for config in configs:
+        cached = cache.get_entry(config) if cache is not None else None
+        if cached is None or "response_sketches" not in cached.get("extras", {}):
+            pending.append(config)
+        else:
+            results[config.seed] = cached["metrics"]
+            sketches[config.seed] = cached["extras"]["response_sketches"]
 
     workers = max(1, cpu_count() - 1)
 
-    print(f"\nRunning {mode} with {workers} parallel processes...\n")
-
-    with Pool(workers) as pool:
-        results = pool.map(run_single, tasks)
+    engine = "ensemble" if ensemble else f"{workers} parallel processes"
+    print(f"\nRunning {mode} with {engine} ({len(results)} cached, {len(pending)} to simulate)...\n")
+
+    if pending:
+        if ensemble:
+            computed = run_ensemble(pending)
+        else:
+            with Pool(workers) as pool:
+                computed = pool.map(run_single, [(config.mode, config.seed) for config in pending])
+        for config, (metrics, sketch) in zip(pending, computed):
+            results[config.seed] = metrics
+            sketches[config.seed] = sketch
+            if cache is not None:
+                cache.put(config, metrics, extras={"response_sketches": sketch})
 
     with open(filename, "w", newline="") as f:
         writer = csv.writer(f)
 
         header_written = False
 
-        for header, data in results:
+        for config in configs:
+            metrics = results[config.seed]
             if not header_written:
-                writer.writerow(header.split(","))
+                writer.writerow(metrics.keys())
                 header_written = True
 
-            writer.writerow(data.split(","))
+            writer.writerow(metrics.values())
+
+    # Sweep-wide percentiles come from merging per-run sketches, not from raw incidents.
+    merged = ResponseTimeSketches()
+    for config in configs:
+        merged.merge(ResponseTimeSketches.from_dict(sketches[config.seed]))
+    percentiles = merged.percentiles()
+    with open(f"results_{mode}_percentiles.json", "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "overall": percentiles["overall"],
+                "by_severity": {str(k): v for k, v in percentiles["by_severity"].items()},
+                "by_zone": {f"{k[0]},{k[1]}": v for k, v in percentiles["by_zone"].items()},
+                "by_mode": percentiles["by_mode"],
+            },
+            f,
+            indent=2,
+        )
+    overall = percentiles["overall"]
+    print(f"{mode}: p50={overall['p50']:.1f} p90={overall['p90']:.1f} p99={overall['p99']:.1f} (n={overall['count']})")
 
 
 if __name__ == "__main__":
-    run_all("reactive")
-    run_all("intelligent")
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument("--ensemble", action="store_true", help="todas las semillas en un solo proceso vectorizado")
+    args = parser.parse_args()
+
+    cache = None
+    if not args.no_cache:
+        # El ensemble muestrea el SUE con otro generador: sus resultados no comparten cache con las corridas normales.
+        cache = ResultCache(fingerprint=source_fingerprint() + ":ensemble") if args.ensemble else ResultCache()
+    run_all("reactive", cache, args.ensemble)
+    run_all("intelligent", cache, args.ensemble)
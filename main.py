@@ -1,41 +1,440 @@
 import argparse
+import math
 import random
+import sys
+import time
+from dataclasses import dataclass, replace
 from pathlib import Path
+from typing import TYPE_CHECKING, Any
 
+from simulation.alert_store import AlertStore
 from simulation.clock import SimulationClock
+from simulation.crime_field import CrimeField
+from simulation.incident_source import IncidentReplaySource, MapTransform
 from simulation.dispatcher import IntelligentDispatcher, ReactiveDispatcher
+from simulation.metrics_engine import MetricsEngine
 from simulation.patrol import Patrol
+from simulation.phase_profiler import PhaseProfiler
 from simulation.predictor import RiskPredictor
-from simulation.spatial import AdaptiveSpatialPartition
+from simulation.road_network import RoadNetwork
+from simulation.rng_streams import RngStreams
+from simulation.run_config import RunConfig
+from simulation.spatial import AdaptiveSpatialPartition, QuadtreePartition
 from simulation.sue import StochasticUrbanSimulator
 from simulation.world import World
 
+if TYPE_CHECKING:
+    from simulation.memory_report import MemoryReport
+    from simulation.run_recorder import RunRecorder
+    from simulation.timeseries import KpiTimeSeries
 
-def build_world(width: int, height: int, patrol_count: int) -> World:
-    partition = AdaptiveSpatialPartition(width=float(width), height=float(height), unit_count=patrol_count)
+# Wall-clock slice per frame while fast-forwarding without rendering.
+SKIP_SLICE = 0.25
+
+
+def build_world(
+    width: int,
+    height: int,
+    patrol_count: int,
+    streams: RngStreams | None = None,
+    partition_kind: str = "adaptive",
+    leaf_size: float = 100.0,
+) -> World:
+    layout_rng = streams.stream(RngStreams.LAYOUT) if streams is not None else random
+    speed_rng = streams.stream(RngStreams.PATROL_SPEEDS) if streams is not None else random
+
+    if partition_kind == "quadtree":
+        partition = QuadtreePartition(width=float(width), height=float(height), unit_count=patrol_count, leaf_size=leaf_size)
+    else:
+        partition = AdaptiveSpatialPartition(width=float(width), height=float(height), unit_count=patrol_count)
     world = World(width=float(width), height=float(height), partition=partition)
+    if streams is not None:
+        world.spawn_rng = streams.stream(RngStreams.DYNAMIC_SPAWNS)
     world.set_mechanic_base(
-        random.uniform(width * 0.42, width * 0.58),
-        random.uniform(height * 0.42, height * 0.58),
+        layout_rng.uniform(width * 0.42, width * 0.58),
+        layout_rng.uniform(height * 0.42, height * 0.58),
     )
     world.set_gas_stations(
         [
-            (random.uniform(width * 0.08, width * 0.25), random.uniform(height * 0.10, height * 0.25)),
-            (random.uniform(width * 0.75, width * 0.92), random.uniform(height * 0.10, height * 0.25)),
-            (random.uniform(width * 0.08, width * 0.25), random.uniform(height * 0.75, height * 0.90)),
-            (random.uniform(width * 0.75, width * 0.92), random.uniform(height * 0.75, height * 0.90)),
+            (layout_rng.uniform(width * 0.08, width * 0.25), layout_rng.uniform(height * 0.10, height * 0.25)),
+            (layout_rng.uniform(width * 0.75, width * 0.92), layout_rng.uniform(height * 0.10, height * 0.25)),
+            (layout_rng.uniform(width * 0.08, width * 0.25), layout_rng.uniform(height * 0.75, height * 0.90)),
+            (layout_rng.uniform(width * 0.75, width * 0.92), layout_rng.uniform(height * 0.75, height * 0.90)),
         ]
     )
 
+    fleet = []
     for patrol_id in range(1, patrol_count + 1):
-        x = random.uniform(30, width - 30)
-        y = random.uniform(50, height - 30)
-        speed = random.uniform(45.0, 70.0)
-        world.add_patrol(Patrol(patrol_id=patrol_id, x=x, y=y, speed=speed))
+        x = layout_rng.uniform(30, width - 30)
+        y = layout_rng.uniform(50, height - 30)
+        speed = speed_rng.uniform(45.0, 70.0)
+        fleet.append(Patrol(patrol_id=patrol_id, x=x, y=y, speed=speed))
+    world.add_patrols(fleet)
 
     return world
 
 
+def build_simulation(config: RunConfig):
+    streams = RngStreams(config.seed)
+    world = build_world(
+        config.width,
+        config.height,
+        patrol_count=config.patrol_count,
+        streams=streams,
+        partition_kind=config.partition,
+        leaf_size=config.leaf_size,
+    )
+    world.operating_mode = config.mode
+    for name, value in config.world_params().items():
+        setattr(world, name, value)
+    world.central_coordinator.alerts = AlertStore(config.alert_capacity, spill_path=config.alert_spill)
+    if config.crime_raster:
+        world.crime_field = CrimeField.from_raster(world.partition, config.crime_raster)
+    if config.road_network == "grid":
+        world.road_network = RoadNetwork.grid(config.width, config.height, rng=streams.stream(RngStreams.ROAD_NETWORK))
+    elif config.road_network:
+        world.road_network = RoadNetwork.load(config.road_network)
+    if world.road_network is not None:
+        world.road_network.precompute()
+
+    predictor = RiskPredictor(**config.predictor_params())
+    world.risk_high_threshold = predictor.high_risk_threshold
+    dispatcher = ReactiveDispatcher() if config.mode == "reactive" else IntelligentDispatcher(weights=config.weights)
+    if config.incident_log:
+        transform = MapTransform.fit(config.incident_bounds, config.width, config.height) if config.incident_bounds else None
+        sue = IncidentReplaySource(config.incident_log, time_scale=config.incident_time_scale, transform=transform)
+    else:
+        sue = StochasticUrbanSimulator(seed=streams.seed_for(RngStreams.SUE), **config.sue_params())
+    return world, predictor, dispatcher, sue
+
+
+def simulate(
+    config: RunConfig,
+    phase_profiler: PhaseProfiler | None = None,
+    timeseries: "KpiTimeSeries | None" = None,
+    recorder: "RunRecorder | None" = None,
+    memory_report: "MemoryReport | None" = None,
+) -> World:
+    sim_clock = SimulationClock(tick_seconds=1.0)
+    world, predictor, dispatcher, sue = build_simulation(config)
+    world.phase_profiler = phase_profiler
+    world.timeseries = timeseries
+    world.recorder = recorder
+    if memory_report is not None:
+        # Takes the profiler slot; a PhaseProfiler given to the report is still fed.
+        memory_report.attach(world, predictor, sue)
+
+    while sim_clock.current_tick < config.ticks:
+        current_tick = sim_clock.tick()
+        world.step(current_tick, sim_clock.tick_seconds, predictor, dispatcher, sue=sue)
+    world.alerts.flush()
+
+    return world
+
+
+def simulate_event_driven(config: RunConfig, heartbeat_ticks: int = 5):
+    from simulation.event_engine import EventDrivenSimulation
+
+    world, predictor, dispatcher, sue = build_simulation(config)
+    engine = EventDrivenSimulation(world, predictor, dispatcher, sue, heartbeat_ticks=heartbeat_ticks)
+    engine.run(config.ticks)
+    world.alerts.flush()
+    return engine
+
+
+def simulate_ensemble(configs: list[RunConfig]) -> list[World]:
+    from simulation.ensemble import EnsembleSimulation
+
+    ticks = {config.ticks for config in configs}
+    if len(ticks) != 1:
+        raise ValueError("all ensemble configs must run the same number of ticks")
+    return EnsembleSimulation([build_simulation(config) for config in configs]).run(ticks.pop())
+
+
+def run_sharded(config: RunConfig, shards_x: int, shards_y: int) -> dict[str, float]:
+    from simulation.sharding import ShardedSimulation
+
+    # The single-process layout is built once and cut into shards, so fleets and bases match.
+    # Each shard spills its own alerts; the layout world never steps.
+    world, _, _, _ = build_simulation(replace(config, alert_spill=None))
+    return ShardedSimulation(config, world, shards_x, shards_y).run().snapshot()
+
+
+def run_headless(
+    config: RunConfig,
+    phase_profiler: PhaseProfiler | None = None,
+    timeseries: "KpiTimeSeries | None" = None,
+    recorder: "RunRecorder | None" = None,
+    memory_report: "MemoryReport | None" = None,
+) -> dict[str, float]:
+    return simulate(config, phase_profiler, timeseries, recorder, memory_report).metrics_engine.snapshot()
+
+
+@dataclass
+class WorkerControls:
+    # Shared values written by the front end; the worker clears the skip fields when it gets there.
+    paused: Any
+    speed: Any
+    skip_until: Any
+    skip_surge: Any
+    stop: Any
+    recalc: Any
+
+
+def _simulation_worker(config: RunConfig, buffer_spec: dict, controls: WorkerControls, real_step: float) -> None:
+    # Runs in its own process: steps at the wall-clock cadence and publishes each tick.
+    from simulation.snapshot_buffer import SnapshotBuffer
+    from ui.time_warp import SurgeDetector
+
+    buffer = SnapshotBuffer.attach(buffer_spec)
+    sim_clock = SimulationClock(tick_seconds=1.0)
+    world, predictor, dispatcher, sue = build_simulation(config)
+    surges = SurgeDetector()
+    surge_armed = False
+    buffer.publish(world, sim_clock.current_tick)
+
+    deadline = time.perf_counter()
+    last_publish = deadline
+    try:
+        while not controls.stop.is_set() and sim_clock.current_tick < config.ticks:
+            if controls.recalc.is_set():
+                controls.recalc.clear()
+                world.recalculate_zones()
+                buffer.publish(world, sim_clock.current_tick)
+            if controls.paused.value:
+                time.sleep(0.01)
+                deadline = time.perf_counter()
+                continue
+
+            current_tick = sim_clock.tick()
+            world.step(current_tick, sim_clock.tick_seconds, predictor, dispatcher, sue=sue)
+            surge = surges.update(len(world.active_incidents()))
+
+            skip_until = controls.skip_until.value
+            if skip_until >= 0 or controls.skip_surge.value:
+                # Avance rapido: sin esperar y publicando solo unas pocas veces por segundo.
+                reached = (0 <= skip_until <= current_tick) or (controls.skip_surge.value and surge and surge_armed)
+                surge_armed = surge_armed or not surge
+                now = time.perf_counter()
+                if reached or now - last_publish >= 0.1:
+                    buffer.publish(world, current_tick)
+                    last_publish = now
+                if reached:
+                    controls.paused.value = 1
+                    controls.skip_until.value = -1
+                    controls.skip_surge.value = 0
+                deadline = now
+                continue
+            surge_armed = False
+
+            buffer.publish(world, current_tick)
+            # Un tick lento solo retrasa la simulacion; la UI sigue leyendo el ultimo snapshot.
+            step = real_step / max(1.0, controls.speed.value)
+            deadline = max(deadline + step, time.perf_counter() - step)
+            delay = deadline - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+    finally:
+        buffer.publish(world, sim_clock.current_tick)
+        buffer.close()
+
+
+class SimulationProcess:
+    # Front-end handle for the worker; quacks like World for Controls (recalculate_zones).
+
+    def __init__(self, config: RunConfig, real_step: float) -> None:
+        import multiprocessing
+
+        from simulation.snapshot_buffer import SnapshotBuffer
+
+        context = multiprocessing.get_context("spawn")
+        self.buffer = SnapshotBuffer(
+            max_patrols=max(1, config.patrol_count),
+            # cell_size never drops below 8 px, which bounds the zone grid.
+            max_zones=math.ceil(config.width / 8) * math.ceil(config.height / 8),
+        )
+        self.controls = WorkerControls(
+            paused=context.Value("b", 0),
+            speed=context.Value("d", 1.0),
+            skip_until=context.Value("q", -1),
+            skip_surge=context.Value("b", 0),
+            stop=context.Event(),
+            recalc=context.Event(),
+        )
+        self._skip_request = (None, False)
+        self.process = context.Process(
+            target=_simulation_worker,
+            args=(config, self.buffer.spec(), self.controls, real_step),
+            daemon=True,
+        )
+        self.process.start()
+
+    def recalculate_zones(self) -> None:
+        self.controls.recalc.set()
+
+    def sync(self, control_state) -> None:
+        controls = self.controls
+        request = (control_state.target_tick, control_state.skip_to_surge)
+        if request != self._skip_request:
+            self._skip_request = request
+            if control_state.skipping:
+                control_state.paused = False
+            controls.skip_until.value = -1 if control_state.target_tick is None else control_state.target_tick
+            controls.skip_surge.value = 1 if control_state.skip_to_surge else 0
+        elif control_state.skipping and controls.skip_until.value < 0 and not controls.skip_surge.value:
+            # The worker reached the target and paused itself.
+            control_state.cancel_skip()
+            control_state.paused = True
+            self._skip_request = (None, False)
+        controls.paused.value = 1 if control_state.paused else 0
+        controls.speed.value = control_state.speed
+
+    @property
+    def finished(self) -> bool:
+        return not self.process.is_alive()
+
+    def close(self) -> None:
+        self.controls.stop.set()
+        self.process.join(timeout=5.0)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.buffer.close()
+
+
+def _run_decoupled(args, config: RunConfig) -> None:
+    import pygame
+    from ui.controls import ControlState, Controls
+    from ui.renderer import Renderer
+    from ui.time_warp import TimeWarp, speed_status
+
+    real_step = 0.1
+    simulation = SimulationProcess(config, real_step)
+
+    pygame.init()
+    screen = pygame.display.set_mode((config.width, config.height))
+    pygame.display.set_caption(f"Simulador de Gemelo Digital Urbano [{args.mode}] seed={args.seed} (desacoplado)")
+
+    font = pygame.font.SysFont("consolas", 18)
+    renderer = Renderer(screen, font)
+    controls = Controls()
+    control_state = ControlState()
+    warp = TimeWarp()
+    real_clock = pygame.time.Clock()
+
+    previous = None
+    latest = None
+    arrived = time.perf_counter()
+    was_interpolating = False
+    running = True
+    try:
+        while running:
+            real_clock.tick(60)
+            running = controls.process_events(simulation, None, control_state)
+            simulation.sync(control_state)
+            # El worker termina al llegar a --ticks (o si falla); se dibuja el ultimo snapshot y se sale.
+            if simulation.finished:
+                running = False
+
+            snapshot = simulation.buffer.read()
+            if snapshot is not None and (latest is None or snapshot.sequence != latest.sequence):
+                if latest is not None:
+                    warp.count(max(0, snapshot.tick - latest.tick))
+                previous, latest = latest, snapshot
+                arrived = time.perf_counter()
+            else:
+                warp.count(0)
+            if latest is None:
+                continue
+
+            # Interpolamos entre los dos ultimos ticks para que el movimiento sea fluido a 60 fps.
+            alpha = (time.perf_counter() - arrived) / (real_step / control_state.speed)
+            if control_state.skipping:
+                alpha = 1.0
+            view = latest.interpolated(previous, alpha)
+            interpolating = view is not latest
+            if interpolating or was_interpolating:
+                renderer.invalidate()
+            was_interpolating = interpolating
+            status = speed_status(
+                control_state.speed, warp.achieved_speed, control_state.paused, control_state.skip_label()
+            )
+            dirty = renderer.draw(view, latest.tick, control_state.paused, status)
+            pygame.display.update(dirty)
+    finally:
+        pygame.quit()
+        simulation.close()
+
+
+def _run_replay(args) -> None:
+    import pygame
+    from simulation.run_recorder import RunPlayer
+    from ui.controls import ControlState, ReplayControls
+    from ui.renderer import Renderer
+    from ui.time_warp import TimeWarp, speed_status
+
+    player = RunPlayer(args.replay)
+    pygame.init()
+    screen = pygame.display.set_mode((int(player.width), int(player.height)))
+    pygame.display.set_caption(f"Simulador de Gemelo Digital Urbano [replay] {args.replay}")
+
+    font = pygame.font.SysFont("consolas", 18)
+    renderer = Renderer(screen, font)
+    controls = ReplayControls()
+    control_state = ControlState()
+    warp = TimeWarp()
+    real_clock = pygame.time.Clock()
+
+    tick = 0
+    snapshot = player.seek(tick)
+    running = True
+    while running:
+        frame_dt = real_clock.tick(60) / 1000.0
+        running = controls.process_events(player, None, control_state)
+
+        target = tick
+        if control_state.target_tick is not None:
+            target = control_state.target_tick
+        control_state.cancel_skip()
+        target += control_state.seek_offset
+        control_state.seek_offset = 0
+        due = warp.ticks_due(frame_dt, control_state.speed, control_state.paused)
+        target = max(0, min(player.last_tick, target + due))
+        if target >= player.last_tick:
+            control_state.paused = True
+
+        if target != tick:
+            # Cada salto carga el keyframe mas cercano y aplica como mucho K deltas.
+            snapshot = player.seek(target)
+            warp.count(max(0, target - tick))
+            tick = target
+
+        status = f"REPLAY {tick}/{player.last_tick} | " + speed_status(
+            control_state.speed, warp.achieved_speed, control_state.paused, control_state.skip_label()
+        )
+        dirty = renderer.draw(snapshot, tick, control_state.paused, status)
+        pygame.display.update(dirty)
+
+    pygame.quit()
+    player.close()
+
+
+def _report_phase_profile(profiler: PhaseProfiler, trace_path: str) -> None:
+    # stderr: headless stdout stays a clean CSV.
+    print(profiler.format_summary(), file=sys.stderr)
+    profiler.export_chrome_trace(trace_path)
+    print(f"trace: {trace_path}", file=sys.stderr)
+
+
+def _report_memory(report: "MemoryReport", file_path: str) -> None:
+    report.close()
+    print(report.format_summary(), file=sys.stderr)
+    report.export_json(file_path)
+    print(f"memoria: {file_path}", file=sys.stderr)
+    if report.over_budget():
+        print(f"FALLO: se excedio el presupuesto de memoria de {report.budget_mb:g}MB", file=sys.stderr)
+        sys.exit(1)
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(description="Simulador de Gemelo Digital Urbano")
     parser.add_argument("--mode", choices=["reactive", "intelligent"], default="intelligent")
@@ -43,40 +442,142 @@ def main() -> None:
     parser.add_argument("--metrics-file", type=str, default=None)
     parser.add_argument("--headless", action="store_true")
     parser.add_argument("--ticks", type=int, default=3600)
+    parser.add_argument("--profile-phases", action="store_true", help="medir cada fase de World.step")
+    parser.add_argument("--profile-trace", type=str, default="phase_trace.json", help="trace Chrome de --profile-phases")
+
+    parser.add_argument("--timeseries", type=str, default=None, help="exportar KPIs por tick (.npz)")
+    parser.add_argument("--decoupled", action="store_true", help="simulacion en un proceso aparte; la UI lee snapshots")
+    parser.add_argument("--record", type=str, default=None, help="grabar la corrida (keyframes + deltas)")
+    parser.add_argument("--keyframe-interval", type=int, default=300, help="ticks entre keyframes de --record")
+    parser.add_argument("--replay", type=str, default=None, help="reproducir una grabacion de --record")
+    parser.add_argument("--road-network", type=str, default=None, help="'grid' o un JSON de calles (nodes/edges)")
+    parser.add_argument("--shards", type=str, default=None, help="dividir el mapa en CxF procesos (ej. 4x4), solo headless")
+    parser.add_argument("--map-size", type=str, default="1100x700", help="tamano del mapa ANCHOxALTO en metros")
+    parser.add_argument("--partition", choices=["adaptive", "quadtree"], default="adaptive", help="'quadtree' crea zonas solo donde hay actividad")
+    parser.add_argument("--leaf-size", type=float, default=100.0, help="lado de la hoja en metros con --partition quadtree")
+    parser.add_argument("--crime-raster", type=str, default=None, help="riesgo base desde un raster .npy (fila 0 = y 0)")
+    parser.add_argument("--incident-log", type=str, default=None, help="reproducir incidentes historicos (.csv o .npy) en lugar del SUE")
+    parser.add_argument("--incident-time-scale", type=float, default=1.0, help="unidades de tiempo del log por tick")
+    parser.add_argument("--incident-bounds", type=str, default=None, help="x0,y0,x1,y1 del log, estirado sobre el mapa")
+    parser.add_argument("--memory-report", type=str, default=None, help="tamano de cada estructura y asignaciones por fase (.json)")
+    parser.add_argument("--memory-interval", type=int, default=300, help="ticks entre muestras de --memory-report")
+    parser.add_argument("--memory-budget-mb", type=float, default=None, help="fallar si el RSS de alguna muestra supera este tope")
+    parser.add_argument("--alert-capacity", type=int, default=65_536, help="alertas de borde y desconexion guardadas en memoria")
+    parser.add_argument("--alert-spill", type=str, default=None, help="volcar a este archivo las alertas que salen del buffer")
+    parser.add_argument("--event-driven", action="store_true", help="saltar de evento en evento en lugar de tick a tick, solo headless")
+    parser.add_argument("--heartbeat-ticks", type=int, default=5, help="ticks entre latidos de telemetria con --event-driven")
     args = parser.parse_args()
+    if (args.shards or args.event_driven) and not args.headless:
+        parser.error("--shards y --event-driven requieren --headless")
+    if args.shards and args.event_driven:
+        parser.error("--shards no se combina con --event-driven")
+    if args.decoupled and args.headless:
+        parser.error("--decoupled no se combina con --headless")
+    engine_flag = "--shards" if args.shards else "--event-driven" if args.event_driven else "--decoupled" if args.decoupled else None
+    if engine_flag and (args.profile_phases or args.timeseries or args.record or args.memory_report):
+        parser.error(f"--profile-phases/--timeseries/--record/--memory-report no estan disponibles con {engine_flag}")
+
+    phase_profiler = PhaseProfiler() if args.profile_phases else None
+    timeseries = None
+    if args.timeseries:
+        # NumPy is only needed when the recorder is requested.
+        from simulation.timeseries import KpiTimeSeries
+
+        timeseries = KpiTimeSeries(capacity=max(1, args.ticks))
+
+    memory_report = None
+    if args.memory_report:
+        from simulation.memory_report import MemoryReport
 
-    random.seed(args.seed)
+        memory_report = MemoryReport(interval=args.memory_interval, budget_mb=args.memory_budget_mb, profiler=phase_profiler)
 
-    width, height = 1100, 700
+    recorder = None
+    if args.record:
+        from simulation.run_recorder import RunRecorder
+
+        recorder = RunRecorder(args.record, keyframe_interval=args.keyframe_interval)
+
+    width, _, height = args.map_size.lower().partition("x")
+    config = RunConfig(
+        mode=args.mode,
+        seed=args.seed,
+        ticks=args.ticks,
+        width=int(width),
+        height=int(height or width),
+        road_network=args.road_network,
+        partition=args.partition,
+        leaf_size=args.leaf_size,
+        crime_raster=args.crime_raster,
+        incident_log=args.incident_log,
+        incident_time_scale=args.incident_time_scale,
+        incident_bounds=[float(value) for value in args.incident_bounds.split(",")] if args.incident_bounds else None,
+        alert_capacity=args.alert_capacity,
+        alert_spill=args.alert_spill,
+    )
+
+    # ---------- REPLAY MODE ----------
+    if args.replay:
+        _run_replay(args)
+        return
 
     # ---------- HEADLESS MODE ----------
-    if args.headless:
-        sim_clock = SimulationClock(tick_seconds=1.0)
-        world = build_world(width, height, patrol_count=16)
-        world.operating_mode = args.mode
+    if args.shards:
+        if config.road_network:
+            print("--road-network no esta disponible con --shards; se usan trayectos rectos", file=sys.stderr)
+            config.road_network = None
+        if config.incident_log:
+            print("--incident-log no esta disponible con --shards; cada shard usa el SUE", file=sys.stderr)
+        if config.partition != "adaptive":
+            print("--partition quadtree no esta disponible con --shards; se usa la grilla adaptativa", file=sys.stderr)
+            config.partition = "adaptive"
+        shards_x, _, shards_y = args.shards.lower().partition("x")
+        metrics = run_sharded(config, int(shards_x), int(shards_y or shards_x))
+        header, row = MetricsEngine.csv_row_from_snapshot(metrics)
+        print(header)
+        print(row)
+        return
 
-        predictor = RiskPredictor()
-        world.risk_high_threshold = predictor.high_risk_threshold
-        dispatcher = ReactiveDispatcher() if args.mode == "reactive" else IntelligentDispatcher()
-        sue = StochasticUrbanSimulator(seed=args.seed)
+    if args.event_driven:
+        if config.partition != "adaptive":
+            print("--partition quadtree no esta disponible con --event-driven; se usa la grilla adaptativa", file=sys.stderr)
+            config.partition = "adaptive"
+        engine = simulate_event_driven(config, args.heartbeat_ticks)
+        print(f"eventos={engine.events_processed} ticks globales={engine.global_ticks}/{config.ticks}", file=sys.stderr)
+        header, row = engine.world.metrics_engine.to_csv_row()
+        print(header)
+        print(row)
+        return
 
-        while sim_clock.current_tick < args.ticks:
-            current_tick = sim_clock.tick()
-            world.step(current_tick, sim_clock.tick_seconds, predictor, dispatcher, sue=sue)
+    if args.headless:
+        metrics = run_headless(config, phase_profiler, timeseries, recorder, memory_report)
+        if recorder is not None:
+            recorder.close()
+        if phase_profiler is not None:
+            _report_phase_profile(phase_profiler, args.profile_trace)
+        if timeseries is not None:
+            timeseries.export(args.timeseries)
 
         # imprimir SOLO csv limpio
-        header, row = world.metrics_engine.to_csv_row()
+        header, row = MetricsEngine.csv_row_from_snapshot(metrics)
         print(header)
         print(row)
+        if memory_report is not None:
+            _report_memory(memory_report, args.memory_report)
+        return
+
+    # ---------- DECOUPLED VISUAL MODE ----------
+    if args.decoupled:
+        _run_decoupled(args, config)
         return
 
     # ---------- VISUAL MODE ----------
     import pygame
     from ui.controls import ControlState, Controls
     from ui.renderer import Renderer
+    from ui.time_warp import SurgeDetector, TimeWarp, speed_status
 
     pygame.init()
-    screen = pygame.display.set_mode((width, height))
+    screen = pygame.display.set_mode((config.width, config.height))
     pygame.display.set_caption(f"Simulador de Gemelo Digital Urbano [{args.mode}] seed={args.seed}")
 
     font = pygame.font.SysFont("consolas", 18)
@@ -85,39 +586,76 @@ def main() -> None:
     control_state = ControlState()
 
     sim_clock = SimulationClock(tick_seconds=1.0)
-    world = build_world(width, height, patrol_count=16)
-    world.operating_mode = args.mode
-
-    predictor = RiskPredictor()
-    world.risk_high_threshold = predictor.high_risk_threshold
-    dispatcher = ReactiveDispatcher() if args.mode == "reactive" else IntelligentDispatcher()
-    sue = StochasticUrbanSimulator(seed=args.seed)
+    world, predictor, dispatcher, sue = build_simulation(config)
+    world.phase_profiler = phase_profiler
+    world.timeseries = timeseries
+    world.recorder = recorder
+    if memory_report is not None:
+        memory_report.attach(world, predictor, sue)
 
+    warp = TimeWarp()
+    surges = SurgeDetector()
+    surge_armed = False
     real_clock = pygame.time.Clock()
-    accumulator = 0.0
-    real_step = 0.1
 
     running = True
     while running:
         frame_dt = real_clock.tick(60) / 1000.0
-        accumulator += frame_dt
 
         running = controls.process_events(world, sim_clock, control_state)
 
-        while accumulator >= real_step:
-            accumulator -= real_step
-            if not control_state.paused:
+        if control_state.skipping:
+            # "Ir a tick N" / "siguiente pico": simulamos sin dibujar y solo mostramos el progreso.
+            deadline = time.perf_counter() + SKIP_SLICE
+            ran = 0
+            while running and control_state.skipping and time.perf_counter() < deadline:
                 current_tick = sim_clock.tick()
                 world.step(current_tick, sim_clock.tick_seconds, predictor, dispatcher, sue=sue)
+                surge = surges.update(len(world.active_incidents()))
+                ran += 1
+                target = control_state.target_tick
+                if (target is not None and current_tick >= target) or (control_state.skip_to_surge and surge and surge_armed):
+                    control_state.cancel_skip()
+                    control_state.paused = True
+                surge_armed = surge_armed or not surge
                 if sim_clock.current_tick >= args.ticks:
                     running = False
+            warp.count(ran)
+            warp.render_interval = SKIP_SLICE
+        else:
+            surge_armed = False
+            due = warp.ticks_due(frame_dt, control_state.speed, control_state.paused)
+            deadline = time.perf_counter() + warp.sim_budget(time.perf_counter())
+            ran = 0
+            while running and ran < due:
+                current_tick = sim_clock.tick()
+                world.step(current_tick, sim_clock.tick_seconds, predictor, dispatcher, sue=sue)
+                surges.update(len(world.active_incidents()))
+                ran += 1
+                if sim_clock.current_tick >= args.ticks:
+                    running = False
+                elif time.perf_counter() >= deadline:
                     break
+            warp.finish(due, ran)
 
-        renderer.draw(world, sim_clock.current_tick, control_state.paused)
-        pygame.display.flip()
+        now = time.perf_counter()
+        if warp.should_render(now):
+            status = speed_status(
+                control_state.speed, warp.achieved_speed, control_state.paused, control_state.skip_label()
+            )
+            dirty = renderer.draw(world, sim_clock.current_tick, control_state.paused, status)
+            pygame.display.update(dirty)
+            warp.rendered(now)
 
     pygame.quit()
-
+    if recorder is not None:
+        recorder.close()
+    if phase_profiler is not None:
+        _report_phase_profile(phase_profiler, args.profile_trace)
+    if timeseries is not None:
+        timeseries.export(args.timeseries)
+    if memory_report is not None:
+        _report_memory(memory_report, args.memory_report)
 
 
 if __name__ == "__main__":
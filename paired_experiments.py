@@ -0,0 +1,97 @@
+import argparse
+import csv
+import math
+import statistics
+from multiprocessing import Pool, cpu_count
+
+from main import run_headless
+from result_cache import ResultCache
+from simulation.run_config import RunConfig
+from simulation.stats import mean_confidence_interval
+
+RUNS = 10
+TICKS = 3600
+
+
+def _run_config(config):
+    return config.seed, config.mode, run_headless(config)
+
+
+def run_pairs(runs: int, ticks: int, cache: ResultCache | None = None, workers: int | None = None) -> dict[int, dict]:
+    # Both policies share the seed, so world layout, patrol speeds, the SUE incident
+    # stream and dynamic spawns come from identical streams: only dispatch differs.
+    configs = [RunConfig(mode=mode, seed=seed, ticks=ticks) for seed in range(runs) for mode in ("reactive", "intelligent")]
+    pairs: dict[int, dict] = {seed: {} for seed in range(runs)}
+    pending = []
+    for config in configs:
+        cached = cache.get(config) if cache is not None else None
+        if cached is None:
+            pending.append(config)
+        else:
+            pairs[config.seed][config.mode] = cached
+
+    if pending:
+        with Pool(workers or max(1, cpu_count() - 1)) as pool:
+            for seed, mode, metrics in pool.imap_unordered(_run_config, pending):
+                pairs[seed][mode] = metrics
+                if cache is not None:
+                    cache.put(RunConfig(mode=mode, seed=seed, ticks=ticks), metrics)
+    return pairs
+
+
+def paired_differences(pairs: dict[int, dict], confidence: float = 0.95) -> list[dict]:
+    seeds = sorted(pairs)
+    kpis = list(pairs[seeds[0]]["reactive"].keys())
+    rows = []
+    for kpi in kpis:
+        reactive = [pairs[seed]["reactive"][kpi] for seed in seeds]
+        intelligent = [pairs[seed]["intelligent"][kpi] for seed in seeds]
+        diffs = [b - a for a, b in zip(reactive, intelligent)]
+        mean, low, high = mean_confidence_interval(diffs, confidence)
+        independent_var = (statistics.variance(reactive) + statistics.variance(intelligent)) if len(seeds) > 1 else 0.0
+        paired_var = statistics.variance(diffs) if len(seeds) > 1 else 0.0
+        rows.append(
+            {
+                "kpi": kpi,
+                "reactive_mean": statistics.fmean(reactive),
+                "intelligent_mean": statistics.fmean(intelligent),
+                "mean_diff": mean,
+                "ci_low": low,
+                "ci_high": high,
+                "significant": low > 0.0 or high < 0.0,
+                # Ratio > 1 means pairing needed fewer runs than independent sampling would.
+                "variance_reduction": (independent_var / paired_var) if paired_var > 0.0 else math.inf,
+            }
+        )
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Comparacion pareada reactive vs intelligent (numeros aleatorios comunes)")
+    parser.add_argument("--runs", type=int, default=RUNS)
+    parser.add_argument("--ticks", type=int, default=TICKS)
+    parser.add_argument("--confidence", type=float, default=0.95)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument("--output", type=str, default="results_paired.csv")
+    args = parser.parse_args()
+
+    pairs = run_pairs(args.runs, args.ticks, cache=None if args.no_cache else ResultCache(), workers=args.workers)
+    rows = paired_differences(pairs, args.confidence)
+
+    with open(args.output, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+        writer.writeheader()
+        writer.writerows(rows)
+
+    print(f"{args.runs} pares, diferencia intelligent - reactive (IC {args.confidence:.0%})")
+    for row in rows:
+        marker = "*" if row["significant"] else " "
+        print(
+            f"{marker} {row['kpi']:<22} {row['mean_diff']:+10.4f} "
+            f"[{row['ci_low']:+.4f}, {row['ci_high']:+.4f}] var.red x{row['variance_reduction']:.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+import argparse
+import hashlib
+import json
+import time
+from pathlib import Path
+
+from simulation.run_config import RunConfig
+
+CACHE_DIR = Path(".cache/results")
+ROOT = Path(__file__).resolve().parent
+# main.py is included because build_world/run_headless define the scenario.
+SOURCE_GLOBS = ["simulation/*.py", "main.py"]
+
+
+def source_fingerprint(root: Path = ROOT) -> str:
+    digest = hashlib.sha256()
+    for pattern in SOURCE_GLOBS:
+        for path in sorted(root.glob(pattern)):
+            digest.update(str(path.relative_to(root)).encode("utf-8"))
+            digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    def __init__(self, cache_dir: Path | str = CACHE_DIR, fingerprint: str | None = None) -> None:
+        self.cache_dir = Path(cache_dir)
+        self.fingerprint = fingerprint or source_fingerprint()
+        self.hits = 0
+        self.misses = 0
+
+    def key_for(self, config: RunConfig) -> str:
+        digest = hashlib.sha256()
+        digest.update(config.config_hash().encode("utf-8"))
+        digest.update(self.fingerprint.encode("utf-8"))
+        return digest.hexdigest()
+
+    def _path_for(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, config: RunConfig) -> dict | None:
+        entry = self.get_entry(config)
+        return entry["metrics"] if entry is not None else None
+
+    def get_entry(self, config: RunConfig) -> dict | None:
+        path = self._path_for(self.key_for(config))
+        if not path.exists():
+            self.misses += 1
+            return None
+        try:
+            entry = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        entry["last_used"] = time.time()
+        self._write(path, entry)
+        self.hits += 1
+        return entry
+
+    def put(self, config: RunConfig, metrics: dict, extras: dict | None = None) -> None:
+        key = self.key_for(config)
+        now = time.time()
+        entry = {
+            "key": key,
+            "fingerprint": self.fingerprint,
+            "config": config.to_dict(),
+            "created": now,
+            "last_used": now,
+            "metrics": metrics,
+            "extras": extras or {},
+        }
+        self._write(self._path_for(key), entry)
+
+    def get_or_run(self, config: RunConfig, runner) -> dict:
+        metrics = self.get(config)
+        if metrics is None:
+            metrics = runner(config)
+            self.put(config, metrics)
+        return metrics
+
+    def entries(self):
+        if not self.cache_dir.exists():
+            return
+        for path in sorted(self.cache_dir.glob("*/*.json")):
+            try:
+                entry = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                entry = None
+            yield path, entry
+
+    def invalidate(self, mode: str | None = None, seed: int | None = None) -> int:
+        removed = 0
+        for path, entry in self.entries():
+            config = (entry or {}).get("config", {})
+            if mode is not None and config.get("mode") != mode:
+                continue
+            if seed is not None and config.get("seed") != seed:
+                continue
+            path.unlink(missing_ok=True)
+            removed += 1
+        return removed
+
+    def gc(self, max_age_days: float | None = None, max_entries: int | None = None) -> int:
+        # Entries produced by other source versions can never be hit again.
+        removed = 0
+        now = time.time()
+        survivors: list[tuple[float, Path]] = []
+        for path, entry in self.entries():
+            stale = entry is None or entry.get("fingerprint") != self.fingerprint
+            if not stale and max_age_days is not None:
+                stale = now - entry.get("last_used", 0.0) > max_age_days * 86400.0
+            if stale:
+                path.unlink(missing_ok=True)
+                removed += 1
+            else:
+                survivors.append((entry.get("last_used", 0.0), path))
+
+        if max_entries is not None and len(survivors) > max_entries:
+            survivors.sort()
+            for _, path in survivors[: len(survivors) - max_entries]:
+                path.unlink(missing_ok=True)
+                removed += 1
+
+        for directory in self.cache_dir.glob("*"):
+            if directory.is_dir() and not any(directory.iterdir()):
+                directory.rmdir()
+        return removed
+
+    def stats(self) -> dict[str, int]:
+        total = 0
+        current = 0
+        size = 0
+        for path, entry in self.entries():
+            total += 1
+            size += path.stat().st_size
+            if entry is not None and entry.get("fingerprint") == self.fingerprint:
+                current += 1
+        return {"entries": total, "current_entries": current, "stale_entries": total - current, "bytes": size}
+
+    def _write(self, path: Path, entry: dict) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{time.monotonic_ns()}.tmp")
+        tmp.write_text(json.dumps(entry, sort_keys=True), encoding="utf-8")
+        tmp.replace(path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Cache de resultados de experimentos")
+    parser.add_argument("--cache-dir", type=str, default=str(CACHE_DIR))
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("stats")
+
+    invalidate = commands.add_parser("invalidate")
+    invalidate.add_argument("--mode", choices=["reactive", "intelligent"], default=None)
+    invalidate.add_argument("--seed", type=int, default=None)
+
+    gc = commands.add_parser("gc")
+    gc.add_argument("--max-age-days", type=float, default=None)
+    gc.add_argument("--max-entries", type=int, default=None)
+
+    args = parser.parse_args()
+    cache = ResultCache(args.cache_dir)
+
+    if args.command == "stats":
+        for name, value in cache.stats().items():
+            print(f"{name}: {value}")
+    elif args.command == "invalidate":
+        print(f"removed {cache.invalidate(mode=args.mode, seed=args.seed)} entries")
+    elif args.command == "gc":
+        print(f"removed {cache.gc(max_age_days=args.max_age_days, max_entries=args.max_entries)} entries")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+from collections import deque
+from enum import IntEnum
+from pathlib import Path
+
+import numpy as np
+
+
+class AlertType(IntEnum):
+    LOSS_OF_UPDATES = 0
+    IMPOSSIBLE_SPEED = 1
+    FUEL_DROP_ANOMALY = 2
+    SUSTAINED_CRITICAL_TEMPERATURE = 3
+    DISCONNECTED = 4
+
+
+# Payload slots in the order producers fill them, and the text the old dict alerts carried.
+PAYLOAD_FIELDS = {
+    AlertType.LOSS_OF_UPDATES: ("gap",),
+    AlertType.IMPOSSIBLE_SPEED: ("declared", "observed", "dt"),
+    AlertType.FUEL_DROP_ANOMALY: ("drop", "max"),
+    AlertType.SUSTAINED_CRITICAL_TEMPERATURE: ("temp", "duration"),
+    AlertType.DISCONNECTED: ("gap",),
+}
+_MESSAGES = {
+    AlertType.LOSS_OF_UPDATES: "gap={0:.0f}s",
+    AlertType.IMPOSSIBLE_SPEED: "declared={0:.2f} observed={1:.2f} dt={2:.0f}s",
+    AlertType.FUEL_DROP_ANOMALY: "drop={0:.4f} max={1:.4f}",
+    AlertType.SUSTAINED_CRITICAL_TEMPERATURE: "temp={0:.1f} duration={1:.0f}s",
+    AlertType.DISCONNECTED: "gap={0:.0f}s",
+}
+# Edge alerts are informative only; a disconnect takes the unit out of dispatch.
+ACTIONS = {AlertType.DISCONNECTED: "MARK_NOT_AVAILABLE"}
+
+PAYLOAD_SIZE = 3
+ALERT_DTYPE = np.dtype(
+    [("seq", "<i8"), ("timestamp", "<i8"), ("patrol_id", "<i4"), ("type", "i1"), ("payload", "<f8", (PAYLOAD_SIZE,))]
+)
+
+
+def alert_message(record) -> str:
+    kind = AlertType(int(record["type"]))
+    return f"{kind.name} " + _MESSAGES[kind].format(*record["payload"].tolist())
+
+
+def read_spill(path: str | Path) -> np.ndarray:
+    # Records evicted from the ring, oldest first, as written by AlertStore.
+    return np.fromfile(path, dtype=ALERT_DTYPE)
+
+
+class AlertStore:
+    # Fixed-capacity ring of ALERT_DTYPE records shared by the edge twins and the coordinator.
+    # Once full, each new alert overwrites the oldest one; the overwritten counters say how many
+    # were lost and, with spill_path, they are appended to that file in chunks instead.
+    #
+    # Per-patrol and per-type indexes hold the sequence numbers of the live records in order, so
+    # an eviction only pops the left end of two deques.
+
+    def __init__(self, capacity: int = 65_536, spill_path: str | None = None, spill_chunk: int = 4096) -> None:
+        self.capacity = max(1, capacity)
+        self._records = np.zeros(self.capacity, dtype=ALERT_DTYPE)
+        self._by_patrol: dict[int, deque[int]] = {}
+        self._by_type: list[deque[int]] = [deque() for _ in AlertType]
+        self.total = 0
+        self.total_by_type = [0] * len(AlertType)
+        self.overwritten = 0
+        self.overwritten_by_type = [0] * len(AlertType)
+        self.spill_path = spill_path
+        self.spilled = 0
+        self._spill = None
+        self._spill_size = 0
+        if spill_path:
+            path = Path(spill_path)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # One spill file per run.
+            path.write_bytes(b"")
+            self._spill = np.zeros(max(1, spill_chunk), dtype=ALERT_DTYPE)
+
+    def __len__(self) -> int:
+        return min(self.total, self.capacity)
+
+    @property
+    def oldest_seq(self) -> int:
+        return max(0, self.total - self.capacity)
+
+    def append(self, kind: AlertType, patrol_id: int, timestamp: int, payload: tuple[float, ...] = ()) -> int:
+        seq = self.total
+        slot = seq % self.capacity
+        if seq >= self.capacity:
+            self._evict(slot)
+        values = tuple(payload[:PAYLOAD_SIZE]) + (0.0,) * (PAYLOAD_SIZE - len(payload))
+        self._records[slot] = (seq, timestamp, patrol_id, int(kind), values)
+        self._by_type[kind].append(seq)
+        queue = self._by_patrol.get(patrol_id)
+        if queue is None:
+            queue = self._by_patrol[patrol_id] = deque()
+        queue.append(seq)
+        self.total += 1
+        self.total_by_type[kind] += 1
+        return seq
+
+    def _evict(self, slot: int) -> None:
+        record = self._records[slot]
+        kind = int(record["type"])
+        patrol_id = int(record["patrol_id"])
+        self._by_type[kind].popleft()
+        queue = self._by_patrol[patrol_id]
+        queue.popleft()
+        if not queue:
+            del self._by_patrol[patrol_id]
+        self.overwritten += 1
+        self.overwritten_by_type[kind] += 1
+        if self._spill is not None:
+            self._spill[self._spill_size] = record
+            self._spill_size += 1
+            if self._spill_size == len(self._spill):
+                self.flush()
+
+    def flush(self) -> None:
+        if self._spill is None or not self._spill_size:
+            return
+        with open(self.spill_path, "ab") as f:
+            self._spill[: self._spill_size].tofile(f)
+        self.spilled += self._spill_size
+        self._spill_size = 0
+
+    # ---------- queries ----------
+
+    def count(self, kind: AlertType | None = None, patrol_id: int | None = None) -> int:
+        if patrol_id is not None:
+            queue = self._by_patrol.get(patrol_id, ())
+            if kind is None:
+                return len(queue)
+            return int(np.count_nonzero(self._records["type"][self._slots(queue)] == kind))
+        if kind is not None:
+            return len(self._by_type[kind])
+        return len(self)
+
+    def patrol_ids(self) -> list[int]:
+        return list(self._by_patrol)
+
+    def records(
+        self,
+        kind: AlertType | None = None,
+        patrol_id: int | None = None,
+        since: int | None = None,
+        until: int | None = None,
+    ) -> np.ndarray:
+        # Copy of the live records in append order; since is inclusive, until exclusive.
+        if patrol_id is not None:
+            selected = self._records[self._slots(self._by_patrol.get(patrol_id, ()))]
+            if kind is not None:
+                selected = selected[selected["type"] == kind]
+        elif kind is not None:
+            selected = self._records[self._slots(self._by_type[kind])]
+        else:
+            selected = self._records[np.arange(self.oldest_seq, self.total) % self.capacity]
+        if since is not None:
+            selected = selected[selected["timestamp"] >= since]
+        if until is not None:
+            selected = selected[selected["timestamp"] < until]
+        return selected
+
+    def latest(self, patrol_id: int) -> np.void | None:
+        queue = self._by_patrol.get(patrol_id)
+        if not queue:
+            return None
+        return self._records[queue[-1] % self.capacity].copy()
+
+    def _slots(self, seqs) -> np.ndarray:
+        return np.fromiter(seqs, dtype=np.int64, count=len(seqs)) % self.capacity
+
+    def as_dicts(self, records: np.ndarray, patrol_to_unit: dict[int, str] | None = None) -> list[dict]:
+        # The dict layout edge and disconnect alerts used to be kept in, for logs and exports.
+        units = patrol_to_unit or {}
+        return [
+            {
+                "timestamp": int(record["timestamp"]),
+                "unit_id": units.get(int(record["patrol_id"])),
+                "patrol_id": int(record["patrol_id"]),
+                "alert": alert_message(record),
+                "action": ACTIONS.get(AlertType(int(record["type"])), "ALERT_ONLY"),
+            }
+            for record in records
+        ]
+
+    def summary(self) -> dict:
+        return {
+            "capacity": self.capacity,
+            "stored": len(self),
+            "total": self.total,
+            "overwritten": self.overwritten,
+            "spilled": self.spilled,
+            "by_type": {kind.name: self.total_by_type[kind] for kind in AlertType},
+            "overwritten_by_type": {kind.name: self.overwritten_by_type[kind] for kind in AlertType},
+        }
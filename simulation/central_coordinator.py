@@ -2,6 +2,9 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 
+import numpy as np
+
+from simulation.alert_store import AlertStore, AlertType
 from simulation.telemetry_packet import TelemetryPacket
 
 
@@ -20,57 +23,149 @@ class UnitOperationalState:
     connected: bool = True
 
 
+MECH_CODES = {"OK": 0, "WARN": 1, "CRITICAL": 2}
+DISPATCHABLE_STATES = frozenset({"IDLE", "AVAILABLE", "PATROLLING", "PREVENTIVE_PATROL"})
+
+
+def _dispatchable(state: UnitOperationalState) -> bool:
+    return state.connected and state.patrol_state in DISPATCHABLE_STATES
+
+
+class FleetColumns:
+    # One numpy column per field, indexed by a stable slot per patrol and overwritten in place on
+    # ingest. Planning code reads these (sliced to len(self)) instead of building a TelemetryPacket
+    # per unit. Columns double in capacity as patrols are registered.
+    COLUMNS = (
+        ("patrol_ids", np.int64),
+        ("reported", np.int8),
+        ("connected", np.int8),
+        ("x", np.float64),
+        ("y", np.float64),
+        ("speed", np.float64),
+        ("fuel", np.float64),
+        ("mech", np.int8),
+    )
+
+    def __init__(self, capacity: int = 64) -> None:
+        self.slots: dict[int, int] = {}
+        self.size = 0
+        for name, dtype in self.COLUMNS:
+            setattr(self, name, np.zeros(max(1, capacity), dtype=dtype))
+
+    def __len__(self) -> int:
+        return self.size
+
+    def slot_for(self, patrol_id: int) -> int:
+        slot = self.slots.get(patrol_id)
+        if slot is None:
+            slot = self.slots[patrol_id] = self.size
+            if slot == len(self.patrol_ids):
+                self._grow()
+            self.size += 1
+            self.patrol_ids[slot] = patrol_id
+        return slot
+
+    def _grow(self) -> None:
+        for name, dtype in self.COLUMNS:
+            old = getattr(self, name)
+            column = np.zeros(len(old) * 2, dtype=dtype)
+            column[: len(old)] = old
+            setattr(self, name, column)
+
+    def write(self, slot: int, state: UnitOperationalState) -> None:
+        self.reported[slot] = 1
+        self.connected[slot] = 1 if state.connected else 0
+        self.x[slot], self.y[slot] = state.position
+        self.speed[slot] = state.speed
+        self.fuel[slot] = state.fuel_level
+        self.mech[slot] = MECH_CODES.get(state.mechanical_status, 0)
+
+
 class CentralCoordinator:
-    def __init__(self, disconnect_timeout_seconds: int = 3) -> None:
+    def __init__(self, disconnect_timeout_seconds: int = 3, alerts: AlertStore | None = None) -> None:
         self.disconnect_timeout_seconds = disconnect_timeout_seconds
         self.patrol_to_unit: dict[int, str] = {}
         self.unit_to_patrol: dict[str, int] = {}
         self.global_state: dict[str, UnitOperationalState] = {}
-        self.disconnect_alerts: list[dict] = []
+        # Shared with World, which files the edge twins' alerts here too.
+        self.alerts = alerts if alerts is not None else AlertStore()
+        self.fleet = FleetColumns()
+        # len(dispatchable_patrol_ids()), kept up to date on ingest, disconnect and unregister.
+        self.dispatchable_count = 0
 
     def register_unit(self, patrol_id: int, unit_id: str) -> None:
         self.patrol_to_unit[patrol_id] = unit_id
         self.unit_to_patrol[unit_id] = patrol_id
+        self.fleet.slot_for(patrol_id)
 
-    def consume_telemetry_bus(self, telemetry_bus, current_timestamp: int) -> None:
-        for packet in telemetry_bus.consume_all():
+    def unregister_unit(self, patrol_id: int) -> None:
+        unit_id = self.patrol_to_unit.pop(patrol_id, None)
+        if unit_id is None:
+            return
+        self.unit_to_patrol.pop(unit_id, None)
+        state = self.global_state.pop(unit_id, None)
+        if state is not None and _dispatchable(state):
+            self.dispatchable_count -= 1
+        # The slot is kept for the patrol id; it only counts again once a new packet arrives.
+        slot = self.fleet.slot_for(patrol_id)
+        self.fleet.reported[slot] = 0
+        self.fleet.connected[slot] = 0
+
+    def consume_telemetry_bus(self, telemetry_bus, current_timestamp: int) -> int:
+        packets = telemetry_bus.consume_all()
+        for packet in packets:
             self._ingest_packet(packet)
         self._mark_disconnected_units(current_timestamp)
+        return len(packets)
 
     def _ingest_packet(self, packet: TelemetryPacket) -> None:
         patrol_id = self.unit_to_patrol.get(packet.unit_id)
         if patrol_id is None:
             return
 
-        self.global_state[packet.unit_id] = UnitOperationalState(
-            patrol_id=patrol_id,
-            unit_id=packet.unit_id,
-            timestamp=packet.timestamp,
-            position=packet.position,
-            speed=packet.speed,
-            fuel_level=packet.fuel_level,
-            engine_temperature=packet.engine_temperature,
-            tire_pressure=packet.tire_pressure,
-            mechanical_status=packet.mechanical_status,
-            patrol_state=packet.patrol_state,
-            connected=True,
-        )
+        state = self.global_state.get(packet.unit_id)
+        was_dispatchable = state is not None and _dispatchable(state)
+        if state is None:
+            state = self.global_state[packet.unit_id] = UnitOperationalState(
+                patrol_id=patrol_id,
+                unit_id=packet.unit_id,
+                timestamp=packet.timestamp,
+                position=packet.position,
+                speed=packet.speed,
+                fuel_level=packet.fuel_level,
+                engine_temperature=packet.engine_temperature,
+                tire_pressure=packet.tire_pressure,
+                mechanical_status=packet.mechanical_status,
+                patrol_state=packet.patrol_state,
+                connected=True,
+            )
+        else:
+            # Updated in place: readers hold views, not copies.
+            state.patrol_id = patrol_id
+            state.timestamp = packet.timestamp
+            state.position = packet.position
+            state.speed = packet.speed
+            state.fuel_level = packet.fuel_level
+            state.engine_temperature = packet.engine_temperature
+            state.tire_pressure = packet.tire_pressure
+            state.mechanical_status = packet.mechanical_status
+            state.patrol_state = packet.patrol_state
+            state.connected = True
+        self.dispatchable_count += _dispatchable(state) - was_dispatchable
+        self.fleet.write(self.fleet.slot_for(patrol_id), state)
 
     def _mark_disconnected_units(self, current_timestamp: int) -> None:
         for unit_id, state in self.global_state.items():
             if current_timestamp - state.timestamp > self.disconnect_timeout_seconds:
                 if state.connected:
-                    self.disconnect_alerts.append(
-                        {
-                            "timestamp": current_timestamp,
-                            "unit_id": unit_id,
-                            "patrol_id": state.patrol_id,
-                            "alert": f"DISCONNECTED gap={current_timestamp - state.timestamp}s",
-                            "action": "MARK_NOT_AVAILABLE",
-                        }
+                    self.alerts.append(
+                        AlertType.DISCONNECTED, state.patrol_id, current_timestamp, (current_timestamp - state.timestamp,)
                     )
+                if _dispatchable(state):
+                    self.dispatchable_count -= 1
                 state.connected = False
                 state.patrol_state = "OUT_OF_SERVICE"
+                self.fleet.connected[self.fleet.slot_for(state.patrol_id)] = 0
 
     def get_state_by_patrol_id(self, patrol_id: int) -> UnitOperationalState | None:
         unit_id = self.patrol_to_unit.get(patrol_id)
@@ -84,9 +179,7 @@ class CentralCoordinator:
         for state in self.global_state.values():
             if state.patrol_id in excluded:
                 continue
-            if not state.connected:
-                continue
-            if state.patrol_state not in {"IDLE", "AVAILABLE", "PATROLLING", "PREVENTIVE_PATROL"}:
+            if not _dispatchable(state):
                 continue
             dispatchable.append(state.patrol_id)
         return dispatchable
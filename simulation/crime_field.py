@@ -1,18 +1,63 @@
 from __future__ import annotations
 import random
 import math
+from pathlib import Path
+
+import numpy as np
+
+from simulation.zone_map import ZoneArrayMap
 
 
 class CrimeField:
-    def __init__(self, partition, seed: int = 42):
+    # Base risk outside every hotspot.
+    BACKGROUND = 0.05
+
+    def __init__(
+        self,
+        partition,
+        seed: int = 42,
+        hotspots_per_km2: float = 0.15,
+        live_risk: float = 0.5,
+        raster: np.ndarray | None = None,
+    ):
         self.partition = partition
         self._rng = random.Random(seed)
-        self.base_risk: dict[tuple[int, int], float] = {}
+        self._base_risk = ZoneArrayMap.for_partition(partition)
+        # Lazy partitions only: hotspot density and the risk above which a leaf is kept live.
+        self.hotspots_per_km2 = hotspots_per_km2
+        self.live_risk = live_risk
+        self._hotspot_buckets: dict[tuple[int, int], list[tuple[int, int, float, float]]] = {}
+        # Base risk over the whole map, row 0 at y = 0; zones are resampled from it when first asked for.
+        self.raster = raster
+
+        if raster is None:
+            self._generate_hotspots()
+        elif partition.lazy:
+            self._touch_raster_cores()
+
+    @property
+    def base_risk(self) -> ZoneArrayMap:
+        return self._base_risk
 
-        self._generate_hotspots()
+    @base_risk.setter
+    def base_risk(self, values) -> None:
+        # Any (zx, zy) mapping, e.g. a shard's slice of the global field, laid on the current grid.
+        self._base_risk = ZoneArrayMap.for_partition(self.partition, items=values)
+
+    @classmethod
+    def from_raster(cls, partition, file_path: str | Path, live_risk: float = 0.5) -> CrimeField:
+        # Memory-mapped: a resample only reads the raster rows under the zones it covers.
+        raster = np.load(file_path, mmap_mode="r")
+        if raster.ndim != 2:
+            raise ValueError(f"crime raster must be 2-D, got shape {raster.shape}")
+        return cls(partition, live_risk=live_risk, raster=raster)
 
     def _generate_hotspots(self) -> None:
-        hotspot_count = max(3, (self.partition.cols * self.partition.rows) // 35)
+        if self.partition.lazy:
+            area_km2 = self.partition.width * self.partition.height / 1_000_000.0
+            hotspot_count = max(3, int(round(area_km2 * self.hotspots_per_km2)))
+        else:
+            hotspot_count = max(3, (self.partition.cols * self.partition.rows) // 35)
 
         centers = []
         for _ in range(hotspot_count):
@@ -22,15 +67,127 @@ class CrimeField:
             radius = self._rng.uniform(2.0, 5.5)
             centers.append((zx, zy, intensity, radius))
 
-        for zx in range(self.partition.cols):
-            for zy in range(self.partition.rows):
-                risk = 0.05
+        if self.partition.lazy:
+            self._index_hotspots(centers)
+            return
+
+        # One array pass per hotspot; zones accumulate hotspots in the same order as a per-zone sum.
+        zx = np.arange(self.partition.cols, dtype=np.float64)[:, None]
+        zy = np.arange(self.partition.rows, dtype=np.float64)[None, :]
+        grid = np.full((self.partition.cols, self.partition.rows), self.BACKGROUND)
+        for cx, cy, intensity, radius in centers:
+            dist = np.hypot(zx - cx, zy - cy)
+            grid += intensity * np.exp(-(dist**2) / (2 * radius**2))
+        base_risk = ZoneArrayMap.for_partition(self.partition)
+        for zone_id, risk in zip(self.partition.iter_zone_ids(), grid.ravel().tolist()):
+            base_risk.set_id(zone_id, risk)
+        self._base_risk = base_risk
+
+    # Hotspot influence is cut at 4 radii (< 0.2% of the background at the edge).
+    _REACH = 22
+
+    def _index_hotspots(self, centers: list[tuple[int, int, float, float]]) -> None:
+        for center in centers:
+            key = (center[0] // self._REACH, center[1] // self._REACH)
+            self._hotspot_buckets.setdefault(key, []).append(center)
 
-                for cx, cy, intensity, radius in centers:
+        # Hotspot cores become live leaves; the rest of the map stays empty until touched.
+        for cx, cy, intensity, radius in centers:
+            if intensity <= self.live_risk - self.BACKGROUND:
+                continue
+            reach = radius * math.sqrt(2.0 * math.log(intensity / (self.live_risk - self.BACKGROUND)))
+            span = int(reach)
+            for zx in range(cx - span, cx + span + 1):
+                for zy in range(cy - span, cy + span + 1):
+                    if math.dist((zx, zy), (cx, cy)) <= reach and self.partition.valid_zone((zx, zy)):
+                        self.partition.touch((zx, zy))
+
+    def _lazy_risk(self, zone: tuple[int, int]) -> float:
+        zx, zy = zone
+        bx, by = zx // self._REACH, zy // self._REACH
+        risk = self.BACKGROUND
+        for ix in (bx - 1, bx, bx + 1):
+            for iy in (by - 1, by, by + 1):
+                for cx, cy, intensity, radius in self._hotspot_buckets.get((ix, iy), ()):
                     dist = math.dist((zx, zy), (cx, cy))
-                    risk += intensity * math.exp(-(dist**2) / (2 * radius**2))
+                    if dist <= 4.0 * radius:
+                        risk += intensity * math.exp(-(dist**2) / (2 * radius**2))
+        self._base_risk.set_id(self.partition.zone_id(zone), risk)
+        return risk
+
+    # ---------- raster ----------
+
+    def _pixel_start(self, index: int, cell: float, extent: float, pixels: int) -> int:
+        return min(pixels - 1, int(index * cell / extent * pixels))
+
+    def _pixel_span(self, index: int, count: int, cell: float, extent: float, pixels: int) -> tuple[int, int]:
+        # A zone runs up to the next zone's first pixel, and always covers at least one.
+        start = self._pixel_start(index, cell, extent, pixels)
+        end = self._pixel_start(index + 1, cell, extent, pixels) if index + 1 < count else pixels
+        return start, max(start + 1, end)
+
+    def _resample_zone(self, zone: tuple[int, int]) -> float:
+        height_px, width_px = self.raster.shape
+        partition = self.partition
+        c0, c1 = self._pixel_span(zone[0], partition.cols, partition.cell_size, partition.width, width_px)
+        r0, r1 = self._pixel_span(zone[1], partition.rows, partition.cell_size, partition.height, height_px)
+        window = np.asarray(self.raster[r0:r1, c0:c1], dtype=np.float64)
+        finite = np.isfinite(window)
+        risk = float(window[finite].mean()) if finite.any() else self.BACKGROUND
+        self._base_risk.set_id(self.partition.zone_id(zone), risk)
+        return risk
+
+    def _resample_rows(self):
+        # Zone means one zone row at a time, so only a strip of the raster is ever in memory.
+        height_px, width_px = self.raster.shape
+        partition = self.partition
+        col_starts = [self._pixel_start(zx, partition.cell_size, partition.width, width_px) for zx in range(partition.cols)]
+        for zy in range(partition.rows):
+            r0, r1 = self._pixel_span(zy, partition.rows, partition.cell_size, partition.height, height_px)
+            strip = np.asarray(self.raster[r0:r1], dtype=np.float64)
+            finite = np.isfinite(strip)
+            sums = np.add.reduceat(np.where(finite, strip, 0.0).sum(axis=0), col_starts)
+            counts = np.add.reduceat(finite.sum(axis=0), col_starts)
+            yield zy, np.where(counts > 0, sums / np.maximum(counts, 1), self.BACKGROUND)
+
+    def _resample_grid(self) -> None:
+        base_risk = self._base_risk
+        cols = self.partition.cols
+        for zy, values in self._resample_rows():
+            for zx, risk in enumerate(values.tolist()):
+                base_risk.set_id(zy * cols + zx, risk)
+
+    def _touch_raster_cores(self) -> None:
+        # Same rule as synthetic hotspots: leaves at or above live_risk start live.
+        for zy, values in self._resample_rows():
+            for zx in np.nonzero(values >= self.live_risk)[0].tolist():
+                self.partition.touch((zx, zy))
+
+    def remap_zones(self, remap) -> None:
+        if self.raster is not None:
+            # The raster is the source; resample it against the new grid when zones are asked for.
+            self.base_risk = {}
+            return
+        # Hotspots were laid out in zone units; averaging keeps the same geography on the new grid.
+        self.base_risk = remap.average(self._base_risk)
 
-                self.base_risk[(zx, zy)] = risk
+    def risk_id(self, zone_id: int) -> float:
+        risk = self._base_risk.slots[zone_id]
+        if risk is not None:
+            return risk
+        return self.risk(self.partition.zone_of(zone_id))
 
     def risk(self, zone: tuple[int, int]) -> float:
-        return self.base_risk.get(zone, 0.05)
+        risk = self._base_risk.get(zone)
+        if risk is not None:
+            return risk
+        if not self.partition.valid_zone(zone):
+            return self.BACKGROUND
+        if self.raster is not None:
+            if self.partition.lazy:
+                return self._resample_zone(zone)
+            self._resample_grid()
+            return self._base_risk.get(zone, self.BACKGROUND)
+        if self.partition.lazy:
+            return self._lazy_risk(zone)
+        return self.BACKGROUND
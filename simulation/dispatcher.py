@@ -27,10 +27,13 @@ class BaseDispatcher:
     def _candidate_ids(self, world, excluded_patrol_ids: set[int] | None = None) -> list[int]:
         return world.central_coordinator.dispatchable_patrol_ids(excluded_patrol_ids)
 
-    def _eta_seconds(self, position: tuple[float, float], speed: float, incident) -> float:
-        dx = position[0] - incident.x
-        dy = position[1] - incident.y
-        distance = math.hypot(dx, dy)
+    def _eta_seconds(self, position: tuple[float, float], speed: float, incident, world=None) -> float:
+        if world is not None:
+            distance = world.travel_distance(position, incident.pos)
+        else:
+            dx = position[0] - incident.x
+            dy = position[1] - incident.y
+            distance = math.hypot(dx, dy)
         return distance / max(0.1, speed)
 
     def _planning_speed(self, world, patrol_id: int, observed_speed: float) -> float:
@@ -46,8 +49,8 @@ class BaseDispatcher:
         if selected_state is None:
             return 2.0
 
-        selected_zone = world.zone_for_point(selected_state.position[0], selected_state.position[1])
-        selected_center = world.partition.zone_center(selected_zone)
+        selected_zone = world.zone_id_for_point(selected_state.position[0], selected_state.position[1])
+        selected_center = world.partition.zone_center_id(selected_zone)
 
         others = [
             state
@@ -60,8 +63,8 @@ class BaseDispatcher:
         nearest = float("inf")
         sx, sy = selected_center
         for state in others:
-            zone = world.zone_for_point(state.position[0], state.position[1])
-            cx, cy = world.partition.zone_center(zone)
+            zone = world.zone_id_for_point(state.position[0], state.position[1])
+            cx, cy = world.partition.zone_center_id(zone)
             nearest = min(nearest, math.hypot(cx - sx, cy - sy))
 
         return min(2.0, nearest / max(1.0, world.partition.cell_size * 4.0))
@@ -71,9 +74,9 @@ class BaseDispatcher:
         if state is None:
             return 2.5
 
-        zone = world.zone_for_point(state.position[0], state.position[1])
+        zone = world.zone_id_for_point(state.position[0], state.position[1])
 
-        current_risk = world.risk_map.get(zone, 0.0)
+        current_risk = world.risk_map.get_id(zone, 0.0)
 
         remaining_units = 0
         for other in world.central_coordinator.global_state.values():
@@ -84,7 +87,7 @@ class BaseDispatcher:
             if other.patrol_state not in {"AVAILABLE", "PATROLLING"}:
                 continue
 
-            other_zone = world.zone_for_point(other.position[0], other.position[1])
+            other_zone = world.zone_id_for_point(other.position[0], other.position[1])
             if other_zone == zone:
                 remaining_units += 1
 
@@ -110,7 +113,7 @@ class IntelligentDispatcher(BaseDispatcher):
         if state is None or not state.connected:
             return float("inf")
         # Para asignacion de incidente se usa ETA puro para no penalizar tiempos de respuesta.
-        return self._eta_seconds(state.position, self._planning_speed(world, patrol_id, state.speed), incident)
+        return self._eta_seconds(state.position, self._planning_speed(world, patrol_id, state.speed), incident, world)
 
     def rebalance_preventive(self, world, high_risk_zones: list[tuple[int, int]]) -> None:
         if not high_risk_zones:
@@ -141,13 +144,14 @@ class IntelligentDispatcher(BaseDispatcher):
             return
 
         protected_ids = self._critical_for_active_incidents(world, eligible_ids)
+        buckets = self._eligible_by_zone(world, eligible_ids, protected_ids)
         assigned_in_call: set[int] = set()
 
         for zone in filtered_zones:
             if available_slots <= 0:
                 break
 
-            unit_id = self._closest_eligible_to_zone(world, zone, eligible_ids, protected_ids, assigned_in_call)
+            unit_id = self._closest_eligible_to_zone(world, zone, buckets, assigned_in_call)
             if unit_id is None:
                 continue
 
@@ -186,7 +190,7 @@ class IntelligentDispatcher(BaseDispatcher):
             state = world.central_coordinator.get_state_by_patrol_id(patrol_id)
             if state is None or not state.connected:
                 continue
-            eta = self._eta_seconds(state.position, self._planning_speed(world, patrol_id, state.speed), incident)
+            eta = self._eta_seconds(state.position, self._planning_speed(world, patrol_id, state.speed), incident, world)
             if eta < best_eta:
                 best_eta = eta
                 best_id = patrol_id
@@ -236,19 +240,12 @@ class IntelligentDispatcher(BaseDispatcher):
                 protected.add(nearest_id)
         return protected
 
-    def _closest_eligible_to_zone(
-        self,
-        world,
-        zone: tuple[int, int],
-        eligible_ids: list[int],
-        protected_ids: set[int],
-        already_selected: set[int],
-    ) -> int | None:
-        cx, cy = world.partition.zone_center(zone)
-        best_id = None
-        best_dist = float("inf")
-        for patrol_id in eligible_ids:
-            if patrol_id in protected_ids or patrol_id in already_selected:
+    def _eligible_by_zone(self, world, eligible_ids: list[int], protected_ids: set[int]) -> dict[int, list[tuple]]:
+        # Once per rebalance: each usable unit's reported position, sector and radius, bucketed
+        # by the zone id it is in. The order index keeps eligible_ids' tie-break.
+        buckets: dict[int, list[tuple]] = {}
+        for order, patrol_id in enumerate(eligible_ids):
+            if patrol_id in protected_ids:
                 continue
             state = world.central_coordinator.get_state_by_patrol_id(patrol_id)
             if state is None or not state.connected:
@@ -256,19 +253,48 @@ class IntelligentDispatcher(BaseDispatcher):
             patrol = world._patrol_by_id(patrol_id)
             if patrol is None:
                 continue
-            dist = math.hypot(state.position[0] - cx, state.position[1] - cy)
+            px, py = state.position
             home_zone = patrol.home_zone
             if not world.partition.valid_zone(home_zone):
-                home_zone = world.zone_for_point(state.position[0], state.position[1])
-            hx, hy = world.partition.zone_center(home_zone)
+                home_zone = world.zone_for_point(px, py)
             operational_radius = patrol.operational_radius if patrol.operational_radius > 0 else world.operational_radius()
-            # Regla operativa real: patrullaje predictivo solo dentro del sector operativo.
-            if math.hypot(cx - hx, cy - hy) > operational_radius:
-                continue
-            if dist < best_dist:
-                best_dist = dist
-                best_id = patrol_id
-        return best_id
+            zone_id = world.zone_id_for_point(px, py)
+            buckets.setdefault(zone_id, []).append((order, patrol_id, px, py, home_zone, operational_radius))
+        return buckets
+
+    def _closest_eligible_to_zone(
+        self,
+        world,
+        zone: tuple[int, int],
+        buckets: dict[int, list[tuple]],
+        already_selected: set[int],
+    ) -> int | None:
+        # Nearest unit to the zone centre, searched ring by ring of zones around it. A unit k
+        # rings out is at least (k - 1) cells away, so the search stops once no further ring can
+        # hold anything closer than the best found.
+        if not buckets:
+            return None
+        partition = world.partition
+        cx, cy = partition.zone_center(zone)
+        table = world.zone_eta_table()
+        cols, rows, cell = partition.cols, partition.rows, partition.cell_size
+        zx, zy = zone
+        best: tuple[float, int, int] | None = None
+        for k in range(max(cols, rows)):
+            if best is not None and (k - 1) * cell > best[0]:
+                break
+            for ix, iy in _ring(zx, zy, k, cols, rows):
+                for order, patrol_id, px, py, home_zone, operational_radius in buckets.get(iy * cols + ix, ()):
+                    if patrol_id in already_selected:
+                        continue
+                    dist = math.hypot(px - cx, py - cy)
+                    if best is not None and (dist, order) >= best[:2]:
+                        continue
+                    # Regla operativa real: patrullaje predictivo solo dentro del sector operativo.
+                    if table.distance(zone, home_zone) > operational_radius:
+                        continue
+                    best = (dist, order, patrol_id)
+        return None if best is None else best[2]
 
     def _would_leave_large_empty_area(self, world, patrol_id: int) -> bool:
         selected_state = world.central_coordinator.get_state_by_patrol_id(patrol_id)
@@ -308,4 +334,20 @@ class ReactiveDispatcher(BaseDispatcher):
         if state is None or not state.connected:
             return float("inf")
         # Baseline reactivo: solo cercanía/ETA.
-        return self._eta_seconds(state.position, self._planning_speed(world, patrol_id, state.speed), incident)
+        return self._eta_seconds(state.position, self._planning_speed(world, patrol_id, state.speed), incident, world)
+
+
+def _ring(zx: int, zy: int, k: int, cols: int, rows: int):
+    # Grid cells at Chebyshev distance k from (zx, zy), clipped to the grid.
+    if k == 0:
+        yield zx, zy
+        return
+    x0, x1 = max(0, zx - k), min(cols - 1, zx + k)
+    for iy in (zy - k, zy + k):
+        if 0 <= iy < rows:
+            for ix in range(x0, x1 + 1):
+                yield ix, iy
+    for ix in (zx - k, zx + k):
+        if 0 <= ix < cols:
+            for iy in range(max(0, zy - k + 1), min(rows - 1, zy + k - 1) + 1):
+                yield ix, iy
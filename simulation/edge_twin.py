@@ -3,6 +3,7 @@ from __future__ import annotations
 import math
 from dataclasses import dataclass
 
+from simulation.alert_store import AlertType
 from simulation.telemetry_packet import TelemetryPacket
 
 
@@ -19,27 +20,24 @@ class EdgeTwin:
     last_packet: TelemetryPacket | None = None
     critical_temp_counter: int = 0
 
-    def validate(self, packet: TelemetryPacket) -> list[str]:
-        alerts: list[str] = []
+    def validate(self, packet: TelemetryPacket) -> list[tuple[AlertType, tuple[float, ...]]]:
+        # (type, payload) pairs; the payload order is the one in alert_store.PAYLOAD_FIELDS.
+        alerts: list[tuple[AlertType, tuple[float, ...]]] = []
         if self.last_packet is not None:
             dt = max(1, packet.timestamp - self.last_packet.timestamp)
             if dt > self.max_gap_seconds:
-                alerts.append(f"LOSS_OF_UPDATES gap={dt}s")
+                alerts.append((AlertType.LOSS_OF_UPDATES, (dt,)))
 
             dx = packet.position[0] - self.last_packet.position[0]
             dy = packet.position[1] - self.last_packet.position[1]
             observed_speed = math.hypot(dx, dy) / dt
             if abs(packet.speed - observed_speed) > self.max_speed_error_mps:
-                alerts.append(
-                    f"IMPOSSIBLE_SPEED declared={packet.speed:.2f} observed={observed_speed:.2f} dt={dt}s"
-                )
+                alerts.append((AlertType.IMPOSSIBLE_SPEED, (packet.speed, observed_speed, dt)))
 
             fuel_drop = self.last_packet.fuel_level - packet.fuel_level
             max_physical_drop = (math.hypot(dx, dy) * self.fuel_rate_per_distance) + self.fuel_margin
             if fuel_drop > max_physical_drop:
-                alerts.append(
-                    f"FUEL_DROP_ANOMALY drop={fuel_drop:.4f} max={max_physical_drop:.4f}"
-                )
+                alerts.append((AlertType.FUEL_DROP_ANOMALY, (fuel_drop, max_physical_drop)))
 
         if packet.engine_temperature > self.critical_temp_c:
             self.critical_temp_counter += 1
@@ -48,7 +46,7 @@ class EdgeTwin:
 
         if self.critical_temp_counter > self.critical_temp_seconds:
             alerts.append(
-                f"SUSTAINED_CRITICAL_TEMPERATURE temp={packet.engine_temperature:.1f} duration={self.critical_temp_counter}s"
+                (AlertType.SUSTAINED_CRITICAL_TEMPERATURE, (packet.engine_temperature, self.critical_temp_counter))
             )
 
         self.last_packet = packet
@@ -0,0 +1,245 @@
+from __future__ import annotations
+
+import math
+
+import numpy as np
+
+from simulation.predictor import RiskPredictor
+from simulation.sue import StochasticUrbanSimulator
+from simulation.world import TickContext, World, step_phases
+from simulation.zone_map import ZoneArrayMap
+
+# Bandas de severidad del SUE: (base, pesos) segun lambda > 0.02, > 0.01 o menor.
+_SEVERITY_BASE = np.array([3, 2, 1])
+_SEVERITY_CUMULATIVE = np.array(
+    [np.cumsum(weights) / sum(weights) for weights in ([2, 4, 3], [3, 4, 2], [5, 3, 1])]
+)
+_DT_HOURS = 1.0 / 3600.0
+
+
+def _column(values) -> np.ndarray:
+    # Per-replica scalar broadcast against [K, cols, rows].
+    return np.asarray(values, dtype=np.float64)[:, None, None]
+
+
+def _neighborhood_sum(grid: np.ndarray, radius: int) -> np.ndarray:
+    # Sum over the (2r+1)^2 window, truncated at the map edge like neighbor_zones.
+    padded = np.pad(grid, ((0, 0), (radius, radius), (radius, radius)))
+    cols, rows = grid.shape[1], grid.shape[2]
+    total = np.zeros_like(grid)
+    for dx in range(2 * radius + 1):
+        for dy in range(2 * radius + 1):
+            total += padded[:, dx : dx + cols, dy : dy + rows]
+    return total
+
+
+class BatchedSue:
+    # SUE for K replicas at once. The per-zone event history is replaced by a decayed
+    # accumulator, exp(-decay) per tick, so contagion no longer walks every past event.
+
+    def __init__(self, worlds: list[World], models: list[StochasticUrbanSimulator]) -> None:
+        self.models = models
+        partition = worlds[0].partition
+        self.cols, self.rows = partition.cols, partition.rows
+        self.spatial = np.array(
+            [[[world.crime_field.risk((zx, zy)) for zy in range(self.rows)] for zx in range(self.cols)] for world in worlds]
+        )
+        self.x0 = np.array([partition.zone_bounds((zx, 0))[0] for zx in range(self.cols)])
+        self.x1 = np.array([partition.zone_bounds((zx, 0))[2] for zx in range(self.cols)])
+        self.y0 = np.array([partition.zone_bounds((0, zy))[1] for zy in range(self.rows)])
+        self.y1 = np.array([partition.zone_bounds((0, zy))[3] for zy in range(self.rows)])
+        self.contagion_weight = _column([model.contagion_weight for model in models])
+        self.alpha = _column([model.alpha for model in models])
+        self.intensity_scale = _column([model.intensity_scale for model in models])
+        self.decay_factor = _column([math.exp(-model.decay) for model in models])
+        # Independent stream per replica: results do not depend on which ensemble a seed runs in.
+        self.rngs = [np.random.default_rng(model.seed) for model in models]
+        self.excitation = np.zeros((len(worlds), self.cols, self.rows))
+
+    def generate(self, tick: int) -> list[list[tuple[float, float, int]]]:
+        influence = _neighborhood_sum(self.excitation, radius=2)
+        contagion = 1.0 - np.exp(-influence * self.alpha)
+        hour = _column([model._hour_factor(tick) for model in self.models])
+        lam = self.spatial * hour * (1.0 + self.contagion_weight * contagion)
+        probability = 1.0 - np.exp(-self.intensity_scale * lam * _DT_HOURS)
+
+        generated = []
+        hits = np.zeros(self.excitation.shape, dtype=bool)
+        for k, rng in enumerate(self.rngs):
+            hit = rng.random((self.cols, self.rows)) <= probability[k]
+            hits[k] = hit
+            zx, zy = np.nonzero(hit)
+            count = len(zx)
+            if not count:
+                generated.append([])
+                continue
+            xs = self.x0[zx] + rng.random(count) * (self.x1[zx] - self.x0[zx])
+            ys = self.y0[zy] + rng.random(count) * (self.y1[zy] - self.y0[zy])
+            zone_lam = lam[k, zx, zy]
+            band = np.where(zone_lam > 0.02, 0, np.where(zone_lam > 0.01, 1, 2))
+            draws = rng.random(count)
+            severities = _SEVERITY_BASE[band] + (draws[:, None] >= _SEVERITY_CUMULATIVE[band][:, :-1]).sum(axis=1)
+            generated.append(list(zip(xs.tolist(), ys.tolist(), severities.tolist())))
+
+        self.excitation = self.decay_factor * (self.excitation + hits)
+        return generated
+
+
+class _ReplicaRiskRecorder:
+    # Stands in for RiskPredictor inside World: resolved incidents go to the shared arrays.
+
+    def __init__(self, batch: BatchedRiskPredictor, index: int) -> None:
+        self.batch = batch
+        self.index = index
+        self.high_risk_threshold = batch.models[index].high_risk_threshold
+
+    def record_incident(self, zone: tuple[int, int], severity: int, tick: int) -> None:
+        self.batch.history[self.index, zone[0], zone[1]] += severity
+        self.batch.seen[self.index, zone[0], zone[1]] = True
+
+
+class BatchedRiskPredictor:
+    # RiskPredictor.update_risk_map for K replicas. The severity-weighted history is a decayed
+    # accumulator; relevance masks and the dict handed back to each World stay per replica.
+
+    def __init__(self, worlds: list[World], models: list[RiskPredictor]) -> None:
+        self.models = models
+        partition = worlds[0].partition
+        shape = (len(worlds), partition.cols, partition.rows)
+        self.history = np.zeros(shape)
+        self.seen = np.zeros(shape, dtype=bool)
+        self.decay = _column([model.decay_lambda for model in models])
+        self.weight_hour = _column([model.weight_hour for model in models])
+        self.weight_traffic = _column([model.weight_traffic for model in models])
+        self.weight_day = _column([model.weight_day for model in models])
+        self.floor = _column([model.persistence_floor for model in models])
+        self.recorders = [_ReplicaRiskRecorder(self, k) for k in range(len(worlds))]
+        self._tick = 0
+
+    def advance(self, tick: int) -> None:
+        self.history *= np.exp(-self.decay * (tick - self._tick))
+        self._tick = tick
+
+    def update(self, worlds: list[World], tick: int) -> list[list[tuple[int, int]]]:
+        shape = self.history.shape
+        relevant = self.seen.copy()
+        density = np.zeros(shape)
+        counts = np.zeros(shape)
+        for k, world in enumerate(worlds):
+            for zx, zy in world.all_relevant_zones():
+                relevant[k, zx, zy] = True
+            for patrol in world.patrols:
+                zx, zy = world.zone_for_point(patrol.x, patrol.y)
+                density[k, zx, zy] += 1
+            for (zx, zy), count in world.zone_incident_counts.items():
+                counts[k, zx, zy] = count
+
+        hour = _column([model._hour_factor(tick) for model in self.models])
+        day = _column([model._day_factor(tick) for model in self.models])
+        bayes_like = self.weight_hour * hour + self.weight_traffic * (1.0 + 0.05 * density) + self.weight_day * day
+        risk = self.history * bayes_like + self.floor * np.log1p(counts)
+        keep = relevant & (risk > 0.01)
+
+        high_risk = []
+        for k, world in enumerate(worlds):
+            zx, zy = np.nonzero(keep[k])
+            values = risk[k, zx, zy]
+            risk_map = ZoneArrayMap.for_partition(world.partition)
+            for zone_id, value in zip((zy * world.partition.cols + zx).tolist(), values.tolist()):
+                risk_map.set_id(zone_id, value)
+            world.risk_map = risk_map
+            threshold = self.models[k].high_risk_threshold
+            high_risk.append([zone for zone, value in world.risk_map.items() if value >= threshold])
+        return high_risk
+
+
+def batched_coverage(worlds: list[World]) -> np.ndarray:
+    # Same rule as MetricsEngine._update_coverage, for every replica in one broadcast.
+    partition = worlds[0].partition
+    centers = np.array([[partition.zone_center((zx, zy)) for zy in range(partition.rows)] for zx in range(partition.cols)])
+    units = []
+    for world in worlds:
+        positions = []
+        if world.central_coordinator.global_state:
+            for state in world.central_coordinator.global_state.values():
+                patrol = world._patrol_by_id(state.patrol_id)
+                radius = patrol.coverage_radius if patrol is not None else 120.0
+                positions.append((state.position[0], state.position[1], radius))
+        else:
+            positions = [(patrol.x, patrol.y, patrol.coverage_radius) for patrol in world.patrols]
+        positions.extend(world.halo_patrols)
+        units.append(positions)
+
+    width = max(1, max(len(positions) for positions in units))
+    # Padding rows get a negative radius so they never cover anything.
+    table = np.full((len(worlds), width, 3), [0.0, 0.0, -1.0])
+    for k, positions in enumerate(units):
+        if positions:
+            table[k, : len(positions)] = positions
+    dx = table[:, None, None, :, 0] - centers[None, :, :, None, 0]
+    dy = table[:, None, None, :, 1] - centers[None, :, :, None, 1]
+    covered = (np.hypot(dx, dy) <= table[:, None, None, :, 2]).any(axis=3)
+    total_zones = max(1, partition.cols * partition.rows)
+    return covered.sum(axis=(1, 2)) / total_zones * 100.0
+
+
+# World.step phases run per replica; incident generation and risk prediction are batched.
+_BEFORE_RISK = step_phases("patrol_updates", "dispatch")
+_AFTER_RISK = step_phases("rebalancing", "metrics")
+
+
+class EnsembleSimulation:
+    # K independent replicas advanced in lockstep. SUE sampling, risk maps and coverage run as
+    # one array operation over the batch; motion, telemetry and dispatch stay per replica, in
+    # the same phase order as World.step.
+
+    def __init__(self, replicas: list[tuple]) -> None:
+        if not replicas:
+            raise ValueError("ensemble needs at least one replica")
+        self.worlds: list[World] = [world for world, _, _, _ in replicas]
+        self.dispatchers = [dispatcher for _, _, dispatcher, _ in replicas]
+        shapes = {(world.partition.cols, world.partition.rows) for world in self.worlds}
+        if len(shapes) != 1:
+            raise ValueError(f"replicas must share the zone grid, got {sorted(shapes)}")
+        for world in self.worlds:
+            if world.partition.lazy:
+                raise ValueError("ensemble replicas need a dense partition, not a lazy quadtree")
+            if world.enable_dynamic_patrols:
+                # Spawning recalculates the partition and would change the grid mid-run.
+                raise ValueError("ensemble replicas cannot use dynamic patrols")
+        sources = [sue for _, _, _, sue in replicas]
+        if not all(isinstance(source, StochasticUrbanSimulator) for source in sources):
+            raise ValueError("ensemble replicas must sample incidents from the SUE")
+        self.sue = BatchedSue(self.worlds, sources)
+        self.risk = BatchedRiskPredictor(self.worlds, [predictor for _, predictor, _, _ in replicas])
+
+    def step(self, tick: int, dt: float = 1.0) -> None:
+        self.risk.advance(tick)
+        for world, incidents in zip(self.worlds, self.sue.generate(tick)):
+            for x, y, severity in incidents:
+                world.create_incident(x, y, severity, tick)
+
+        contexts = [
+            TickContext(tick, dt, recorder, dispatcher)
+            for dispatcher, recorder in zip(self.dispatchers, self.risk.recorders)
+        ]
+        for world, ctx in zip(self.worlds, contexts):
+            world.run_phases(ctx, _BEFORE_RISK)
+
+        predicted = self.risk.update(self.worlds, tick)
+        for k, (world, ctx) in enumerate(zip(self.worlds, contexts)):
+            if world.operating_mode != "intelligent":
+                world.risk_map = world.risk_map.like()
+                predicted[k] = []
+            elif hasattr(ctx.dispatcher, "filter_high_risk_zones"):
+                predicted[k] = ctx.dispatcher.filter_high_risk_zones(world, predicted[k])
+            ctx.predicted_high_risk = predicted[k]
+
+        for world, ctx, coverage in zip(self.worlds, contexts, batched_coverage(self.worlds)):
+            ctx.coverage = float(coverage)
+            world.run_phases(ctx, _AFTER_RISK)
+
+    def run(self, ticks: int) -> list[World]:
+        for tick in range(1, ticks + 1):
+            self.step(tick)
+        return self.worlds
@@ -0,0 +1,288 @@
+from __future__ import annotations
+
+import heapq
+import math
+from typing import TYPE_CHECKING
+
+from simulation.patrol import Patrol, PatrolState
+from simulation.world import SERVICE_FLOW_STATES, STEP_PHASE_BY_NAME, TickContext, World, step_phases
+
+if TYPE_CHECKING:
+    from simulation.dispatcher import BaseDispatcher
+    from simulation.incident_source import BaseIncidentSource
+    from simulation.predictor import RiskPredictor
+
+# Event kinds; on a shared tick they are popped in this order.
+INCIDENT_ARRIVAL = 0
+DEADLINE = 1
+HEARTBEAT = 2
+PATROL_ARRIVAL = 3
+TASK_COMPLETION = 4
+
+# Patrols doing nothing but routine coverage; their events stay local unless units are short.
+ROUTINE_STATES = frozenset({PatrolState.IDLE, PatrolState.AVAILABLE, PatrolState.PATROLLING, PatrolState.PREVENTIVE_PATROL})
+
+
+class EventDrivenSimulation:
+    # Same World, dispatcher and predictor, advanced from one event to the next instead of tick
+    # by tick. A patrol's position is only interpolated (Patrol.update_motion over the elapsed
+    # ticks) when an event needs it, and ticks without events cost nothing.
+    #
+    # Routine patrol events (arriving at a patrol point, picking the next one) only touch that
+    # patrol. Everything else is a global tick: the whole fleet is brought up to date, reports
+    # telemetry, and the World phases run in World.step order. Global ticks are incident
+    # arrivals, responding or service arrivals, fuel and incident deadlines, and a telemetry
+    # heartbeat every heartbeat_ticks, which bounds how stale the coordinator's view can get.
+    # With heartbeat_ticks=1 every tick is global.
+
+    def __init__(
+        self,
+        world: World,
+        predictor: RiskPredictor,
+        dispatcher: BaseDispatcher,
+        source: BaseIncidentSource | None,
+        heartbeat_ticks: int = 5,
+    ) -> None:
+        if world.partition.lazy:
+            raise ValueError("event-driven runs need a dense partition, not a lazy quadtree")
+        if world.phase_profiler is not None or world.timeseries is not None or world.recorder is not None:
+            # All three sample every tick.
+            raise ValueError("event-driven runs do not support phase profiles, time series or recordings")
+        self.world = world
+        self.predictor = predictor
+        self.dispatcher = dispatcher
+        self.source = source
+        self.heartbeat_ticks = max(1, heartbeat_ticks)
+        self.events_processed = 0
+        self.global_ticks = 0
+        self._queue: list[tuple[int, int, int, int]] = []
+        self._sequence = 0
+        # Tick each patrol's state was last brought up to.
+        self._synced: dict[int, int] = {}
+        # The one live (tick, kind) per patrol; anything else popped for it is stale.
+        self._patrol_due: dict[int, tuple[int, int]] = {}
+        self._metrics_tick = 0
+        self._high_risk: set[tuple[int, int]] = set()
+        self._arrivals: list[tuple[float, float, int]] = []
+        # World.step's phases in global-tick order, motion and metrics replaced.
+        self._phases = (
+            ("incident_generation", self._create_arrivals),
+            ("patrol_updates", self._advance_fleet),
+            *step_phases("telemetry_emit", "telemetry_consume"),
+            ("service_policy", self._service_policy),
+            ("stalled_resolution", STEP_PHASE_BY_NAME["stalled_resolution"]),
+            ("dynamic_capacity", STEP_PHASE_BY_NAME["dynamic_capacity"]),
+            ("fleet_sync", self._sync_new_patrols),
+            *step_phases("dispatch", "rebalancing"),
+            ("metrics", self._span_metrics),
+        )
+
+    def _push(self, tick: int, kind: int, key: int = -1) -> None:
+        heapq.heappush(self._queue, (tick, kind, self._sequence, key))
+        self._sequence += 1
+
+    def run(self, ticks: int) -> World:
+        for patrol in self.world.patrols:
+            self._synced[patrol.patrol_id] = 0
+        self._schedule_source(0)
+        self._push(1, HEARTBEAT)
+        # The last tick is always global so metrics cover the whole run.
+        self._push(ticks, HEARTBEAT)
+
+        while self._queue and self._queue[0][0] <= ticks:
+            tick = self._queue[0][0]
+            batch = []
+            while self._queue and self._queue[0][0] == tick:
+                batch.append(heapq.heappop(self._queue))
+            self._handle(tick, batch)
+        return self.world
+
+    def _handle(self, tick: int, batch: list[tuple[int, int, int, int]]) -> None:
+        world = self.world
+        if world._zone_remaps:
+            world._apply_zone_remaps(self.predictor, self.source)
+        is_global = False
+        incidents: list[tuple[float, float, int]] = []
+        patrols: list[Patrol] = []
+        for _, kind, _, key in batch:
+            if kind == INCIDENT_ARRIVAL:
+                # A candidate the source turns down leaves the tick as quiet as it was.
+                incidents = self.source.event_incidents(world, tick)
+                self._schedule_source(tick)
+                is_global = is_global or bool(incidents)
+            elif kind == HEARTBEAT:
+                is_global = True
+                if tick % self.heartbeat_ticks == 0 or tick == 1:
+                    self._push(tick - tick % self.heartbeat_ticks + self.heartbeat_ticks, HEARTBEAT)
+            elif kind == DEADLINE and key < 0:
+                # Incident deadlines carry -incident_id; only still-active incidents matter.
+                incident = world.incidents.get(-key)
+                is_global = is_global or (incident is not None and incident.active)
+            elif self._patrol_due.get(key) == (tick, kind):
+                del self._patrol_due[key]
+                patrol = world._patrol_by_id(key)
+                if patrol is None:
+                    continue
+                patrols.append(patrol)
+                if kind == TASK_COMPLETION:
+                    # Back to IDLE and a new patrol point, unless someone is waiting for a unit.
+                    routine = True
+                else:
+                    routine = patrol.state in ROUTINE_STATES and not (kind == DEADLINE and patrol.has_target())
+                is_global = is_global or not routine
+            else:
+                continue
+            self.events_processed += 1
+
+        if is_global or (patrols and self._units_short()):
+            self._global_tick(tick, incidents)
+            return
+        for patrol in patrols:
+            self._advance(patrol, tick)
+            world._ensure_patrolling_behavior(patrol, tick)
+            self._schedule_patrol(patrol, tick)
+
+    def _units_short(self) -> bool:
+        return any(incident.needs_more_units() for incident in self.world.active_incidents())
+
+    def _global_tick(self, tick: int, incidents: list[tuple[float, float, int]]) -> None:
+        # World.step phases, with patrol motion interpolated first so telemetry is current.
+        self.global_ticks += 1
+        self._arrivals = incidents
+        ctx = TickContext(tick, 1.0, self.predictor, self.dispatcher, self.source)
+        self.world.run_phases(ctx, self._phases)
+        for patrol in self.world.patrols:
+            self._schedule_patrol(patrol, tick)
+
+    # ---------- global tick phases that replace World.step's ----------
+
+    def _create_arrivals(self, world: World, ctx: TickContext) -> None:
+        for x, y, severity in self._arrivals:
+            self._schedule_deadlines(world.create_incident(x, y, severity, ctx.tick))
+
+    def _advance_fleet(self, world: World, ctx: TickContext) -> None:
+        for patrol in world.patrols:
+            self._advance(patrol, ctx.tick)
+
+    def _service_policy(self, world: World, ctx: TickContext) -> None:
+        # The service and patrolling part of World._update_patrols, on the reported telemetry.
+        needs = world._service_needs()
+        world._patrol_cover = {}
+        for patrol in world.patrols:
+            if patrol.state == PatrolState.OUT_OF_SERVICE:
+                continue
+            world._ensure_service_policy(patrol, needs.get(patrol.patrol_id))
+            world._ensure_patrolling_behavior(patrol, ctx.tick)
+            world._refresh_patrol_cover(patrol)
+        world._patrol_cover = None
+
+    def _sync_new_patrols(self, world: World, ctx: TickContext) -> None:
+        for patrol in world.patrols:
+            self._synced.setdefault(patrol.patrol_id, ctx.tick)
+
+    def _span_metrics(self, world: World, ctx: TickContext) -> None:
+        high_risk = set(ctx.predicted_high_risk)
+        world.metrics_engine.update_span(world, ctx.tick, high_risk, ctx.tick - self._metrics_tick, self._high_risk)
+        self._metrics_tick = ctx.tick
+        self._high_risk = high_risk
+
+    def _advance(self, patrol: Patrol, tick: int) -> None:
+        # What World._update_patrols would have done over the ticks since the last sync. Nothing
+        # happened to this patrol in between, so one long motion step replaces the short ones.
+        elapsed = tick - self._synced.get(patrol.patrol_id, tick)
+        self._synced[patrol.patrol_id] = tick
+        if elapsed <= 0 or patrol.state == PatrolState.OUT_OF_SERVICE:
+            return
+
+        world = self.world
+        if world.road_network is not None:
+            world._ensure_route(patrol)
+        arrived = False
+        if patrol.has_target():
+            arrived = patrol.update_motion(elapsed)
+            if arrived:
+                world._handle_arrival(patrol, tick, self.predictor)
+
+        # An arrival happens on this tick, so only one task tick has passed since.
+        for _ in range(1 if arrived else min(elapsed, patrol.task_ticks_remaining + 1)):
+            patrol.update_task()
+        for _ in range(min(elapsed, 64)):
+            patrol.cool_down_idle()
+
+    def _schedule_patrol(self, patrol: Patrol, tick: int) -> None:
+        world = self.world
+        due: tuple[int, int] | None = None
+        if patrol.state == PatrolState.OUT_OF_SERVICE:
+            due = None
+        elif patrol.has_target():
+            speed = patrol.effective_speed()
+            if speed > 0.0:
+                if world.road_network is not None:
+                    world._ensure_route(patrol)
+                due = (tick + max(1, math.ceil(self._distance_left(patrol) / speed - 1e-9)), PATROL_ARRIVAL)
+                fuel_due = self._fuel_deadline(patrol, speed, tick)
+                if fuel_due is not None and fuel_due < due[0]:
+                    due = (fuel_due, DEADLINE)
+        elif patrol.state == PatrolState.RESPONDING:
+            due = (tick + max(1, patrol.task_ticks_remaining), TASK_COMPLETION)
+        elif patrol.is_dynamic:
+            due = None
+        elif patrol.state in {PatrolState.PATROLLING, PatrolState.PREVENTIVE_PATROL}:
+            interval = world.patrol_retarget_interval_ticks
+            due = (tick + interval - tick % interval, DEADLINE)
+        elif patrol.state in {PatrolState.IDLE, PatrolState.AVAILABLE}:
+            # Released after this tick's patrolling pass (an incident closed under it).
+            due = (tick + 1, DEADLINE)
+
+        if due is None:
+            self._patrol_due.pop(patrol.patrol_id, None)
+        elif self._patrol_due.get(patrol.patrol_id) != due:
+            self._patrol_due[patrol.patrol_id] = due
+            self._push(due[0], due[1], patrol.patrol_id)
+
+    def _distance_left(self, patrol: Patrol) -> float:
+        if not patrol.route:
+            return math.hypot(patrol.target_x - patrol.x, patrol.target_y - patrol.y)
+        distance = 0.0
+        x, y = patrol.x, patrol.y
+        for wx, wy in patrol.route:
+            distance += math.hypot(wx - x, wy - y)
+            x, y = wx, wy
+        return distance
+
+    def _fuel_deadline(self, patrol: Patrol, speed: float, tick: int) -> int | None:
+        # First tick the fixed loop's service check could fire on fuel: the low threshold, or the
+        # predictive reserve for reaching the nearest station from here.
+        if patrol.state in SERVICE_FLOW_STATES:
+            return None
+        world = self.world
+        table = world.zone_eta_table()
+        zone = world.zone_for_point(patrol.x, patrol.y)
+        objective = world._patrol_objective_point(patrol)
+        if objective is None:
+            station = table.best_station(zone)
+        else:
+            station = table.best_station_for(zone, world.zone_for_point(objective[0], objective[1]))
+        predictive = (
+            world.fuel_critical_threshold
+            + world.predictive_fuel_reserve
+            + world.travel_distance(patrol.pos, station) * world.fuel_consumption_per_unit * world.predictive_margin_factor
+        )
+        reserve = max(world.fuel_low_threshold, predictive)
+        burn = speed * world.fuel_consumption_per_unit
+        if burn <= 0.0:
+            return None
+        return tick + max(1, math.floor((patrol.fuel_level - reserve) / burn))
+
+    def _schedule_deadlines(self, incident) -> None:
+        # Ages at which World._resolve_stalled_incidents can act on an incident.
+        close_age = 25 if self.world.operating_mode == "intelligent" else 110
+        for age in (close_age, 70, 180):
+            self._push(incident.created_tick + age, DEADLINE, -incident.incident_id)
+
+    def _schedule_source(self, tick: int) -> None:
+        if self.source is None:
+            return
+        next_tick = self.source.next_event_tick(self.world, tick)
+        if next_tick is not None:
+            self._push(next_tick, INCIDENT_ARRIVAL)
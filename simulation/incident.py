@@ -22,6 +22,9 @@ class Incident:
     def needs_more_units(self) -> bool:
         return len(self.assigned_patrol_ids) < self.required_responders
 
+    def missing_responders(self) -> int:
+        return max(0, self.required_responders - len(self.assigned_patrol_ids))
+
     def assign_patrol(self, patrol_id: int) -> None:
         self.assigned_patrol_ids.add(patrol_id)
 
@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import csv
+import math
+from dataclasses import dataclass
+from pathlib import Path
+
+
+class BaseIncidentSource:
+    # Whatever feeds World.step with new incidents: (x, y, severity) for one tick.
+    def generate_incidents(self, world, tick: int) -> list[tuple[float, float, int]]:
+        raise NotImplementedError
+
+    def remap_zones(self, remap) -> None:
+        pass
+
+    # ---------- event-driven runs ----------
+
+    def next_event_tick(self, world, tick: int) -> int | None:
+        # Earliest tick after `tick` that may bring incidents, or None once nothing more will.
+        # The default polls every tick.
+        return tick + 1
+
+    def event_incidents(self, world, tick: int) -> list[tuple[float, float, int]]:
+        return self.generate_incidents(world, tick)
+
+
+@dataclass
+class MapTransform:
+    # Log coordinates to map coordinates: (x - origin) * scale, per axis.
+    origin_x: float = 0.0
+    origin_y: float = 0.0
+    scale_x: float = 1.0
+    scale_y: float = 1.0
+
+    @classmethod
+    def fit(cls, bounds: tuple[float, float, float, float], width: float, height: float) -> MapTransform:
+        # Stretches the log's (x0, y0, x1, y1) rectangle onto the whole map.
+        x0, y0, x1, y1 = bounds
+        return cls(x0, y0, width / max(x1 - x0, 1e-9), height / max(y1 - y0, 1e-9))
+
+    def apply(self, x: float, y: float) -> tuple[float, float]:
+        return ((x - self.origin_x) * self.scale_x, (y - self.origin_y) * self.scale_y)
+
+
+class IncidentReplaySource(BaseIncidentSource):
+    # Replays a time-sorted incident log instead of sampling the SUE. Rows are pulled one chunk at a
+    # time and only until the current tick, so memory does not grow with the file.
+    #
+    # CSV: header with time, x, y and optionally severity (default 3).
+    # .npy: structured array with the same field names, or an (n, 3|4) array in that column order;
+    # it is memory-mapped and read chunk_rows at a time.
+
+    def __init__(
+        self,
+        file_path: str | Path,
+        time_scale: float = 1.0,
+        start_time: float | None = None,
+        tick_offset: int = 1,
+        transform: MapTransform | None = None,
+        chunk_rows: int = 65_536,
+    ) -> None:
+        self.file_path = Path(file_path)
+        # Log time units per tick: 60 replays a log stamped in seconds one minute per tick.
+        self.time_scale = time_scale
+        self.start_time = start_time
+        self.tick_offset = tick_offset
+        self.transform = transform or MapTransform()
+        self.chunk_rows = max(1, chunk_rows)
+        self.replayed = 0
+        self.dropped = 0
+        self._handle = None
+        self._last_time: float | None = None
+        self._rows = self._npy_rows() if self.file_path.suffix == ".npy" else self._csv_rows()
+        self._pending = next(self._rows, None)
+        if self._pending is not None and self.start_time is None:
+            self.start_time = self._pending[0]
+
+    def _csv_rows(self):
+        self._handle = self.file_path.open(newline="", encoding="utf-8")
+        reader = csv.reader(self._handle)
+        header = [name.strip().lower() for name in next(reader, [])]
+        missing = {"time", "x", "y"} - set(header)
+        if missing:
+            raise ValueError(f"incident log {self.file_path} is missing columns: {sorted(missing)}")
+        t_col, x_col, y_col = header.index("time"), header.index("x"), header.index("y")
+        s_col = header.index("severity") if "severity" in header else None
+        for row in reader:
+            if not row:
+                continue
+            severity = int(float(row[s_col])) if s_col is not None else 3
+            yield float(row[t_col]), float(row[x_col]), float(row[y_col]), severity
+
+    def _npy_rows(self):
+        import numpy as np
+
+        data = np.load(self.file_path, mmap_mode="r")
+        if data.dtype.names:
+            columns = [data["time"], data["x"], data["y"], data["severity"] if "severity" in data.dtype.names else None]
+        elif data.ndim == 2 and data.shape[1] in (3, 4):
+            columns = [data[:, 0], data[:, 1], data[:, 2], data[:, 3] if data.shape[1] == 4 else None]
+        else:
+            raise ValueError(f"incident log {self.file_path} must have time/x/y(/severity) fields or columns")
+        for start in range(0, len(data), self.chunk_rows):
+            stop = start + self.chunk_rows
+            times = columns[0][start:stop].tolist()
+            xs = columns[1][start:stop].tolist()
+            ys = columns[2][start:stop].tolist()
+            severities = columns[3][start:stop].tolist() if columns[3] is not None else [3] * len(times)
+            yield from zip(times, xs, ys, (int(severity) for severity in severities))
+
+    def tick_for(self, timestamp: float) -> int:
+        return self.tick_offset + int(math.floor((timestamp - self.start_time) / self.time_scale))
+
+    def generate_incidents(self, world, tick: int) -> list[tuple[float, float, int]]:
+        # Rows due at or before this tick; anything skipped over by a jump in ticks is caught up.
+        generated: list[tuple[float, float, int]] = []
+        while self._pending is not None and self.tick_for(self._pending[0]) <= tick:
+            timestamp, x, y, severity = self._pending
+            if self._last_time is not None and timestamp < self._last_time:
+                raise ValueError(f"incident log {self.file_path} is not sorted by time near t={timestamp}")
+            self._last_time = timestamp
+            mx, my = self.transform.apply(x, y)
+            if 0.0 <= mx <= world.width and 0.0 <= my <= world.height:
+                generated.append((mx, my, severity))
+                self.replayed += 1
+            else:
+                self.dropped += 1
+            self._pending = next(self._rows, None)
+        if self._pending is None:
+            self.close()
+        return generated
+
+    def next_event_tick(self, world, tick: int) -> int | None:
+        if self._pending is None:
+            return None
+        return max(tick + 1, self.tick_for(self._pending[0]))
+
+    def exhausted(self) -> bool:
+        return self._pending is None
+
+    def close(self) -> None:
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
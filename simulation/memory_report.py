@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+import json
+import os
+import resource
+import sys
+import tracemalloc
+from collections import deque
+from typing import Any, Callable, Mapping
+
+from simulation.phase_profiler import PhaseProfiler
+
+# Containers known to grow with the run, read fresh on every sample (remaps replace some of them).
+COMPONENTS: dict[str, Callable[[Any, Any, Any], Any]] = {
+    "world.incidents": lambda world, predictor, sue: world.incidents,
+    "world.zone_incident_counts": lambda world, predictor, sue: world.zone_incident_counts,
+    "world.risk_map": lambda world, predictor, sue: world.risk_map,
+    "coordinator.alerts": lambda world, predictor, sue: world.central_coordinator.alerts,
+    "coordinator.global_state": lambda world, predictor, sue: world.central_coordinator.global_state,
+    "metrics.incidents_by_tick": lambda world, predictor, sue: world.metrics_engine.incidents_by_tick,
+    "predictor.zone_events": lambda world, predictor, sue: getattr(predictor, "zone_events", None),
+    "sue.recent_events": lambda world, predictor, sue: getattr(sue, "recent_events", None),
+}
+
+_TRACE_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def current_rss_mb() -> float:
+    # Resident set right now; ru_maxrss only ever grows, so it cannot show a trend.
+    try:
+        with open("/proc/self/statm", encoding="ascii") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024.0 * 1024.0)
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024.0 * 1024.0) if sys.platform == "darwin" else peak / 1024.0
+
+
+def deep_size(root: Any) -> int:
+    # sys.getsizeof over everything reachable through containers and instance attributes,
+    # each object counted once. Classes, modules and functions are not followed.
+    seen: set[int] = set()
+    stack = [root]
+    total = 0
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, (type, type(sys), type(deep_size))):
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+            stack.extend(obj)
+        elif not isinstance(obj, (str, bytes, int, float, bool)) and obj is not None:
+            attrs = getattr(obj, "__dict__", None)
+            if attrs is not None:
+                stack.append(attrs)
+            for slot in getattr(type(obj), "__slots__", ()):
+                if hasattr(obj, slot):
+                    stack.append(getattr(obj, slot))
+    return total
+
+
+def element_count(container: Any) -> int:
+    # Entries, or the nested items for dict-of-list histories (zone -> events).
+    if isinstance(container, Mapping):
+        values = container.values()
+        if values and all(isinstance(value, (list, set, deque)) for value in values):
+            return sum(len(value) for value in values)
+    return len(container)
+
+
+class MemoryReport:
+    # Stands in for World.phase_profiler (same begin_tick / lap / count / end_tick calls), so
+    # World.run_phases reports memory per phase. Optionally forwards to a PhaseProfiler.
+    #
+    # Every `interval` ticks: resident set, deep size and element count of each component in
+    # COMPONENTS, and on that one tick tracemalloc runs to give each phase its net allocated
+    # bytes and top allocation sites. Ticks in between run untraced, at full speed.
+
+    def __init__(
+        self,
+        interval: int = 300,
+        top_sites: int = 5,
+        budget_mb: float | None = None,
+        profiler: PhaseProfiler | None = None,
+    ) -> None:
+        self.interval = max(1, interval)
+        self.top_sites = top_sites
+        self.budget_mb = budget_mb
+        self.profiler = profiler
+        self.samples: list[dict] = []
+        self.phase_net_bytes: dict[str, int] = {}
+        self.phase_hotspots: dict[str, list[dict]] = {}
+        self.budget_breaches: list[dict] = []
+        self.ticks = 0
+        self._world = None
+        self._predictor = None
+        self._sue = None
+        self._tick = 0
+        self._last_traced = 0
+        self._snapshot: tracemalloc.Snapshot | None = None
+        self._started_tracing = False
+
+    def attach(self, world, predictor=None, sue=None) -> None:
+        self._world = world
+        self._predictor = predictor
+        self._sue = sue
+        world.phase_profiler = self
+
+    def close(self) -> None:
+        self._snapshot = None
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    # ---------- phase profiler protocol ----------
+
+    def _sampling(self) -> bool:
+        return self._tick % self.interval == 0
+
+    def begin_tick(self, tick: int) -> None:
+        self._tick = tick
+        if self._sampling():
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracing = True
+            self._snapshot = tracemalloc.take_snapshot().filter_traces(_TRACE_FILTERS)
+            self._last_traced = tracemalloc.get_traced_memory()[0]
+        if self.profiler is not None:
+            self.profiler.begin_tick(tick)
+
+    def lap(self, phase: str) -> None:
+        if self.profiler is not None:
+            self.profiler.lap(phase)
+        if self._snapshot is not None:
+            traced = tracemalloc.get_traced_memory()[0]
+            self.phase_net_bytes[phase] = self.phase_net_bytes.get(phase, 0) + traced - self._last_traced
+            snapshot = tracemalloc.take_snapshot().filter_traces(_TRACE_FILTERS)
+            self.phase_hotspots[phase] = [
+                {"site": str(stat.traceback), "size_diff": stat.size_diff, "count_diff": stat.count_diff}
+                for stat in snapshot.compare_to(self._snapshot, "lineno")[: self.top_sites]
+                if stat.size_diff > 0
+            ]
+            self._snapshot = snapshot
+            # The snapshot itself allocates; keep it out of the next phase's net bytes.
+            self._last_traced = tracemalloc.get_traced_memory()[0]
+
+    def count(self, name: str, amount: int = 1) -> None:
+        if self.profiler is not None:
+            self.profiler.count(name, amount)
+
+    def end_tick(self) -> None:
+        if self.profiler is not None:
+            self.profiler.end_tick()
+        self.ticks += 1
+        if self._sampling():
+            self.close()
+            self.sample(self._tick)
+
+    # ---------- API ----------
+
+    def components(self) -> dict[str, dict[str, int]]:
+        sizes: dict[str, dict[str, int]] = {}
+        for name, getter in COMPONENTS.items():
+            container = getter(self._world, self._predictor, self._sue)
+            if container is None:
+                continue
+            sizes[name] = {"bytes": deep_size(container), "elements": element_count(container)}
+        return sizes
+
+    def sample(self, tick: int) -> dict:
+        rss_mb = current_rss_mb()
+        row = {"tick": tick, "rss_mb": rss_mb, "components": self.components()}
+        self.samples.append(row)
+        if self.budget_mb is not None and rss_mb > self.budget_mb:
+            self.budget_breaches.append({"tick": tick, "rss_mb": rss_mb})
+        return row
+
+    def over_budget(self) -> bool:
+        return bool(self.budget_breaches)
+
+    def summary(self) -> dict:
+        return {
+            "ticks": self.ticks,
+            "interval": self.interval,
+            "budget_mb": self.budget_mb,
+            "budget_breaches": self.budget_breaches,
+            "phase_net_bytes": dict(self.phase_net_bytes),
+            "phase_hotspots": self.phase_hotspots,
+            "samples": self.samples,
+        }
+
+    def format_summary(self) -> str:
+        if not self.samples:
+            return f"memoria: sin muestras (intervalo {self.interval} ticks)"
+        first, last = self.samples[0], self.samples[-1]
+        lines = [
+            f"memoria: rss={last['rss_mb']:.1f}MB ({last['rss_mb'] - first['rss_mb']:+.1f}MB) "
+            f"muestras={len(self.samples)} (ticks {first['tick']}-{last['tick']})"
+        ]
+        for name, row in sorted(last["components"].items(), key=lambda item: -item[1]["bytes"]):
+            before = first["components"].get(name, {"bytes": 0})["bytes"]
+            lines.append(
+                f"  {name:<30} {row['bytes'] / 1024:10.1f}KB  {row['elements']:>9} elem  "
+                f"{(row['bytes'] - before) / 1024:+10.1f}KB"
+            )
+        for phase, net in sorted(self.phase_net_bytes.items(), key=lambda item: -item[1]):
+            lines.append(f"  fase {phase:<25} neto {net / 1024:+10.1f}KB en ticks muestreados")
+        if self.budget_breaches:
+            lines.append(f"  presupuesto de {self.budget_mb:g}MB excedido en {len(self.budget_breaches)} muestras")
+        return "\n".join(lines)
+
+    def export_json(self, file_path: str) -> None:
+        with open(file_path, "w", encoding="utf-8") as f:
+            json.dump(self.summary(), f, indent=2)
@@ -5,6 +5,8 @@ import math
 from collections import defaultdict
 from dataclasses import dataclass, field
 
+from simulation.quantile_sketch import ResponseTimeSketches
+
 
 @dataclass
 class MetricsEngine:
@@ -19,26 +21,79 @@ class MetricsEngine:
 
     coverage_sum: float = 0.0
     coverage_samples: int = 0
+    last_coverage: float = 0.0
 
-    incidents_by_tick: dict[int, set[tuple[int, int]]] = field(default_factory=lambda: defaultdict(set))
+    # Flat zone ids (zy * cols + zx) on the world's current grid.
+    incidents_by_tick: dict[int, set[int]] = field(default_factory=lambda: defaultdict(set))
+    response_sketches: ResponseTimeSketches = field(default_factory=ResponseTimeSketches)
 
-    def record_incident_created(self, tick: int, zone: tuple[int, int], anticipated: bool) -> None:
+    def record_incident_created(self, tick: int, zone_id: int, anticipated: bool) -> None:
         self.incidents_total += 1
         if anticipated:
             self.incidents_prevented += 1
-        self.incidents_by_tick[tick].add(zone)
-
-    def record_incident_resolved(self, created_tick: int, resolved_tick: int) -> None:
+        self.incidents_by_tick[tick].add(zone_id)
+
+    def remap_zones(self, remap) -> None:
+        old_cols, new_cols = remap.old.cols, remap.new.cols
+        for tick, zone_ids in self.incidents_by_tick.items():
+            moved = set()
+            for zone_id in zone_ids:
+                zx, zy = remap.zone((zone_id % old_cols, zone_id // old_cols))
+                moved.add(zy * new_cols + zx)
+            self.incidents_by_tick[tick] = moved
+        # Response times are kept per (zx, zy) too; zones that land on the same new one merge.
+        by_zone: dict = {}
+        for zone, sketch in self.response_sketches.by_zone.items():
+            target = remap.zone(zone)
+            if target in by_zone:
+                by_zone[target].merge(sketch)
+            else:
+                by_zone[target] = sketch
+        self.response_sketches.by_zone = by_zone
+
+    def record_incident_resolved(
+        self,
+        created_tick: int,
+        resolved_tick: int,
+        severity: int | None = None,
+        zone: tuple[int, int] | None = None,
+        mode: str | None = None,
+    ) -> None:
         if resolved_tick < created_tick:
             return
+        response_time = float(resolved_tick - created_tick)
         self.resolved_incidents += 1
-        self.total_response_time += float(resolved_tick - created_tick)
-
-    def update_tick(self, world, tick: int, high_risk_zones: set[tuple[int, int]]) -> None:
-        self._update_prediction_confusion(tick, high_risk_zones)
-        self._update_coverage(world)
-
-    def _update_prediction_confusion(self, tick: int, high_risk_zones: set[tuple[int, int]]) -> None:
+        self.total_response_time += response_time
+        self.response_sketches.add(response_time, severity, zone, mode)
+
+    def update_tick(
+        self, world, tick: int, high_risk_zones: set[tuple[int, int]], coverage: float | None = None
+    ) -> None:
+        self._update_prediction_confusion(world, tick, high_risk_zones)
+        # Callers that already computed coverage (e.g. a batched ensemble) pass it in.
+        if coverage is None:
+            self._update_coverage(world)
+        else:
+            self._record_coverage(coverage)
+
+    def update_span(
+        self,
+        world,
+        tick: int,
+        high_risk_zones: set[tuple[int, int]],
+        span: int,
+        quiet_high_risk_zones: set[tuple[int, int]] | None = None,
+    ) -> None:
+        # Event-driven runs: `tick` closes a span of ticks whose earlier ones brought no incident
+        # and kept the previous prediction. Each of them counts as one tick of the fixed loop.
+        quiet = high_risk_zones if quiet_high_risk_zones is None else quiet_high_risk_zones
+        self.fp += len(quiet) * max(0, span - 1)
+        self._update_prediction_confusion(world, tick, high_risk_zones)
+        self._record_coverage(self._coverage_percent(world), weight=max(1, span))
+
+    def _update_prediction_confusion(self, world, tick: int, high_risk_zones: set[tuple[int, int]]) -> None:
+        zone_id = world.partition.zone_id
+        high_risk_zones = {zone_id(zone) for zone in high_risk_zones}
         actual_zones = self.incidents_by_tick.pop(tick, set())
         tp = len(high_risk_zones & actual_zones)
         fp = len(high_risk_zones - actual_zones)
@@ -48,6 +103,9 @@ class MetricsEngine:
         self.fn += fn
 
     def _update_coverage(self, world) -> None:
+        self._record_coverage(self._coverage_percent(world))
+
+    def _coverage_percent(self, world) -> float:
         patrol_positions: list[tuple[float, float, float]] = []
         if world.central_coordinator.global_state:
             for state in world.central_coordinator.global_state.values():
@@ -57,18 +115,35 @@ class MetricsEngine:
         else:
             for patrol in world.patrols:
                 patrol_positions.append((patrol.x, patrol.y, patrol.coverage_radius))
-
-        total_zones = max(1, world.partition.cols * world.partition.rows)
-        covered = 0
-        for zx in range(world.partition.cols):
-            for zy in range(world.partition.rows):
-                cx, cy = world.partition.zone_center((zx, zy))
-                if any(math.hypot(px - cx, py - cy) <= radius for px, py, radius in patrol_positions):
-                    covered += 1
-
-        coverage = (covered / total_zones) * 100.0
-        self.coverage_sum += coverage
-        self.coverage_samples += 1
+        patrol_positions.extend(world.halo_patrols)
+
+        # Only zones whose centre falls inside a unit's radius box can be covered by it, so the
+        # cost follows the fleet rather than the map (which may be a sparse partition).
+        # Coverage is over every cell of the cols x rows grid, live or not, so a quadtree run
+        # reports the same KPI as the dense grid with its cell size instead of one whose
+        # denominator grows as leaves are touched.
+        partition = world.partition
+        cell = partition.cell_size
+        cols = partition.cols
+        centers = world.zone_eta_table().centers
+        covered: set[int] = set()
+        for px, py, radius in patrol_positions:
+            for zx in range(max(0, int((px - radius) // cell)), min(cols - 1, int((px + radius) // cell)) + 1):
+                for zy in range(max(0, int((py - radius) // cell)), min(partition.rows - 1, int((py + radius) // cell)) + 1):
+                    zone_id = zy * cols + zx
+                    if zone_id in covered:
+                        continue
+                    cx, cy = centers[zone_id]
+                    if math.hypot(px - cx, py - cy) <= radius:
+                        covered.add(zone_id)
+
+        total_zones = max(1, cols * partition.rows)
+        return (len(covered) / total_zones) * 100.0
+
+    def _record_coverage(self, coverage: float, weight: int = 1) -> None:
+        self.last_coverage = coverage
+        self.coverage_sum += coverage * weight
+        self.coverage_samples += weight
 
     def snapshot(self) -> dict[str, float]:
         avg_response = (self.total_response_time / self.resolved_incidents) if self.resolved_incidents else 0.0
@@ -85,13 +160,19 @@ class MetricsEngine:
             "prediction_recall": recall,
             "incidents_total": float(self.incidents_total),
             "resolved_incidents": float(self.resolved_incidents),
+            "response_time_p50": self.response_sketches.overall.quantile(0.50),
+            "response_time_p90": self.response_sketches.overall.quantile(0.90),
+            "response_time_p99": self.response_sketches.overall.quantile(0.99),
         }
 
     def to_csv_row(self):
-        header = "avg_response_time,coverage_percent,incidents_prevented,prediction_rate,prediction_precision,prediction_recall,incidents_total,resolved_incidents"
-        row = f"{self.avg_response_time},{self.coverage_percent},{self.incidents_prevented},{self.prediction_rate},{self.prediction_precision},{self.prediction_recall},{self.incidents_total},{self.resolved_incidents}"
-        return header, row
+        return self.csv_row_from_snapshot(self.snapshot())
 
+    @staticmethod
+    def csv_row_from_snapshot(metrics: dict[str, float]) -> tuple[str, str]:
+        header = ",".join(metrics.keys())
+        row = ",".join(str(value) for value in metrics.values())
+        return header, row
 
     def export_csv(self, file_path: str) -> None:
         metrics = self.snapshot()
@@ -104,6 +185,9 @@ class MetricsEngine:
             "prediction_recall",
             "incidents_total",
             "resolved_incidents",
+            "response_time_p50",
+            "response_time_p90",
+            "response_time_p99",
         ]
         with open(file_path, "w", newline="", encoding="utf-8") as f:
             writer = csv.DictWriter(f, fieldnames=fieldnames)
@@ -17,6 +17,27 @@ class PatrolState(str, Enum):
     OUT_OF_SERVICE = "OUT_OF_SERVICE"
 
 
+class FleetResources:
+    # Running fuel and mechanical-health totals of the patrols that point at it (World's fleet).
+    # Patrols add their own deltas, so per-tick fleet means never loop over the fleet.
+
+    __slots__ = ("fuel", "mech")
+
+    def __init__(self) -> None:
+        self.fuel = 0.0
+        self.mech = 0.0
+
+    def add(self, patrol: "Patrol") -> None:
+        patrol.resources = self
+        self.fuel += patrol.fuel_level
+        self.mech += patrol.mechanical_health
+
+    def remove(self, patrol: "Patrol") -> None:
+        patrol.resources = None
+        self.fuel -= patrol.fuel_level
+        self.mech -= patrol.mechanical_health
+
+
 @dataclass
 class Patrol:
     patrol_id: int
@@ -38,6 +59,10 @@ class Patrol:
     engine_temperature: float = 78.0
     tire_pressure: float = 34.0
     current_speed: float = 0.0
+    # Road-network waypoints towards (target_x, target_y); empty means a straight line.
+    route: list[tuple[float, float]] = field(default_factory=list)
+    route_target: Optional[tuple[float, float]] = None
+    resources: Optional[FleetResources] = field(default=None, repr=False, compare=False)
 
     @property
     def pos(self) -> tuple[float, float]:
@@ -92,10 +117,16 @@ class Patrol:
     def has_target(self) -> bool:
         return self.target_x is not None and self.target_y is not None
 
+    def clear_route(self) -> None:
+        self.route = []
+        self.route_target = None
+
     def update_motion(self, dt: float) -> bool:
         if not self.has_target():
             self.current_speed = 0.0
             return False
+        if self.route:
+            return self._follow_route(dt)
 
         dx = self.target_x - self.x
         dy = self.target_y - self.y
@@ -116,17 +147,42 @@ class Patrol:
         self._consume_resources(step)
         return False
 
+    def _follow_route(self, dt: float) -> bool:
+        budget = self.effective_speed() * dt
+        traveled = 0.0
+        while self.route and budget > 0.0:
+            wx, wy = self.route[0]
+            distance = math.hypot(wx - self.x, wy - self.y)
+            if distance <= budget:
+                self.x, self.y = wx, wy
+                budget -= distance
+                traveled += distance
+                self.route.pop(0)
+                continue
+            self.x += (wx - self.x) / distance * budget
+            self.y += (wy - self.y) / distance * budget
+            traveled += budget
+            budget = 0.0
+
+        self._consume_resources(traveled)
+        if not self.route:
+            self.x, self.y = self.target_x, self.target_y
+            self.current_speed = 0.0
+            return True
+        self.current_speed = traveled / max(dt, 1e-6)
+        return False
+
     def on_arrival(self) -> None:
         self.target_x = None
         self.target_y = None
+        self.clear_route()
 
         if self.state == PatrolState.RESPONDING:
             self.task_ticks_remaining = 2
             return
 
         if self.state in {PatrolState.REFUELING, PatrolState.MAINTENANCE, PatrolState.EMERGENCY_RETURN}:
-            self.fuel_level = 1.0
-            self.mechanical_health = 1.0
+            self._set_resources(1.0, 1.0)
             self.engine_temperature = 76.0
             self.tire_pressure = 34.5
             self.task_ticks_remaining = 0
@@ -140,9 +196,18 @@ class Patrol:
                 self.target_incident_id = None
                 self.state = PatrolState.IDLE
 
+    def _set_resources(self, fuel_level: float, mechanical_health: float) -> None:
+        if self.resources is not None:
+            self.resources.fuel += fuel_level - self.fuel_level
+            self.resources.mech += mechanical_health - self.mechanical_health
+        self.fuel_level = fuel_level
+        self.mechanical_health = mechanical_health
+
     def _consume_resources(self, traveled_distance: float) -> None:
-        self.fuel_level = max(0.0, self.fuel_level - traveled_distance * 0.00025)
-        self.mechanical_health = max(0.12, self.mechanical_health - traveled_distance * 0.00006)
+        self._set_resources(
+            max(0.0, self.fuel_level - traveled_distance * 0.00025),
+            max(0.12, self.mechanical_health - traveled_distance * 0.00006),
+        )
         self.engine_temperature = min(120.0, self.engine_temperature + traveled_distance * 0.012 + (1.0 - self.mechanical_health) * 0.25)
         self.tire_pressure = max(27.5, self.tire_pressure - traveled_distance * 0.00012)
         if self.fuel_level <= 0.01 or self.mechanical_health <= 0.1:
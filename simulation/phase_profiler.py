@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import json
+import math
+import time
+from collections import deque
+
+# World.step phases in execution order.
+PHASES = (
+    "incident_generation",
+    "patrol_updates",
+    "stalled_resolution",
+    "telemetry_emit",
+    "telemetry_consume",
+    "dynamic_capacity",
+    "dispatch",
+    "risk_prediction",
+    "rebalancing",
+    "metrics",
+)
+
+
+class RollingHistogram:
+    # Log2 buckets over microseconds for the whole run, plus a bounded window of recent samples.
+    BUCKETS = 32
+
+    def __init__(self, window: int = 1024) -> None:
+        self.buckets = [0] * self.BUCKETS
+        self.window: deque[float] = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float) -> None:
+        micros = seconds * 1e6
+        index = 0 if micros < 1.0 else min(self.BUCKETS - 1, int(math.log2(micros)) + 1)
+        self.buckets[index] += 1
+        self.window.append(seconds)
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q: float) -> float:
+        if not self.window:
+            return 0.0
+        ordered = sorted(self.window)
+        return ordered[min(len(ordered) - 1, int(q * (len(ordered) - 1) + 0.5))]
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "total_ms": self.total * 1000.0,
+            "mean_us": (self.total / self.count * 1e6) if self.count else 0.0,
+            "max_us": self.max * 1e6,
+            "recent_p50_us": self.percentile(0.50) * 1e6,
+            "recent_p90_us": self.percentile(0.90) * 1e6,
+            "recent_p99_us": self.percentile(0.99) * 1e6,
+            "log2_us_buckets": list(self.buckets),
+        }
+
+
+class PhaseProfiler:
+    def __init__(self, window: int = 1024, trace_limit: int = 200_000) -> None:
+        self.window = window
+        self.histograms: dict[str, RollingHistogram] = {name: RollingHistogram(window) for name in PHASES}
+        self.tick_histogram = RollingHistogram(window)
+        self.counters: dict[str, int] = {}
+        self.trace_limit = trace_limit
+        self.trace_events: list[dict] = []
+        self.dropped_trace_events = 0
+        self.ticks = 0
+        self._origin = time.perf_counter()
+        self._tick = 0
+        self._tick_start = 0.0
+        self._last = 0.0
+
+    def begin_tick(self, tick: int) -> None:
+        self._tick = tick
+        self._tick_start = self._last = time.perf_counter()
+
+    def lap(self, phase: str) -> None:
+        now = time.perf_counter()
+        duration = now - self._last
+        histogram = self.histograms.get(phase)
+        if histogram is None:
+            histogram = self.histograms[phase] = RollingHistogram(self.window)
+        histogram.add(duration)
+        self._trace(phase, self._last, duration)
+        self._last = now
+
+    def count(self, name: str, amount: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def end_tick(self) -> None:
+        duration = time.perf_counter() - self._tick_start
+        self.tick_histogram.add(duration)
+        self._trace("tick", self._tick_start, duration)
+        self.ticks += 1
+
+    def _trace(self, name: str, start: float, duration: float) -> None:
+        if len(self.trace_events) >= self.trace_limit:
+            self.dropped_trace_events += 1
+            return
+        self.trace_events.append(
+            {
+                "name": name,
+                "ph": "X",
+                "ts": (start - self._origin) * 1e6,
+                "dur": duration * 1e6,
+                "pid": 0,
+                "tid": 0 if name == "tick" else 1,
+                "args": {"tick": self._tick},
+            }
+        )
+
+    def summary(self) -> dict:
+        tick_total = self.tick_histogram.total or 1e-12
+        phases = {}
+        for name, histogram in self.histograms.items():
+            row = histogram.to_dict()
+            row["share_percent"] = 100.0 * histogram.total / tick_total
+            phases[name] = row
+        return {
+            "ticks": self.ticks,
+            "tick": self.tick_histogram.to_dict(),
+            "phases": phases,
+            "counters": dict(self.counters),
+            "dropped_trace_events": self.dropped_trace_events,
+        }
+
+    def format_summary(self) -> str:
+        summary = self.summary()
+        lines = [f"ticks={summary['ticks']} mean tick={summary['tick']['mean_us']:.1f}us p99={summary['tick']['recent_p99_us']:.1f}us"]
+        for name, row in summary["phases"].items():
+            lines.append(
+                f"  {name:<20} {row['share_percent']:6.2f}%  mean {row['mean_us']:9.1f}us  "
+                f"p99 {row['recent_p99_us']:9.1f}us  max {row['max_us']:9.1f}us"
+            )
+        for name, value in sorted(summary["counters"].items()):
+            lines.append(f"  {name:<20} {value}")
+        return "\n".join(lines)
+
+    def export_chrome_trace(self, file_path: str) -> None:
+        payload = {
+            "traceEvents": [
+                {"name": "thread_name", "ph": "M", "pid": 0, "tid": 0, "args": {"name": "tick"}},
+                {"name": "thread_name", "ph": "M", "pid": 0, "tid": 1, "args": {"name": "phases"}},
+                *self.trace_events,
+            ],
+            "displayTimeUnit": "ms",
+        }
+        with open(file_path, "w", encoding="utf-8") as f:
+            json.dump(payload, f)
@@ -4,6 +4,8 @@ import math
 from collections import defaultdict
 from dataclasses import dataclass
 
+from simulation.zone_map import ZoneArrayMap, zone_history_map
+
 
 @dataclass
 class RiskPredictor:
@@ -19,37 +21,69 @@ class RiskPredictor:
         self.weight_hour /= total
         self.weight_traffic /= total
         self.weight_day /= total
-        self.zone_events: dict[tuple[int, int], list[tuple[int, int]]] = defaultdict(list)
+        # (tick, severity) per zone. A plain dict until the first update_risk_map, which lays it
+        # on the world's grid as a ZoneArrayMap.
+        self.zone_events: ZoneArrayMap | dict[tuple[int, int], list[tuple[int, int]]] = defaultdict(list)
+        self._forgotten_tick = 0
 
     def record_incident(self, zone: tuple[int, int], severity: int, tick: int) -> None:
-        self.zone_events[zone].append((tick, severity))
+        history = self.zone_events.get(zone)
+        if history is None:
+            history = self.zone_events[zone] = []
+        history.append((tick, severity))
+
+    def remap_zones(self, remap) -> None:
+        # Severities are shared out by area, so the decayed history keeps its total. Only the
+        # dense grid is ever repartitioned.
+        self.zone_events = ZoneArrayMap(remap.new.cols, remap.new.rows, items=remap.split_events(self.zone_events))
 
     def update_risk_map(self, world, tick: int) -> None:
-        updated: dict[tuple[int, int], float] = {}
-        traffic_factor = self._traffic_factor(world)
+        partition = world.partition
+        events = self.zone_events = zone_history_map(partition, self.zone_events)
+        # Events older than the horizon weigh nothing; without this every risk update would
+        # walk all incidents since the start of the run.
+        horizon = self._forget_horizon()
+        if tick - self._forgotten_tick >= horizon:
+            self._forgotten_tick = tick
+            # A repartition concatenates histories, so they need not be in tick order.
+            for zone_id, history in events.id_items():
+                if history:
+                    kept = [event for event in history if tick - event[0] <= horizon]
+                    if len(kept) < len(history):
+                        events.set_id(zone_id, kept)
+        updated = ZoneArrayMap.for_partition(partition)
+        density = self._traffic_density(world)
         hour_factor = self._hour_factor(tick)
         day_factor = self._day_factor(tick)
+        counts = world.zone_incident_counts
 
-        for zone in world.all_relevant_zones() | set(self.zone_events.keys()):
-            hist = self._historical_risk(zone, tick)
+        # Ascending ids, so zones with exactly the same risk keep a fixed order downstream.
+        for zone_id in sorted(world.relevant_zone_ids().union(events.ids())):
+            hist = self._historical_risk(events.slots[zone_id], tick)
             bayes_like = (
                 self.weight_hour * hour_factor
-                + self.weight_traffic * traffic_factor.get(zone, 1.0)
+                + self.weight_traffic * (1.0 + 0.05 * density.get(zone_id, 0))
                 + self.weight_day * day_factor
             )
-            prior = self.persistence_floor * math.log1p(world.zone_incident_counts.get(zone, 0))
+            prior = self.persistence_floor * math.log1p(counts.get_id(zone_id, 0))
             risk = (hist * bayes_like) + prior
             if risk > 0.01:
-                updated[zone] = risk
+                updated.set_id(zone_id, risk)
 
         world.risk_map = updated
 
     def high_risk_zones(self, world) -> list[tuple[int, int]]:
-        return [zone for zone, risk in world.risk_map.items() if risk >= self.high_risk_threshold]
+        zone_of = world.partition.zone_of
+        return [zone_of(zone_id) for zone_id, risk in world.risk_map.id_items() if risk >= self.high_risk_threshold]
+
+    _FORGET_WEIGHT = 1e-9
 
-    def _historical_risk(self, zone: tuple[int, int], tick: int) -> float:
+    def _forget_horizon(self) -> float:
+        return math.log(1.0 / self._FORGET_WEIGHT) / max(self.decay_lambda, 1e-9)
+
+    def _historical_risk(self, history: list[tuple[int, int]] | None, tick: int) -> float:
         risk = 0.0
-        for event_tick, severity in self.zone_events.get(zone, []):
+        for event_tick, severity in history or ():
             dt = max(0, tick - event_tick)
             risk += severity * math.exp(-self.decay_lambda * dt)
         return risk
@@ -66,13 +100,9 @@ class RiskPredictor:
         day = (tick // 24) % 7
         return 1.15 if day in (4, 5) else 1.0
 
-    def _traffic_factor(self, world) -> dict[tuple[int, int], float]:
-        density: dict[tuple[int, int], int] = defaultdict(int)
+    def _traffic_density(self, world) -> dict[int, int]:
+        # Units per zone id; the traffic factor is 1 + 0.05 * density.
+        density: dict[int, int] = defaultdict(int)
         for patrol in world.patrols:
-            zone = world.zone_for_point(patrol.x, patrol.y)
-            density[zone] += 1
-
-        factors: dict[tuple[int, int], float] = {}
-        for zone in world.all_relevant_zones() | set(density.keys()):
-            factors[zone] = 1.0 + 0.05 * density.get(zone, 0)
-        return factors
+            density[world.zone_id_for_point(patrol.x, patrol.y)] += 1
+        return density
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import math
+
+
+class QuantileSketch:
+    # Log-bucketed sketch with relative-accuracy guarantees (DDSketch style).
+    # Memory is bounded by max_buckets; when exceeded the lowest buckets are collapsed,
+    # which only degrades accuracy at the low end and keeps tail quantiles exact to the bound.
+
+    def __init__(self, relative_accuracy: float = 0.01, max_buckets: int = 2048) -> None:
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self.gamma = (1.0 + relative_accuracy) / (1.0 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins: dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float, weight: int = 1) -> None:
+        if value < 0.0:
+            value = 0.0
+        self.count += weight
+        self.total += value * weight
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if value <= 1e-9:
+            self.zero_count += weight
+            return
+        index = math.ceil(math.log(value) / self._log_gamma)
+        self.bins[index] = self.bins.get(index, 0) + weight
+        if len(self.bins) > self.max_buckets:
+            self._collapse()
+
+    def _collapse(self) -> None:
+        ordered = sorted(self.bins)
+        overflow = len(ordered) - self.max_buckets
+        target = ordered[overflow]
+        moved = sum(self.bins.pop(index) for index in ordered[:overflow])
+        self.bins[target] += moved
+
+    def merge(self, other: QuantileSketch) -> None:
+        if abs(other.gamma - self.gamma) > 1e-12:
+            raise ValueError("cannot merge sketches with different relative accuracy")
+        for index, count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        if len(self.bins) > self.max_buckets:
+            self._collapse()
+
+    def quantile(self, q: float) -> float:
+        if self.count == 0:
+            return 0.0
+        rank = q * (self.count - 1)
+        if rank < self.zero_count:
+            return 0.0
+        seen = self.zero_count
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if seen > rank:
+                # Midpoint of the bucket in log space keeps the relative error within the bound.
+                value = 2.0 * self.gamma**index / (1.0 + self.gamma)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "max_buckets": self.max_buckets,
+            "bins": {str(index): count for index, count in self.bins.items()},
+            "zero_count": self.zero_count,
+            "count": self.count,
+            "total": self.total,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> QuantileSketch:
+        sketch = cls(data["relative_accuracy"], data["max_buckets"])
+        sketch.bins = {int(index): count for index, count in data["bins"].items()}
+        sketch.zero_count = data["zero_count"]
+        sketch.count = data["count"]
+        sketch.total = data["total"]
+        sketch.min = data["min"] if data["min"] is not None else math.inf
+        sketch.max = data["max"] if data["max"] is not None else -math.inf
+        return sketch
+
+
+class ResponseTimeSketches:
+    def __init__(self, relative_accuracy: float = 0.01) -> None:
+        self.relative_accuracy = relative_accuracy
+        self.overall = QuantileSketch(relative_accuracy)
+        self.by_severity: dict[int, QuantileSketch] = {}
+        self.by_zone: dict[tuple[int, int], QuantileSketch] = {}
+        self.by_mode: dict[str, QuantileSketch] = {}
+
+    def _sketch(self, table: dict, key) -> QuantileSketch:
+        sketch = table.get(key)
+        if sketch is None:
+            sketch = table[key] = QuantileSketch(self.relative_accuracy)
+        return sketch
+
+    def add(self, response_time: float, severity: int | None = None, zone: tuple[int, int] | None = None, mode: str | None = None) -> None:
+        self.overall.add(response_time)
+        if severity is not None:
+            self._sketch(self.by_severity, severity).add(response_time)
+        if zone is not None:
+            self._sketch(self.by_zone, zone).add(response_time)
+        if mode:
+            self._sketch(self.by_mode, mode).add(response_time)
+
+    def merge(self, other: ResponseTimeSketches) -> None:
+        self.overall.merge(other.overall)
+        for table, other_table in (
+            (self.by_severity, other.by_severity),
+            (self.by_zone, other.by_zone),
+            (self.by_mode, other.by_mode),
+        ):
+            for key, sketch in other_table.items():
+                self._sketch(table, key).merge(sketch)
+
+    def percentiles(self, quantiles: tuple[float, ...] = (0.5, 0.9, 0.99)) -> dict:
+        def row(sketch: QuantileSketch) -> dict[str, float]:
+            return {f"p{round(q * 100)}": sketch.quantile(q) for q in quantiles} | {"count": sketch.count}
+
+        return {
+            "overall": row(self.overall),
+            "by_severity": {key: row(s) for key, s in sorted(self.by_severity.items())},
+            "by_zone": {key: row(s) for key, s in sorted(self.by_zone.items())},
+            "by_mode": {key: row(s) for key, s in sorted(self.by_mode.items())},
+        }
+
+    def to_dict(self) -> dict:
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "overall": self.overall.to_dict(),
+            "by_severity": {str(key): s.to_dict() for key, s in self.by_severity.items()},
+            "by_zone": {f"{key[0]},{key[1]}": s.to_dict() for key, s in self.by_zone.items()},
+            "by_mode": {key: s.to_dict() for key, s in self.by_mode.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> ResponseTimeSketches:
+        sketches = cls(data["relative_accuracy"])
+        sketches.overall = QuantileSketch.from_dict(data["overall"])
+        sketches.by_severity = {int(key): QuantileSketch.from_dict(s) for key, s in data["by_severity"].items()}
+        sketches.by_zone = {
+            tuple(int(part) for part in key.split(",")): QuantileSketch.from_dict(s) for key, s in data["by_zone"].items()
+        }
+        sketches.by_mode = {key: QuantileSketch.from_dict(s) for key, s in data["by_mode"].items()}
+        return sketches
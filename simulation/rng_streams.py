@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+import hashlib
+import random
+
+
+class RngStreams:
+    # One independent generator per exogenous subsystem, derived from the run seed.
+    # Runs that share a seed see identical streams regardless of dispatch policy.
+    LAYOUT = "world_layout"
+    PATROL_SPEEDS = "patrol_speeds"
+    SUE = "sue_incidents"
+    DYNAMIC_SPAWNS = "dynamic_spawns"
+    ROAD_NETWORK = "road_network"
+
+    def __init__(self, seed: int) -> None:
+        self.seed = seed
+        self._streams: dict[str, random.Random] = {}
+
+    def seed_for(self, name: str) -> int:
+        digest = hashlib.sha256(f"{self.seed}:{name}".encode("utf-8")).digest()
+        return int.from_bytes(digest[:8], "big")
+
+    def stream(self, name: str) -> random.Random:
+        rng = self._streams.get(name)
+        if rng is None:
+            rng = random.Random(self.seed_for(name))
+            self._streams[name] = rng
+        return rng
@@ -0,0 +1,274 @@
+from __future__ import annotations
+
+import heapq
+import json
+import math
+import random
+from pathlib import Path
+
+
+class RoadNetwork:
+    # Undirected street graph with a hub-labelling index built on top of a contraction hierarchy.
+    # Node-to-node distance is the min over shared hubs of the two labels, so a query is a
+    # dictionary scan of a few dozen entries instead of a Dijkstra over the whole map.
+
+    def __init__(self, nodes: list[tuple[float, float]], edges: list[tuple[int, int]]) -> None:
+        self.nodes = [(float(x), float(y)) for x, y in nodes]
+        self.adjacency: list[dict[int, float]] = [{} for _ in self.nodes]
+        for u, v in edges:
+            if u == v:
+                continue
+            length = math.hypot(self.nodes[u][0] - self.nodes[v][0], self.nodes[u][1] - self.nodes[v][1])
+            if length < self.adjacency[u].get(v, math.inf):
+                self.adjacency[u][v] = length
+                self.adjacency[v][u] = length
+
+        self.bucket_size = self._default_bucket_size()
+        self._buckets: dict[tuple[int, int], list[int]] = {}
+        for index, (x, y) in enumerate(self.nodes):
+            self._buckets.setdefault(self._bucket(x, y), []).append(index)
+
+        self._labels: list[dict[int, tuple[float, int]]] | None = None
+        self._middle: dict[tuple[int, int], int] = {}
+
+    @classmethod
+    def grid(
+        cls,
+        width: float,
+        height: float,
+        spacing: float = 40.0,
+        closed_fraction: float = 0.12,
+        rng: random.Random | None = None,
+    ) -> RoadNetwork:
+        # Manhattan-style blocks; a random spanning tree is always kept so every street stays reachable.
+        rng = rng or random.Random(0)
+        cols = max(2, int(width // spacing))
+        rows = max(2, int(height // spacing))
+        offset_x = (width - (cols - 1) * spacing) / 2.0
+        offset_y = (height - (rows - 1) * spacing) / 2.0
+        nodes = [(offset_x + c * spacing, offset_y + r * spacing) for r in range(rows) for c in range(cols)]
+
+        edges = []
+        for r in range(rows):
+            for c in range(cols):
+                index = r * cols + c
+                if c + 1 < cols:
+                    edges.append((index, index + 1))
+                if r + 1 < rows:
+                    edges.append((index, index + cols))
+        rng.shuffle(edges)
+
+        parent = list(range(len(nodes)))
+
+        def find(node: int) -> int:
+            while parent[node] != node:
+                parent[node] = parent[parent[node]]
+                node = parent[node]
+            return node
+
+        kept = []
+        optional = []
+        for u, v in edges:
+            ru, rv = find(u), find(v)
+            if ru != rv:
+                parent[ru] = rv
+                kept.append((u, v))
+            else:
+                optional.append((u, v))
+        closed = int(len(edges) * closed_fraction)
+        kept.extend(optional[closed:])
+        return cls(nodes, kept)
+
+    @classmethod
+    def load(cls, file_path: str | Path) -> RoadNetwork:
+        # {"nodes": [[x, y], ...], "edges": [[u, v], ...]}
+        data = json.loads(Path(file_path).read_text(encoding="utf-8"))
+        return cls([tuple(node) for node in data["nodes"]], [(int(u), int(v)) for u, v in data["edges"]])
+
+    def edges(self):
+        for u, neighbors in enumerate(self.adjacency):
+            for v in neighbors:
+                if u < v:
+                    yield u, v
+
+    # ---------- nearest node ----------
+
+    def _default_bucket_size(self) -> float:
+        lengths = [length for neighbors in self.adjacency for length in neighbors.values()]
+        return max(1.0, sum(lengths) / len(lengths)) if lengths else 50.0
+
+    def _bucket(self, x: float, y: float) -> tuple[int, int]:
+        return (int(x // self.bucket_size), int(y // self.bucket_size))
+
+    def nearest_node(self, x: float, y: float) -> int:
+        bx, by = self._bucket(x, y)
+        best = -1
+        best_dist = math.inf
+        ring = 0
+        while True:
+            for ix in range(bx - ring, bx + ring + 1):
+                for iy in range(by - ring, by + ring + 1):
+                    if max(abs(ix - bx), abs(iy - by)) != ring:
+                        continue
+                    for index in self._buckets.get((ix, iy), ()):
+                        nx, ny = self.nodes[index]
+                        dist = math.hypot(nx - x, ny - y)
+                        if dist < best_dist:
+                            best_dist = dist
+                            best = index
+            # Anything in a farther ring is at least ring * bucket_size away.
+            if best >= 0 and best_dist <= ring * self.bucket_size:
+                return best
+            ring += 1
+            if ring > 10_000:
+                return best
+
+    # ---------- preprocessing ----------
+
+    def precompute(self, witness_settle_limit: int = 60) -> None:
+        n = len(self.nodes)
+        graph = [dict(neighbors) for neighbors in self.adjacency]
+        contracted = [False] * n
+        contracted_neighbors = [0] * n
+        upward: list[dict[int, float]] = [{} for _ in range(n)]
+        middle: dict[tuple[int, int], int] = {}
+
+        def witness_distances(source: int, excluded: int, limit: float) -> dict[int, float]:
+            dist = {source: 0.0}
+            heap = [(0.0, source)]
+            settled = 0
+            while heap and settled < witness_settle_limit:
+                d, node = heapq.heappop(heap)
+                if d > dist.get(node, math.inf) or d > limit:
+                    continue
+                settled += 1
+                for neighbor, weight in graph[node].items():
+                    if neighbor == excluded or contracted[neighbor]:
+                        continue
+                    nd = d + weight
+                    if nd < dist.get(neighbor, math.inf):
+                        dist[neighbor] = nd
+                        heapq.heappush(heap, (nd, neighbor))
+            return dist
+
+        def shortcuts(node: int) -> list[tuple[int, int, float]]:
+            neighbors = [(u, w) for u, w in graph[node].items() if not contracted[u]]
+            needed = []
+            for i, (u, wu) in enumerate(neighbors[:-1]):
+                rest = neighbors[i + 1 :]
+                dist = witness_distances(u, node, wu + max(w for _, w in rest))
+                for x, wx in rest:
+                    if dist.get(x, math.inf) > wu + wx + 1e-9:
+                        needed.append((u, x, wu + wx))
+            return needed
+
+        def priority(node: int) -> float:
+            degree = sum(1 for u in graph[node] if not contracted[u])
+            return len(shortcuts(node)) - degree + contracted_neighbors[node]
+
+        heap = [(priority(node), node) for node in range(n)]
+        heapq.heapify(heap)
+        order = []
+        while heap:
+            _, node = heapq.heappop(heap)
+            if contracted[node]:
+                continue
+            # Lazy update: re-evaluate and push back if it is no longer the cheapest node.
+            current = priority(node)
+            if heap and current > heap[0][0]:
+                heapq.heappush(heap, (current, node))
+                continue
+
+            for u, x, weight in shortcuts(node):
+                if weight < graph[u].get(x, math.inf):
+                    graph[u][x] = graph[x][u] = weight
+                    middle[(u, x)] = middle[(x, u)] = node
+            upward[node] = {u: w for u, w in graph[node].items() if not contracted[u]}
+            for u in upward[node]:
+                contracted_neighbors[u] += 1
+            contracted[node] = True
+            order.append(node)
+
+        # Labels from the top of the hierarchy down: a node's label is its upward neighbours'
+        # labels shifted by the edge weight. Each entry keeps the neighbour it came through.
+        labels: list[dict[int, tuple[float, int]]] = [{} for _ in range(n)]
+        for node in reversed(order):
+            label = {node: (0.0, node)}
+            for u, weight in upward[node].items():
+                for hub, (d, _) in labels[u].items():
+                    nd = d + weight
+                    if nd < label.get(hub, (math.inf, 0))[0]:
+                        label[hub] = (nd, u)
+            labels[node] = label
+
+        self._labels = labels
+        self._middle = middle
+
+    def _ensure_index(self) -> list[dict[int, tuple[float, int]]]:
+        if self._labels is None:
+            self.precompute()
+        return self._labels
+
+    # ---------- queries ----------
+
+    def _best_hub(self, a: int, b: int) -> tuple[float, int]:
+        labels = self._ensure_index()
+        label_a, label_b = labels[a], labels[b]
+        if len(label_a) > len(label_b):
+            label_a, label_b = label_b, label_a
+        best = math.inf
+        best_hub = -1
+        for hub, (d, _) in label_a.items():
+            other = label_b.get(hub)
+            if other is not None and d + other[0] < best:
+                best = d + other[0]
+                best_hub = hub
+        return best, best_hub
+
+    def node_distance(self, a: int, b: int) -> float:
+        if a == b:
+            return 0.0
+        return self._best_hub(a, b)[0]
+
+    def travel_distance(self, a: tuple[float, float], b: tuple[float, float]) -> float:
+        # Off-network legs to/from the nearest intersection are straight lines.
+        start = self.nearest_node(a[0], a[1])
+        end = self.nearest_node(b[0], b[1])
+        if start == end:
+            return math.hypot(a[0] - b[0], a[1] - b[1])
+        sx, sy = self.nodes[start]
+        ex, ey = self.nodes[end]
+        return math.hypot(a[0] - sx, a[1] - sy) + self.node_distance(start, end) + math.hypot(ex - b[0], ey - b[1])
+
+    def _unpack(self, u: int, v: int) -> list[int]:
+        mid = self._middle.get((u, v))
+        if mid is None:
+            return [u, v]
+        return self._unpack(u, mid) + self._unpack(mid, v)[1:]
+
+    def _path_to_hub(self, node: int, hub: int) -> list[int]:
+        labels = self._labels
+        path = [node]
+        while node != hub:
+            via = labels[node][hub][1]
+            path.extend(self._unpack(node, via)[1:])
+            node = via
+        return path
+
+    def node_path(self, a: int, b: int) -> list[int]:
+        if a == b:
+            return [a]
+        distance, hub = self._best_hub(a, b)
+        if hub < 0:
+            return [a, b]
+        forward = self._path_to_hub(a, hub)
+        backward = self._path_to_hub(b, hub)
+        return forward + backward[-2::-1]
+
+    def route(self, a: tuple[float, float], b: tuple[float, float]) -> list[tuple[float, float]]:
+        # Waypoints from a to b; the last one is b itself.
+        start = self.nearest_node(a[0], a[1])
+        end = self.nearest_node(b[0], b[1])
+        if start == end:
+            return [b]
+        return [self.nodes[node] for node in self.node_path(start, end)] + [b]
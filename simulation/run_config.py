@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from dataclasses import MISSING, asdict, dataclass, field, fields
+from typing import Any
+
+from simulation.dispatcher import DispatchWeights
+from simulation.predictor import RiskPredictor
+from simulation.sue import StochasticUrbanSimulator
+from simulation.world import World
+
+
+def _dataclass_defaults(cls) -> dict[str, Any]:
+    defaults: dict[str, Any] = {}
+    for f in fields(cls):
+        if not f.init:
+            continue
+        if f.default is not MISSING and isinstance(f.default, (int, float, str, bool)):
+            defaults[f.name] = f.default
+    return defaults
+
+
+_WORLD_PARAMS = _dataclass_defaults(World)
+
+
+@dataclass
+class RunConfig:
+    mode: str = "intelligent"
+    seed: int = 42
+    ticks: int = 3600
+    width: int = 1100
+    height: int = 700
+    patrol_count: int = 16
+    # "grid" for a generated street grid, a JSON file path, or None for straight-line travel.
+    road_network: str | None = None
+    # "adaptive" for the capped uniform grid, "quadtree" for fixed fine leaves created lazily.
+    partition: str = "adaptive"
+    leaf_size: float = 100.0
+    # .npy base-risk raster covering the map (row 0 at y = 0); None keeps synthetic hotspots.
+    crime_raster: str | None = None
+    # Time-sorted incident log (.csv or .npy) replayed instead of the SUE; see IncidentReplaySource.
+    incident_log: str | None = None
+    incident_time_scale: float = 1.0
+    # (x0, y0, x1, y1) of the log's coordinates, stretched onto the map; None uses them as-is.
+    incident_bounds: list[float] | None = None
+    # Edge and disconnect alerts kept in memory; older ones are dropped, or appended to alert_spill.
+    alert_capacity: int = 65_536
+    alert_spill: str | None = None
+    weights: DispatchWeights = field(default_factory=DispatchWeights)
+    # Overrides applied on top of the dataclass defaults of each subsystem.
+    predictor: dict[str, float] = field(default_factory=dict)
+    sue: dict[str, float] = field(default_factory=dict)
+    world: dict[str, float] = field(default_factory=dict)
+
+    def predictor_params(self) -> dict[str, Any]:
+        params = _dataclass_defaults(RiskPredictor)
+        params.update(self.predictor)
+        return params
+
+    def sue_params(self) -> dict[str, Any]:
+        params = _dataclass_defaults(StochasticUrbanSimulator)
+        params.pop("seed", None)
+        params.update(self.sue)
+        return params
+
+    def world_params(self) -> dict[str, Any]:
+        return dict(self.world)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "seed": self.seed,
+            "ticks": self.ticks,
+            "width": self.width,
+            "height": self.height,
+            "patrol_count": self.patrol_count,
+            "road_network": self.road_network,
+            "partition": self.partition,
+            "leaf_size": self.leaf_size,
+            "crime_raster": self.crime_raster,
+            "incident_log": self.incident_log,
+            "incident_time_scale": self.incident_time_scale,
+            "incident_bounds": self.incident_bounds,
+            "alert_capacity": self.alert_capacity,
+            "alert_spill": self.alert_spill,
+            "weights": asdict(self.weights),
+            "predictor": self.predictor_params(),
+            "sue": self.sue_params(),
+            "world": self.world_params(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> RunConfig:
+        return cls(
+            mode=data.get("mode", "intelligent"),
+            seed=int(data.get("seed", 42)),
+            ticks=int(data.get("ticks", 3600)),
+            width=int(data.get("width", 1100)),
+            height=int(data.get("height", 700)),
+            patrol_count=int(data.get("patrol_count", 16)),
+            road_network=data.get("road_network"),
+            partition=data.get("partition", "adaptive"),
+            leaf_size=float(data.get("leaf_size", 100.0)),
+            crime_raster=data.get("crime_raster"),
+            incident_log=data.get("incident_log"),
+            incident_time_scale=float(data.get("incident_time_scale", 1.0)),
+            incident_bounds=data.get("incident_bounds"),
+            alert_capacity=int(data.get("alert_capacity", 65_536)),
+            alert_spill=data.get("alert_spill"),
+            weights=DispatchWeights(**data.get("weights", {})),
+            predictor=dict(data.get("predictor", {})),
+            sue=dict(data.get("sue", {})),
+            world=dict(data.get("world", {})),
+        )
+
+    def with_params(self, params: dict[str, Any]) -> RunConfig:
+        # Dotted names select the subsystem: "weights.w1_eta", "predictor.high_risk_threshold",
+        # "world.fuel_low_threshold", "sue.contagion_weight" or a top-level field such as "ticks".
+        data = self.to_dict()
+        for name, value in params.items():
+            section, _, attr = name.partition(".")
+            if not attr:
+                if section not in data or isinstance(data[section], dict):
+                    raise KeyError(f"unknown run parameter: {name}")
+                data[section] = value
+                continue
+            if section not in {"weights", "predictor", "sue", "world"}:
+                raise KeyError(f"unknown run parameter section: {name}")
+            known = _WORLD_PARAMS if section == "world" else data[section]
+            if attr not in known:
+                raise KeyError(f"unknown run parameter: {name}")
+            data[section][attr] = value
+        return RunConfig.from_dict(data)
+
+    def config_hash(self) -> str:
+        payload = json.dumps(self.to_dict(), sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
@@ -0,0 +1,327 @@
+from __future__ import annotations
+
+import mmap
+import struct
+from pathlib import Path
+
+import numpy as np
+
+from simulation.snapshot_buffer import STATE_CODES, STATES_BY_CODE, IncidentView, PartitionView, PatrolView, WorldSnapshot
+
+# File layout (little endian):
+#   header | chunk* | index chunk | trailer
+#   chunk   = kind u8, tick u32, payload length u32, payload
+#   keyframe: full state (layout, patrols, active incidents, assignments, risk grid)
+#   delta:    changes since the previous tick (patrol upserts/removals, incident
+#             create/resolve, (un)assignments, changed risk cells)
+#   index:    per tick (chunk offset, tick of its keyframe) so seek() is O(1) + <= K deltas
+MAGIC = b"AOURUN1\0"
+INDEX_MAGIC = b"AOURIDX\0"
+HEADER = struct.Struct("<8sIIff")
+CHUNK = struct.Struct("<BII")
+TRAILER = struct.Struct("<Q8s")
+KEY_HEAD = struct.Struct("<IIfIffIIII")
+DELTA_HEAD = struct.Struct("<IIIIIII")
+
+KEYFRAME, DELTA, INDEX = 1, 2, 3
+
+PATROL = np.dtype([("id", "<u4"), ("x", "<f4"), ("y", "<f4"), ("state", "u1"), ("coverage", "<f4")])
+INCIDENT = np.dtype([("id", "<u4"), ("x", "<f4"), ("y", "<f4"), ("required", "<u2")])
+ASSIGNMENT = np.dtype([("incident", "<u4"), ("patrol", "<u4")])
+RISK_CELL = np.dtype([("index", "<u4"), ("value", "<f4")])
+ID = np.dtype("<u4")
+INDEX_ENTRY = np.dtype([("offset", "<u8"), ("keyframe", "<u4")])
+
+
+class RunRecorder:
+    def __init__(self, file_path: str | Path, keyframe_interval: int = 300) -> None:
+        self.file_path = Path(file_path)
+        self.keyframe_interval = max(1, keyframe_interval)
+        self._file = None
+        self._index: list[tuple[int, int]] = []
+        self._last_keyframe = 0
+        self._layout_version = None
+        self._patrols: dict[int, tuple] = {}
+        self._incidents: dict[int, set[int]] = {}
+        self._risk: np.ndarray | None = None
+        self.bytes_written = 0
+
+    def record(self, world, tick: int) -> None:
+        if self._file is None:
+            self._file = self.file_path.open("wb")
+            self._write(HEADER.pack(MAGIC, 1, self.keyframe_interval, world.width, world.height))
+
+        patrols = {
+            p.patrol_id: (np.float32(p.x), np.float32(p.y), STATE_CODES[p.state], np.float32(p.coverage_radius))
+            for p in world.patrols
+        }
+        incidents = {i.incident_id: i for i in world.incidents.values() if i.active}
+        risk = self._risk_grid(world)
+
+        offset = self.bytes_written
+        # Layout changes (recalculate_zones) reshape the risk grid, so they always start a keyframe.
+        if (
+            not self._index
+            or tick - self._last_keyframe >= self.keyframe_interval
+            or world.layout_version != self._layout_version
+        ):
+            self._write_keyframe(world, tick, patrols, incidents, risk)
+            self._last_keyframe = tick
+            self._layout_version = world.layout_version
+        else:
+            self._write_delta(tick, patrols, incidents, risk)
+
+        while len(self._index) < tick:
+            # Ticks that were never recorded resolve to the previous chunk.
+            self._index.append(self._index[-1] if self._index else (offset, tick))
+        self._index.append((offset, self._last_keyframe))
+        self._patrols = patrols
+        self._incidents = {incident_id: set(incident.assigned_patrol_ids) for incident_id, incident in incidents.items()}
+        self._risk = risk
+
+    def close(self) -> None:
+        if self._file is None:
+            return
+        index = np.array(self._index, dtype=INDEX_ENTRY)
+        index_offset = self.bytes_written
+        self._write(CHUNK.pack(INDEX, len(self._index), index.nbytes))
+        self._write(index.tobytes())
+        self._write(TRAILER.pack(index_offset, INDEX_MAGIC))
+        self._file.close()
+        self._file = None
+
+    def _write(self, data: bytes) -> None:
+        self._file.write(data)
+        self.bytes_written += len(data)
+
+    def _chunk(self, kind: int, tick: int, parts: list[bytes]) -> None:
+        payload = b"".join(parts)
+        self._write(CHUNK.pack(kind, tick, len(payload)))
+        self._write(payload)
+
+    @staticmethod
+    def _risk_grid(world) -> np.ndarray:
+        risk = np.zeros(world.partition.cols * world.partition.rows, dtype=np.float32)
+        for zone_id, value in world.risk_map.id_items():
+            risk[zone_id] = value
+        return risk
+
+    def _write_keyframe(self, world, tick: int, patrols: dict, incidents: dict, risk: np.ndarray) -> None:
+        partition = world.partition
+        stations = np.array(world.gas_stations, dtype="<f4").reshape(-1, 2)
+        patrol_rows = np.array([(pid, *row) for pid, row in patrols.items()], dtype=PATROL)
+        incident_rows = np.array(
+            [(i.incident_id, i.x, i.y, i.required_responders) for i in incidents.values()], dtype=INCIDENT
+        )
+        assignments = np.array(
+            [(i.incident_id, pid) for i in incidents.values() for pid in sorted(i.assigned_patrol_ids)], dtype=ASSIGNMENT
+        )
+        head = KEY_HEAD.pack(
+            partition.cols,
+            partition.rows,
+            partition.cell_size,
+            world.layout_version,
+            world.mechanic_base[0],
+            world.mechanic_base[1],
+            len(stations),
+            len(patrol_rows),
+            len(incident_rows),
+            len(assignments),
+        )
+        parts = [head, stations.tobytes(), patrol_rows.tobytes(), incident_rows.tobytes(), assignments.tobytes(), risk.tobytes()]
+        self._chunk(KEYFRAME, tick, parts)
+
+    def _write_delta(self, tick: int, patrols: dict, incidents: dict, risk: np.ndarray) -> None:
+        previous = self._patrols
+        upserts = np.array([(pid, *row) for pid, row in patrols.items() if previous.get(pid) != row], dtype=PATROL)
+        removed_patrols = np.array([pid for pid in previous if pid not in patrols], dtype=ID)
+        created = np.array(
+            [(i.incident_id, i.x, i.y, i.required_responders) for i in incidents.values() if i.incident_id not in self._incidents],
+            dtype=INCIDENT,
+        )
+        resolved = np.array([incident_id for incident_id in self._incidents if incident_id not in incidents], dtype=ID)
+        empty: set[int] = set()
+        assigned = np.array(
+            [
+                (i.incident_id, pid)
+                for i in incidents.values()
+                for pid in sorted(i.assigned_patrol_ids - self._incidents.get(i.incident_id, empty))
+            ],
+            dtype=ASSIGNMENT,
+        )
+        unassigned = np.array(
+            [
+                (i.incident_id, pid)
+                for i in incidents.values()
+                for pid in sorted(self._incidents.get(i.incident_id, empty) - i.assigned_patrol_ids)
+            ],
+            dtype=ASSIGNMENT,
+        )
+        changed = np.flatnonzero(risk != self._risk)
+        risk_cells = np.empty(len(changed), dtype=RISK_CELL)
+        risk_cells["index"] = changed
+        risk_cells["value"] = risk[changed]
+
+        head = DELTA_HEAD.pack(
+            len(upserts), len(removed_patrols), len(created), len(resolved), len(assigned), len(unassigned), len(risk_cells)
+        )
+        parts = [
+            head,
+            upserts.tobytes(),
+            removed_patrols.tobytes(),
+            created.tobytes(),
+            resolved.tobytes(),
+            assigned.tobytes(),
+            unassigned.tobytes(),
+            risk_cells.tobytes(),
+        ]
+        self._chunk(DELTA, tick, parts)
+
+
+class RunPlayer:
+    # Memory-mapped reader; seek(tick) loads the nearest keyframe and applies at most K deltas.
+
+    def __init__(self, file_path: str | Path) -> None:
+        self.file_path = Path(file_path)
+        self._file = self.file_path.open("rb")
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, _, self.keyframe_interval, self.width, self.height = HEADER.unpack_from(self._data, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{self.file_path} no es una grabacion valida")
+        self._index = self._load_index()
+        self.current_tick: int | None = None
+        self._layout: dict = {}
+        self._patrols: dict[int, list] = {}
+        self._incidents: dict[int, list] = {}
+        self._risk: np.ndarray | None = None
+
+    @property
+    def last_tick(self) -> int:
+        return len(self._index) - 1
+
+    def _load_index(self) -> np.ndarray:
+        data = self._data
+        if len(data) >= HEADER.size + TRAILER.size:
+            index_offset, magic = TRAILER.unpack_from(data, len(data) - TRAILER.size)
+            if magic == INDEX_MAGIC:
+                _, count, length = CHUNK.unpack_from(data, index_offset)
+                return np.frombuffer(data, dtype=INDEX_ENTRY, count=count, offset=index_offset + CHUNK.size)
+        # Interrupted recording: rebuild the index with a linear scan.
+        entries: list[tuple[int, int]] = []
+        offset = HEADER.size
+        keyframe = 0
+        while offset + CHUNK.size <= len(data):
+            kind, tick, length = CHUNK.unpack_from(data, offset)
+            if kind == INDEX or offset + CHUNK.size + length > len(data):
+                break
+            if kind == KEYFRAME:
+                keyframe = tick
+            while len(entries) < tick:
+                entries.append(entries[-1] if entries else (offset, tick))
+            entries.append((offset, keyframe))
+            offset += CHUNK.size + length
+        return np.array(entries, dtype=INDEX_ENTRY)
+
+    def seek(self, tick: int) -> WorldSnapshot:
+        tick = max(0, min(tick, self.last_tick))
+        keyframe = int(self._index[tick]["keyframe"])
+        current = self.current_tick
+        if current is None or not (keyframe <= current <= tick):
+            self._apply_chunk(keyframe)
+            current = keyframe
+        for step in range(current + 1, tick + 1):
+            if int(self._index[step]["offset"]) != int(self._index[step - 1]["offset"]):
+                self._apply_chunk(step)
+        self.current_tick = tick
+        return self.snapshot()
+
+    def _apply_chunk(self, tick: int) -> None:
+        offset = int(self._index[tick]["offset"])
+        kind, _, _ = CHUNK.unpack_from(self._data, offset)
+        offset += CHUNK.size
+        if kind == KEYFRAME:
+            self._apply_keyframe(offset)
+        else:
+            self._apply_delta(offset)
+
+    def _array(self, dtype: np.dtype, count: int, offset: int) -> tuple[np.ndarray, int]:
+        array = np.frombuffer(self._data, dtype=dtype, count=count, offset=offset)
+        return array, offset + array.nbytes
+
+    def _apply_keyframe(self, offset: int) -> None:
+        cols, rows, cell, layout_version, mech_x, mech_y, n_gas, n_patrols, n_incidents, n_assigned = KEY_HEAD.unpack_from(
+            self._data, offset
+        )
+        offset += KEY_HEAD.size
+        stations, offset = self._array(np.dtype("<f4"), 2 * n_gas, offset)
+        patrols, offset = self._array(PATROL, n_patrols, offset)
+        incidents, offset = self._array(INCIDENT, n_incidents, offset)
+        assignments, offset = self._array(ASSIGNMENT, n_assigned, offset)
+        risk, offset = self._array(np.dtype("<f4"), cols * rows, offset)
+
+        self._layout = {
+            "partition": PartitionView(cols, rows, cell, self.width, self.height),
+            "layout_version": layout_version,
+            "mechanic_base": (mech_x, mech_y),
+            "gas_stations": [(float(x), float(y)) for x, y in stations.reshape(-1, 2)],
+        }
+        self._patrols = {int(row["id"]): list(row)[1:] for row in patrols}
+        self._incidents = {int(row["id"]): [float(row["x"]), float(row["y"]), int(row["required"]), set()] for row in incidents}
+        for row in assignments:
+            self._incidents[int(row["incident"])][3].add(int(row["patrol"]))
+        self._risk = risk.copy()
+
+    def _apply_delta(self, offset: int) -> None:
+        n_upserts, n_removed, n_created, n_resolved, n_assigned, n_unassigned, n_risk = DELTA_HEAD.unpack_from(
+            self._data, offset
+        )
+        offset += DELTA_HEAD.size
+        upserts, offset = self._array(PATROL, n_upserts, offset)
+        removed, offset = self._array(ID, n_removed, offset)
+        created, offset = self._array(INCIDENT, n_created, offset)
+        resolved, offset = self._array(ID, n_resolved, offset)
+        assigned, offset = self._array(ASSIGNMENT, n_assigned, offset)
+        unassigned, offset = self._array(ASSIGNMENT, n_unassigned, offset)
+        risk_cells, offset = self._array(RISK_CELL, n_risk, offset)
+
+        for row in upserts:
+            self._patrols[int(row["id"])] = list(row)[1:]
+        for patrol_id in removed:
+            self._patrols.pop(int(patrol_id), None)
+        for row in created:
+            self._incidents[int(row["id"])] = [float(row["x"]), float(row["y"]), int(row["required"]), set()]
+        for incident_id in resolved:
+            self._incidents.pop(int(incident_id), None)
+        for row in assigned:
+            incident = self._incidents.get(int(row["incident"]))
+            if incident is not None:
+                incident[3].add(int(row["patrol"]))
+        for row in unassigned:
+            incident = self._incidents.get(int(row["incident"]))
+            if incident is not None:
+                incident[3].discard(int(row["patrol"]))
+        self._risk[risk_cells["index"]] = risk_cells["value"]
+
+    def snapshot(self) -> WorldSnapshot:
+        cols = self._layout["partition"].cols
+        risk = self._risk
+        return WorldSnapshot(
+            sequence=self.current_tick,
+            tick=self.current_tick,
+            width=self.width,
+            height=self.height,
+            patrols=[
+                PatrolView(patrol_id, float(x), float(y), STATES_BY_CODE[int(state)], float(coverage))
+                for patrol_id, (x, y, state, coverage) in self._patrols.items()
+            ],
+            incidents=[
+                IncidentView(x, y, required, tuple(sorted(assigned))) for x, y, required, assigned in self._incidents.values()
+            ],
+            risk_map={(int(i) % cols, int(i) // cols): float(risk[i]) for i in np.flatnonzero(risk)},
+            **self._layout,
+        )
+
+    def close(self) -> None:
+        self._index = None
+        self._data.close()
+        self._file.close()
@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+import math
+import random
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import numpy as np
+
+from simulation.incident_source import BaseIncidentSource
+from simulation.run_config import RunConfig
+
+TICKS_PER_HOUR = 3600
+STATION_LAYOUTS = ("corners", "central", "perimeter", "random")
+
+
+@dataclass
+class Surge:
+    # Window of extra SUE intensity. A burst drops that many incidents at once on the first tick,
+    # around `center` (anywhere on the map when None).
+    start_tick: int
+    duration_ticks: int
+    multiplier: float = 1.0
+    burst: int = 0
+    center: tuple[float, float] | None = None
+    radius: float = 150.0
+
+    def active(self, tick: int) -> bool:
+        return self.start_tick <= tick < self.start_tick + self.duration_ticks
+
+
+class SurgeSource(BaseIncidentSource):
+    # Layers a surge schedule over another source: the SUE's intensity_scale is multiplied while
+    # windows are open, and bursts are added on their start tick. Event-driven runs poll it every
+    # tick (the BaseIncidentSource default), since the candidate rate changes at window edges.
+
+    def __init__(self, inner: BaseIncidentSource, surges: list[Surge], rng: random.Random) -> None:
+        self.inner = inner
+        self.surges = sorted(surges, key=lambda surge: surge.start_tick)
+        self._rng = rng
+        self._base_scale = getattr(inner, "intensity_scale", None)
+        self.burst_incidents = 0
+
+    def multiplier(self, tick: int) -> float:
+        factor = 1.0
+        for surge in self.surges:
+            if surge.start_tick > tick:
+                break
+            if surge.active(tick):
+                factor *= surge.multiplier
+        return factor
+
+    def generate_incidents(self, world, tick: int) -> list[tuple[float, float, int]]:
+        if self._base_scale is not None:
+            self.inner.intensity_scale = self._base_scale * self.multiplier(tick)
+        generated = self.inner.generate_incidents(world, tick)
+        for surge in self.surges:
+            if surge.start_tick > tick:
+                break
+            if surge.start_tick == tick and surge.burst > 0:
+                generated.extend(self._burst(world, surge))
+        return generated
+
+    def _burst(self, world, surge: Surge) -> list[tuple[float, float, int]]:
+        if surge.center is None:
+            cx, cy = self._rng.uniform(0.0, world.width), self._rng.uniform(0.0, world.height)
+        else:
+            cx, cy = surge.center
+        incidents = []
+        for _ in range(surge.burst):
+            x = min(max(0.0, self._rng.gauss(cx, surge.radius * 0.5)), world.width)
+            y = min(max(0.0, self._rng.gauss(cy, surge.radius * 0.5)), world.height)
+            incidents.append((x, y, self._rng.choice([2, 3, 3, 4, 5])))
+        self.burst_incidents += len(incidents)
+        return incidents
+
+    def remap_zones(self, remap) -> None:
+        self.inner.remap_zones(remap)
+
+
+@dataclass
+class ScenarioSpec:
+    name: str
+    width: int
+    height: int
+    patrol_count: int
+    hours: float = 24.0
+    mode: str = "intelligent"
+    seed: int = 42
+    intensity_scale: float = 1.0
+    station_layout: str = "corners"
+    # Crime hotspots per km2 written to a raster; None keeps CrimeField's own synthetic hotspots.
+    hotspots_per_km2: float | None = None
+    surges: list[Surge] = field(default_factory=list)
+
+    @property
+    def ticks(self) -> int:
+        return int(round(self.hours * TICKS_PER_HOUR))
+
+    def run_config(self, crime_raster: str | None = None) -> RunConfig:
+        return RunConfig(
+            mode=self.mode,
+            seed=self.seed,
+            ticks=self.ticks,
+            width=self.width,
+            height=self.height,
+            patrol_count=self.patrol_count,
+            crime_raster=crime_raster,
+            sue={"intensity_scale": self.intensity_scale},
+        )
+
+
+# (width, height, fleet, hours, intensity_scale, hotspots/km2, surges per day, burst size)
+PRESETS: dict[str, tuple[int, int, int, float, float, float | None, int, int]] = {
+    "smoke": (1100, 700, 16, 1.0, 1.0, None, 2, 40),
+    "city": (4400, 2800, 256, 6.0, 4.0, 0.5, 4, 120),
+    "production": (22000, 14000, 5000, 24.0, 40.0, 0.3, 6, 400),
+}
+
+
+def generate_scenario(
+    preset: str,
+    seed: int = 42,
+    hours: float | None = None,
+    patrol_count: int | None = None,
+    mode: str = "intelligent",
+    station_layout: str = "corners",
+) -> ScenarioSpec:
+    width, height, fleet, default_hours, intensity, hotspots, surges_per_day, burst = PRESETS[preset]
+    spec = ScenarioSpec(
+        name=preset,
+        width=width,
+        height=height,
+        patrol_count=patrol_count or fleet,
+        hours=hours or default_hours,
+        mode=mode,
+        seed=seed,
+        intensity_scale=intensity,
+        station_layout=station_layout,
+        hotspots_per_km2=hotspots,
+    )
+    spec.surges = surge_schedule(spec, surges_per_day, burst, random.Random(seed))
+    return spec
+
+
+def surge_schedule(spec: ScenarioSpec, per_day: int, burst: int, rng: random.Random) -> list[Surge]:
+    # Evening-heavy: start hours are drawn from a daily profile that peaks around 21h.
+    total = max(1, int(math.ceil(per_day * spec.hours / 24.0)))
+    surges = []
+    for _ in range(total):
+        day = rng.randrange(max(1, int(math.ceil(spec.hours / 24.0))))
+        hour = (rng.gauss(21.0, 3.0) % 24.0) + day * 24.0
+        start = int(min(hour, max(0.0, spec.hours - 0.25)) * TICKS_PER_HOUR)
+        surges.append(
+            Surge(
+                start_tick=max(1, start),
+                duration_ticks=int(rng.uniform(0.25, 1.5) * TICKS_PER_HOUR),
+                multiplier=rng.uniform(2.0, 4.0),
+                burst=int(burst * rng.uniform(0.5, 1.0)),
+                center=(rng.uniform(0.0, spec.width), rng.uniform(0.0, spec.height)),
+                radius=rng.uniform(100.0, 400.0),
+            )
+        )
+    return sorted(surges, key=lambda surge: surge.start_tick)
+
+
+def station_positions(spec: ScenarioSpec, rng: random.Random) -> tuple[tuple[float, float], list[tuple[float, float]]]:
+    # Mechanic base and the four gas stations World keeps.
+    w, h = float(spec.width), float(spec.height)
+    if spec.station_layout == "central":
+        base = (w * 0.5, h * 0.5)
+        stations = [(w * (0.5 + dx), h * (0.5 + dy)) for dx, dy in ((-0.1, -0.1), (0.1, -0.1), (-0.1, 0.1), (0.1, 0.1))]
+    elif spec.station_layout == "perimeter":
+        base = (w * 0.5, h * 0.02)
+        stations = [(w * 0.02, h * 0.5), (w * 0.98, h * 0.5), (w * 0.5, h * 0.98), (w * 0.02, h * 0.02)]
+    elif spec.station_layout == "random":
+        base = (rng.uniform(0.0, w), rng.uniform(0.0, h))
+        stations = [(rng.uniform(0.0, w), rng.uniform(0.0, h)) for _ in range(4)]
+    else:
+        base = (w * 0.5, h * 0.5)
+        stations = [(w * 0.2, h * 0.2), (w * 0.8, h * 0.2), (w * 0.2, h * 0.8), (w * 0.8, h * 0.8)]
+    return base, stations
+
+
+def write_crime_raster(spec: ScenarioSpec, path: str | Path, pixel_size: float = 25.0) -> Path:
+    # Base-risk raster in the layout CrimeField.from_raster expects (row 0 at y = 0).
+    rng = np.random.default_rng(spec.seed)
+    cols = max(1, int(math.ceil(spec.width / pixel_size)))
+    rows = max(1, int(math.ceil(spec.height / pixel_size)))
+    xs = (np.arange(cols) + 0.5) * pixel_size
+    ys = (np.arange(rows) + 0.5) * pixel_size
+    raster = np.full((rows, cols), 0.05)
+    area_km2 = spec.width * spec.height / 1_000_000.0
+    for _ in range(max(3, int(round(area_km2 * (spec.hotspots_per_km2 or 0.0))))):
+        cx, cy = rng.uniform(0.0, spec.width), rng.uniform(0.0, spec.height)
+        intensity, radius = rng.uniform(2.0, 4.5), rng.uniform(150.0, 600.0)
+        # Only the rows and columns within 4 radii are touched.
+        c0, c1 = np.searchsorted(xs, [cx - 4 * radius, cx + 4 * radius])
+        r0, r1 = np.searchsorted(ys, [cy - 4 * radius, cy + 4 * radius])
+        dx = xs[None, c0:c1] - cx
+        dy = ys[r0:r1, None] - cy
+        raster[r0:r1, c0:c1] += intensity * np.exp(-(dx**2 + dy**2) / (2 * radius**2))
+    path = Path(path)
+    np.save(path, raster)
+    return path
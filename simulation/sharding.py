@@ -0,0 +1,968 @@
+from __future__ import annotations
+
+import bisect
+import math
+import multiprocessing
+import time
+import traceback
+from dataclasses import dataclass, field
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from simulation.alert_store import AlertStore
+from simulation.audit_logger import AuditLogger
+from simulation.clock import SimulationClock
+from simulation.central_coordinator import DISPATCHABLE_STATES
+from simulation.dispatcher import IntelligentDispatcher, ReactiveDispatcher
+from simulation.metrics_engine import MetricsEngine
+from simulation.patrol import Patrol, PatrolState
+from simulation.predictor import RiskPredictor
+from simulation.quantile_sketch import ResponseTimeSketches
+from simulation.rng_streams import RngStreams
+from simulation.run_config import RunConfig
+from simulation.snapshot_buffer import STATE_CODES, STATES_BY_CODE
+from simulation.spatial import AdaptiveSpatialPartition
+from simulation.sue import StochasticUrbanSimulator
+from simulation.world import World, best_patrol_zone_id, patrol_cover_counts
+
+# Positions in every record are global map coordinates; each shard World works in local ones.
+PATROL_DTYPE = np.dtype(
+    [
+        ("patrol_id", "i8"),
+        ("unit_id", "S36"),
+        ("x", "f8"),
+        ("y", "f8"),
+        ("speed", "f8"),
+        ("fuel_level", "f8"),
+        ("mechanical_health", "f8"),
+        ("state", "i1"),
+        ("target_x", "f8"),
+        ("target_y", "f8"),
+        ("task_ticks_remaining", "i4"),
+        ("engine_temperature", "f8"),
+        ("tire_pressure", "f8"),
+        ("current_speed", "f8"),
+        ("is_dynamic", "?"),
+        ("dest", "i4"),
+        # Incident in the destination shard this unit was lent for, -1 for a plain crossing.
+        ("assign_incident", "i8"),
+        # Global home zone; it stays the unit's sector wherever the unit is owned.
+        ("home_zx", "i4"),
+        ("home_zy", "i4"),
+    ]
+)
+REQUEST_DTYPE = np.dtype(
+    [("shard", "i4"), ("incident_id", "i8"), ("x", "f8"), ("y", "f8"), ("missing", "i4"), ("severity", "i4"), ("created_tick", "i8")]
+)
+# Units near a shard edge; they only count towards the neighbour's coverage.
+HALO_DTYPE = np.dtype([("shard", "i4"), ("x", "f8"), ("y", "f8"), ("radius", "f8")])
+RELEASE_DTYPE = np.dtype([("patrol_id", "i8"), ("dest", "i4"), ("incident_id", "i8")])
+# Every unit as its shard saw it after the step. The other shards' targeting and dispatch, and
+# the coordinator's lending and preventive rebalancing, all plan against this view.
+FLEET_DTYPE = np.dtype(
+    [
+        ("patrol_id", "i8"),
+        ("shard", "i4"),
+        # Planning position (last telemetry) and planning speed.
+        ("x", "f8"),
+        ("y", "f8"),
+        ("speed", "f8"),
+        # Centre of the home zone and the radius preventive moves must stay within.
+        ("home_x", "f8"),
+        ("home_y", "f8"),
+        ("operational_radius", "f8"),
+        # Counts towards patrol cover: not out of service nor on an emergency return.
+        ("cover", "?"),
+        # Reported free (the coordinator's dispatchable set); lendable also has no local assignment.
+        ("dispatchable", "?"),
+        ("lendable", "?"),
+        # Preventive rebalancing: may be moved, is already on a preventive patrol, and counts as
+        # a neighbour when checking that a move would not leave an empty area.
+        ("eligible", "?"),
+        ("preventive", "?"),
+        ("present", "?"),
+    ]
+)
+# Risk map entries by global zone id; predicted marks the predictor's high-risk zones.
+RISK_DTYPE = np.dtype([("zone", "i8"), ("risk", "f8"), ("predicted", "?")])
+# Preventive targets chosen by the coordinator, in global coordinates.
+ORDER_DTYPE = np.dtype([("patrol_id", "i8"), ("x", "f8"), ("y", "f8")])
+
+SECTIONS = (
+    ("migrants", PATROL_DTYPE),
+    ("requests", REQUEST_DTYPE),
+    ("halo", HALO_DTYPE),
+    # Outbox: records of the units the shard can lend. Inbox: the ones the coordinator lent, which
+    # the shard drops because their records already travel as migrants.
+    ("offers", PATROL_DTYPE),
+    ("releases", RELEASE_DTYPE),
+    ("fleet", FLEET_DTYPE),
+    ("risk", RISK_DTYPE),
+    ("orders", ORDER_DTYPE),
+)
+# Ticks a lent unit starts moving later than a locally dispatched one would: the coordinator hands
+# it over between two steps and it leaves on the next one.
+LEND_DELAY_TICKS = 1.0
+SERVICE_STATES = frozenset({PatrolState.REFUELING, PatrolState.MAINTENANCE, PatrolState.EMERGENCY_RETURN, PatrolState.OUT_OF_SERVICE})
+COVER_EXCLUDED_STATES = frozenset({PatrolState.OUT_OF_SERVICE, PatrolState.EMERGENCY_RETURN})
+# Reported states that do not count as a neighbour in IntelligentDispatcher._would_leave_large_empty_area.
+BUSY_STATES = frozenset({"OUT_OF_SERVICE", "RESPONDING", "MAINTENANCE", "REFUELING", "EMERGENCY_RETURN"})
+
+
+class ShardMailbox:
+    # Fixed-capacity record sections in shared memory. Access is lockstep: the writer fills the
+    # mailbox before the pipe message that hands the turn over, so no seqlock is needed.
+
+    def __init__(self, capacity: int, name: str | None = None, create: bool = True) -> None:
+        self.capacity = capacity
+        size = 8 * len(SECTIONS) + sum(capacity * dtype.itemsize for _, dtype in SECTIONS)
+        if create:
+            self._shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+        self._owner = create
+        buf = self._shm.buf
+        self._counts = np.ndarray((len(SECTIONS),), dtype=np.int64, buffer=buf)
+        self._sections: dict[str, np.ndarray] = {}
+        offset = 8 * len(SECTIONS)
+        for name_, dtype in SECTIONS:
+            self._sections[name_] = np.ndarray((capacity,), dtype=dtype, buffer=buf, offset=offset)
+            offset += capacity * dtype.itemsize
+        if create:
+            self._counts[:] = 0
+
+    def spec(self) -> dict:
+        return {"name": self._shm.name, "capacity": self.capacity}
+
+    @classmethod
+    def attach(cls, spec: dict) -> ShardMailbox:
+        return cls(create=False, **spec)
+
+    def write(self, section: str, records: np.ndarray) -> None:
+        count = min(len(records), self.capacity)
+        self._sections[section][:count] = records[:count]
+        self._counts[[name for name, _ in SECTIONS].index(section)] = count
+
+    def read(self, section: str) -> np.ndarray:
+        count = int(self._counts[[name for name, _ in SECTIONS].index(section)])
+        return self._sections[section][:count].copy()
+
+    def close(self) -> None:
+        self._counts = None
+        self._sections = {}
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+
+@dataclass
+class ShardPartition(AdaptiveSpatialPartition):
+    # Keeps the global cell size so shard zones line up with the single-process grid.
+    fixed_cell_size: float = 0.0
+
+    def recalculate(self, width: float | None = None, height: float | None = None, unit_count: int | None = None) -> None:
+        if width is not None:
+            self.width = max(1.0, width)
+        if height is not None:
+            self.height = max(1.0, height)
+        if unit_count is not None:
+            self.unit_count = max(1, unit_count)
+        self.cell_size = self.fixed_cell_size
+        self.cols = max(1, int(math.ceil(self.width / self.cell_size - 1e-9)))
+        self.rows = max(1, int(math.ceil(self.height / self.cell_size - 1e-9)))
+        self._reset_zone_ids()
+
+
+@dataclass
+class ShardGrid:
+    # Shard edges fall on zone boundaries of the global partition.
+    width: float
+    height: float
+    cell_size: float
+    col_edges: list[int]
+    row_edges: list[int]
+
+    @classmethod
+    def split(cls, partition: AdaptiveSpatialPartition, shards_x: int, shards_y: int) -> ShardGrid:
+        shards_x = max(1, min(shards_x, partition.cols))
+        shards_y = max(1, min(shards_y, partition.rows))
+        return cls(
+            width=partition.width,
+            height=partition.height,
+            cell_size=partition.cell_size,
+            col_edges=[round(i * partition.cols / shards_x) for i in range(shards_x + 1)],
+            row_edges=[round(j * partition.rows / shards_y) for j in range(shards_y + 1)],
+        )
+
+    @property
+    def shards_x(self) -> int:
+        return len(self.col_edges) - 1
+
+    @property
+    def cols(self) -> int:
+        return self.col_edges[-1]
+
+    @property
+    def rows(self) -> int:
+        return self.row_edges[-1]
+
+    def zone_center_id(self, zone_id: int) -> tuple[float, float]:
+        # Same centre as the single-process partition's zone_center.
+        x0 = (zone_id % self.cols) * self.cell_size
+        y0 = (zone_id // self.cols) * self.cell_size
+        return ((x0 + min(self.width, x0 + self.cell_size)) * 0.5, (y0 + min(self.height, y0 + self.cell_size)) * 0.5)
+
+    @property
+    def shard_count(self) -> int:
+        return self.shards_x * (len(self.row_edges) - 1)
+
+    def zone_offset(self, index: int) -> tuple[int, int]:
+        return (self.col_edges[index % self.shards_x], self.row_edges[index // self.shards_x])
+
+    def zone_shape(self, index: int) -> tuple[int, int]:
+        i, j = index % self.shards_x, index // self.shards_x
+        return (self.col_edges[i + 1] - self.col_edges[i], self.row_edges[j + 1] - self.row_edges[j])
+
+    def bounds(self, index: int) -> tuple[float, float, float, float]:
+        i, j = index % self.shards_x, index // self.shards_x
+        return (
+            self.col_edges[i] * self.cell_size,
+            self.row_edges[j] * self.cell_size,
+            min(self.width, self.col_edges[i + 1] * self.cell_size),
+            min(self.height, self.row_edges[j + 1] * self.cell_size),
+        )
+
+    def shard_for_point(self, x: float, y: float) -> int:
+        zx = int(min(max(x, 0.0), self.width - 1e-6) // self.cell_size)
+        zy = int(min(max(y, 0.0), self.height - 1e-6) // self.cell_size)
+        i = min(bisect.bisect_right(self.col_edges, zx) - 1, self.shards_x - 1)
+        j = min(bisect.bisect_right(self.row_edges, zy) - 1, len(self.row_edges) - 2)
+        return j * self.shards_x + i
+
+
+@dataclass
+class ShardSpec:
+    index: int
+    grid: ShardGrid
+    base_risk: dict[tuple[int, int], float]
+    mechanic_base: tuple[float, float]
+    gas_stations: list[tuple[float, float]]
+    patrols: np.ndarray
+    halo_width: float
+
+
+def _patrol_record(patrol: Patrol, origin: tuple[float, float], dest: int, home_zone: tuple[int, int]) -> np.ndarray:
+    ox, oy = origin
+    record = np.zeros((), dtype=PATROL_DTYPE)
+    record["patrol_id"] = patrol.patrol_id
+    record["unit_id"] = patrol.unit_id.encode("ascii")
+    record["x"], record["y"] = patrol.x + ox, patrol.y + oy
+    record["speed"] = patrol.speed
+    record["fuel_level"] = patrol.fuel_level
+    record["mechanical_health"] = patrol.mechanical_health
+    record["state"] = STATE_CODES[patrol.state]
+    record["target_x"] = patrol.target_x + ox if patrol.target_x is not None else math.nan
+    record["target_y"] = patrol.target_y + oy if patrol.target_y is not None else math.nan
+    record["task_ticks_remaining"] = patrol.task_ticks_remaining
+    record["engine_temperature"] = patrol.engine_temperature
+    record["tire_pressure"] = patrol.tire_pressure
+    record["current_speed"] = patrol.current_speed
+    record["is_dynamic"] = patrol.is_dynamic
+    record["dest"] = dest
+    record["assign_incident"] = -1
+    record["home_zx"], record["home_zy"] = home_zone
+    return record
+
+
+def _patrol_from_record(record, origin: tuple[float, float]) -> Patrol:
+    ox, oy = origin
+    target_x = float(record["target_x"])
+    target_y = float(record["target_y"])
+    return Patrol(
+        patrol_id=int(record["patrol_id"]),
+        x=float(record["x"]) - ox,
+        y=float(record["y"]) - oy,
+        speed=float(record["speed"]),
+        unit_id=bytes(record["unit_id"]).decode("ascii"),
+        fuel_level=float(record["fuel_level"]),
+        mechanical_health=float(record["mechanical_health"]),
+        state=STATES_BY_CODE[int(record["state"])],
+        target_x=None if math.isnan(target_x) else target_x - ox,
+        target_y=None if math.isnan(target_y) else target_y - oy,
+        task_ticks_remaining=int(record["task_ticks_remaining"]),
+        engine_temperature=float(record["engine_temperature"]),
+        tire_pressure=float(record["tire_pressure"]),
+        current_speed=float(record["current_speed"]),
+        is_dynamic=bool(record["is_dynamic"]),
+    )
+
+
+def _records(rows: list, dtype: np.dtype) -> np.ndarray:
+    return np.array(rows, dtype=dtype) if rows else np.zeros(0, dtype=dtype)
+
+
+@dataclass
+class ShardWorld(World):
+    # A shard's World that plans against the whole fleet, as a single process would. Patrol
+    # targets are scored on the global grid with the other shards' units counted in, and a
+    # target in another shard makes the unit migrate there. Dispatch leaves a slot to the
+    # coordinator when another shard has a closer free unit. The other shards' units are as of
+    # the previous tick.
+    global_grid: AdaptiveSpatialPartition | None = None
+    origin: tuple[float, float] = (0.0, 0.0)
+    # Global planning positions of the other shards' units that count towards patrol cover.
+    foreign_positions: list[tuple[float, float]] = field(default_factory=list)
+    # FLEET_DTYPE records of the other shards' lendable units.
+    foreign_units: np.ndarray = field(default_factory=lambda: np.zeros(0, FLEET_DTYPE))
+    # Units owned by (or on their way to) the other shards.
+    foreign_count: int = 0
+    _claimed: set[int] = field(default_factory=set, init=False, repr=False)
+    # Units of other shards claimed this step, by incident.
+    _incoming: dict[int, int] = field(default_factory=dict, init=False, repr=False)
+    _global_centers: list[tuple[float, float]] = field(default_factory=list, init=False, repr=False)
+
+    def set_foreign_fleet(self, fleet: np.ndarray) -> None:
+        covering = fleet[fleet["cover"]]
+        self.foreign_positions = list(zip(covering["x"].tolist(), covering["y"].tolist()))
+        self.foreign_units = fleet[fleet["lendable"]]
+        self.foreign_count = len(fleet)
+        self._claimed = set()
+        self._incoming = {}
+
+    def _needs_more_units(self, incident) -> bool:
+        staffed = len(incident.assigned_patrol_ids) + self._incoming.get(incident.incident_id, 0)
+        return staffed < incident.required_responders
+
+    def fleet_size(self) -> int:
+        return len(self.patrols) + self.foreign_count
+
+    def _outside(self, x: float, y: float) -> bool:
+        return not (0.0 <= x < self.width and 0.0 <= y < self.height)
+
+    def _exact_station(self, position: tuple[float, float], objective: tuple[float, float] | None) -> tuple[float, float]:
+        # best_station / best_station_for from the exact position instead of a zone centre.
+        def cost(station: tuple[float, float]) -> float:
+            onward = 0.0 if objective is None else 0.2 * self.travel_distance(objective, station)
+            return self.travel_distance(position, station) + onward
+
+        return min(self.gas_stations or [self.mechanic_base], key=cost)
+
+    def _service_distances(self, xs: np.ndarray, ys: np.ndarray, ox: np.ndarray, oy: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        # The zone table only spans this rectangle and would clamp a unit that is still on its
+        # way in from another shard (a lent responder) onto the nearest edge zone.
+        station_distance, mechanic_distance = super()._service_distances(xs, ys, ox, oy)
+        for row in np.flatnonzero((xs < 0.0) | (xs >= self.width) | (ys < 0.0) | (ys >= self.height)).tolist():
+            position = (float(xs[row]), float(ys[row]))
+            objective = None if math.isnan(ox[row]) else (float(ox[row]), float(oy[row]))
+            station_distance[row] = self.travel_distance(position, self._exact_station(position, objective))
+            mechanic_distance[row] = self.travel_distance(position, self.mechanic_base)
+        return station_distance, mechanic_distance
+
+    def _best_gas_station_for(self, patrol: Patrol, objective: tuple[float, float] | None = None) -> tuple[float, float]:
+        position = self._patrol_position_for_planning(patrol)
+        if self._outside(*position):
+            return self._exact_station(position, objective)
+        return super()._best_gas_station_for(patrol, objective)
+
+    def _select_responder(self, dispatcher, incident) -> int | None:
+        patrol_id = super()._select_responder(dispatcher, incident)
+        units = self.foreign_units
+        if patrol_id is None or not len(units):
+            return patrol_id
+        ox, oy = self.origin
+        eta = np.hypot(units["x"] - (incident.x + ox), units["y"] - (incident.y + oy)) / units["speed"] + LEND_DELAY_TICKS
+        if self._claimed:
+            eta[np.isin(units["patrol_id"], list(self._claimed))] = np.inf
+        local_eta = dispatcher.score_patrol(self, patrol_id, incident)
+        while True:
+            pick = int(np.argmin(eta))
+            if not eta[pick] < local_eta:
+                return patrol_id
+            # The slot stays open in the incident's request, for the coordinator to fill from another shard.
+            self._claimed.add(int(units["patrol_id"][pick]))
+            self._incoming[incident.incident_id] = self._incoming.get(incident.incident_id, 0) + 1
+            eta[pick] = np.inf
+            if not self._needs_more_units(incident):
+                return None
+
+    def _select_patrol_target(self, patrol: Patrol) -> tuple[float, float]:
+        grid = self.global_grid
+        if not self._global_centers:
+            self._global_centers = [grid.zone_center_id(zone_id) for zone_id in range(grid.cols * grid.rows)]
+        centers = self._global_centers
+        ox, oy = self.origin
+        positions = list(self.foreign_positions)
+        for other in self.patrols:
+            if other.patrol_id != patrol.patrol_id and other.state not in COVER_EXCLUDED_STATES:
+                x, y = self._patrol_position_for_planning(other)
+                positions.append((x + ox, y + oy))
+        x, y = self._patrol_position_for_planning(patrol)
+        px, py = x + ox, y + oy
+        cover_counts = patrol_cover_counts(grid, centers, positions, patrol.coverage_radius)
+        best_id = best_patrol_zone_id(grid, centers, cover_counts, px, py)
+        if best_id < 0:
+            best_id = grid.point_to_zone_id(px, py)
+        cx, cy = centers[best_id]
+        return (cx - ox, cy - oy)
+
+
+@dataclass
+class ShardDispatcher(IntelligentDispatcher):
+    # Preventive moves are chosen by the coordinator over the whole fleet (see
+    # ShardedSimulation._rebalance). Here the high-risk filter only swaps the local threshold for
+    # the fleet-wide one the coordinator sent with the step.
+    risk_threshold: float | None = None
+
+    def filter_high_risk_zones(self, world, predicted_zones: list[tuple[int, int]]) -> list[tuple[int, int]]:
+        if self.risk_threshold is None:
+            return super().filter_high_risk_zones(world, predicted_zones)
+        selected = [zone for zone in predicted_zones if world.risk_map.get(zone, 0.0) >= self.risk_threshold]
+        selected.sort(key=lambda zone: world.risk_map.get(zone, 0.0), reverse=True)
+        return selected
+
+    def rebalance_preventive(self, world, high_risk_zones: list[tuple[int, int]]) -> None:
+        pass
+
+
+class ShardRunner:
+    # One rectangular piece of the city: a regular World in local coordinates plus the
+    # bookkeeping to hand units over to the neighbouring shards.
+
+    def __init__(self, spec: ShardSpec, config: RunConfig) -> None:
+        self.index = spec.index
+        self.grid = spec.grid
+        self.halo_width = spec.halo_width
+        x0, y0, x1, y1 = spec.grid.bounds(spec.index)
+        self.bounds = (x0, y0, x1, y1)
+        self.origin = (x0, y0)
+
+        streams = RngStreams(config.seed)
+        partition = ShardPartition(
+            width=x1 - x0, height=y1 - y0, unit_count=max(1, len(spec.patrols)), fixed_cell_size=spec.grid.cell_size
+        )
+        world = ShardWorld(
+            width=x1 - x0,
+            height=y1 - y0,
+            partition=partition,
+            audit_logger=AuditLogger(f"logs/audit_log.shard{spec.index}.jsonl"),
+            global_grid=ShardPartition(
+                width=spec.grid.width, height=spec.grid.height, unit_count=1, fixed_cell_size=spec.grid.cell_size
+            ),
+            origin=(x0, y0),
+        )
+        world.operating_mode = config.mode
+        for name, value in config.world_params().items():
+            setattr(world, name, value)
+        spill = f"{config.alert_spill}.shard{spec.index}" if config.alert_spill else None
+        world.central_coordinator.alerts = AlertStore(config.alert_capacity, spill_path=spill)
+        # Unit ids are global; dynamic spawning would need an id allocator shared by all shards.
+        world.enable_dynamic_patrols = False
+        world.crime_field.base_risk = spec.base_risk
+        # Service points stay where they are on the global map, even outside this rectangle.
+        world.mechanic_base = self._local(spec.mechanic_base)
+        world.gas_stations = [self._local(station) for station in spec.gas_stations]
+        world.layout_version += 1
+        self.world = world
+        # Global home zone per owned unit; records carry it from shard to shard.
+        self.home_zones: dict[int, tuple[int, int]] = {}
+        self._receive(spec.patrols)
+
+        self.predictor = RiskPredictor(**config.predictor_params())
+        world.risk_high_threshold = self.predictor.high_risk_threshold
+        self.dispatcher = ReactiveDispatcher() if config.mode == "reactive" else ShardDispatcher(weights=config.weights)
+        # Shard 0 keeps the single-process stream, so a 1x1 grid reproduces a plain run.
+        sue_stream = RngStreams.SUE if spec.index == 0 else f"{RngStreams.SUE}:{spec.index}"
+        self.sue = StochasticUrbanSimulator(seed=streams.seed_for(sue_stream), **config.sue_params())
+        self._outgoing: list[np.ndarray] = []
+
+    def _local(self, point: tuple[float, float]) -> tuple[float, float]:
+        return (point[0] - self.origin[0], point[1] - self.origin[1])
+
+    def _global(self, point: tuple[float, float]) -> tuple[float, float]:
+        return (point[0] + self.origin[0], point[1] + self.origin[1])
+
+    def _owner(self, patrol: Patrol) -> int:
+        # A responding unit belongs to its incident's shard; any other unit to the shard it is in,
+        # whose zone table then measures its service distances from where it really is.
+        responding = patrol.target_incident_id is not None and patrol.has_target()
+        point = (patrol.target_x, patrol.target_y) if responding else patrol.pos
+        return self.grid.shard_for_point(*self._global(point))
+
+    def _lendable(self, patrol: Patrol) -> bool:
+        state = self.world.telemetry_for_patrol(patrol.patrol_id)
+        return state is not None and state.connected and patrol.is_dispatchable() and patrol.target_incident_id is None
+
+    def _eligible(self, patrol: Patrol) -> bool:
+        # IntelligentDispatcher._eligible_idle_ids for one unit.
+        state = self.world.telemetry_for_patrol(patrol.patrol_id)
+        return (
+            state is not None
+            and state.connected
+            and state.patrol_state in DISPATCHABLE_STATES
+            and patrol.target_incident_id is None
+            and patrol.state not in SERVICE_STATES
+        )
+
+    def _receive(self, records: np.ndarray) -> list[Patrol]:
+        arrivals = [_patrol_from_record(record, self.origin) for record in records]
+        if arrivals:
+            self.world.add_patrols(arrivals)
+        ox, oy = self.grid.zone_offset(self.index)
+        for record, patrol in zip(records, arrivals):
+            home = (int(record["home_zx"]), int(record["home_zy"]))
+            self.home_zones[patrol.patrol_id] = home
+            if self.world.partition.valid_zone((home[0] - ox, home[1] - oy)):
+                patrol.home_zone = (home[0] - ox, home[1] - oy)
+        return arrivals
+
+    def _send(self, patrol: Patrol, dest: int) -> None:
+        self.world.remove_patrol(patrol.patrol_id)
+        home = self.home_zones.pop(patrol.patrol_id)
+        self._outgoing.append(_patrol_record(patrol, self.origin, dest, home))
+
+    def apply_inbox(self, inbox: ShardMailbox, risk_threshold: float | None = None) -> None:
+        world = self.world
+        # No step ran since the offers were written, so every released unit is still here and lendable.
+        for patrol_id in inbox.read("releases")["patrol_id"].tolist():
+            world.remove_patrol(patrol_id)
+            del self.home_zones[patrol_id]
+
+        migrants = inbox.read("migrants")
+        arrivals = self._receive(migrants)
+        for record, patrol in zip(migrants, arrivals):
+            incident = world.incidents.get(int(record["assign_incident"]))
+            if incident is not None and incident.active and incident.needs_more_units():
+                world._assign_to_incident(incident, patrol.patrol_id)
+                patrol.assign_to_incident(incident.incident_id, incident.pos)
+
+        for order in inbox.read("orders"):
+            patrol = world._patrol_by_id(int(order["patrol_id"]))
+            # Checked again: the unit may have been dispatched since the coordinator chose it.
+            if patrol is not None and self._eligible(patrol):
+                patrol.set_preventive_target(self._local((float(order["x"]), float(order["y"]))))
+
+        world.halo_patrols = [(x - self.origin[0], y - self.origin[1], radius) for x, y, radius in inbox.read("halo")[["x", "y", "radius"]]]
+        world.set_foreign_fleet(inbox.read("fleet"))
+        if isinstance(self.dispatcher, ShardDispatcher):
+            self.dispatcher.risk_threshold = risk_threshold
+
+    def step(self, tick: int) -> None:
+        self.world.step(tick, 1.0, self.predictor, self.dispatcher, sue=self.sue)
+
+    def fill_outbox(self, outbox: ShardMailbox) -> None:
+        world = self.world
+        for patrol in list(world.patrols):
+            owner = self._owner(patrol)
+            if owner == self.index:
+                continue
+            if patrol.target_incident_id is not None:
+                continue
+            patrol.clear_route()
+            self._send(patrol, owner)
+        migrants = _records(self._outgoing, PATROL_DTYPE)
+        outbox.write("migrants", migrants)
+        self._outgoing = []
+
+        requests = []
+        for incident in world.active_incidents():
+            missing = incident.required_responders - len(incident.assigned_patrol_ids)
+            if missing > 0:
+                x, y = self._global(incident.pos)
+                requests.append((self.index, incident.incident_id, x, y, missing, incident.severity, incident.created_tick))
+        outbox.write("requests", _records(requests, REQUEST_DTYPE))
+        offers = [
+            _patrol_record(patrol, self.origin, self.index, self.home_zones[patrol.patrol_id])
+            for patrol in world.patrols
+            if self._lendable(patrol)
+        ]
+        outbox.write("offers", _records(offers, PATROL_DTYPE))
+
+        x0, y0, x1, y1 = self.bounds
+        inner = self.halo_width
+        halo = []
+        for patrol in world.patrols:
+            state = world.telemetry_for_patrol(patrol.patrol_id)
+            if state is None or not state.connected:
+                continue
+            x, y = self._global(state.position)
+            if x0 + inner <= x <= x1 - inner and y0 + inner <= y <= y1 - inner:
+                continue
+            halo.append((self.index, x, y, patrol.coverage_radius))
+        outbox.write("halo", _records(halo, HALO_DTYPE))
+
+        outbox.write("fleet", self._fleet_view(migrants))
+        outbox.write("risk", self._risk_view())
+
+    def _fleet_view(self, migrants: np.ndarray) -> np.ndarray:
+        world = self.world
+        gcols = self.grid.cols
+        fallback_radius = world.operational_radius()
+        fleet = []
+        for patrol in world.patrols:
+            state = world.telemetry_for_patrol(patrol.patrol_id)
+            connected = state is not None and state.connected
+            x, y = self._global(world._patrol_position_for_planning(patrol))
+            if state is not None and state.speed > 0.1:
+                speed = state.speed
+            else:
+                speed = max(0.1, patrol.effective_speed())
+            hx, hy = self.home_zones[patrol.patrol_id]
+            home_x, home_y = self.grid.zone_center_id(hy * gcols + hx)
+            fleet.append(
+                (
+                    patrol.patrol_id,
+                    self.index,
+                    x,
+                    y,
+                    speed,
+                    home_x,
+                    home_y,
+                    patrol.operational_radius if patrol.operational_radius > 0 else fallback_radius,
+                    patrol.state not in COVER_EXCLUDED_STATES,
+                    connected and state.patrol_state in DISPATCHABLE_STATES,
+                    self._lendable(patrol),
+                    self._eligible(patrol),
+                    connected and state.patrol_state == "PREVENTIVE_PATROL",
+                    connected and state.patrol_state not in BUSY_STATES,
+                )
+            )
+        # Units in transit still cover the map, but nobody can plan with them until they land.
+        for record in migrants:
+            home_x, home_y = self.grid.zone_center_id(int(record["home_zy"]) * gcols + int(record["home_zx"]))
+            cover = STATES_BY_CODE[int(record["state"])] not in COVER_EXCLUDED_STATES
+            fleet.append(
+                (record["patrol_id"], record["dest"], record["x"], record["y"], record["speed"], home_x, home_y, fallback_radius)
+                + (cover, False, False, False, False, False)
+            )
+        return _records(fleet, FLEET_DTYPE)
+
+    def _risk_view(self) -> np.ndarray:
+        world = self.world
+        if world.operating_mode != "intelligent":
+            return np.zeros(0, RISK_DTYPE)
+        ox, oy = self.grid.zone_offset(self.index)
+        gcols = self.grid.cols
+        cols = world.partition.cols
+        threshold = self.predictor.high_risk_threshold
+        return _records(
+            [
+                ((zone_id // cols + oy) * gcols + zone_id % cols + ox, risk, risk >= threshold)
+                for zone_id, risk in world.risk_map.id_items()
+            ],
+            RISK_DTYPE,
+        )
+
+    def metrics_payload(self) -> dict:
+        engine = self.world.metrics_engine
+        cols, rows = self.world.partition.cols, self.world.partition.rows
+        return {
+            "zones": cols * rows,
+            "zone_offset": self.grid.zone_offset(self.index),
+            "incidents_total": engine.incidents_total,
+            "incidents_prevented": engine.incidents_prevented,
+            "resolved_incidents": engine.resolved_incidents,
+            "total_response_time": engine.total_response_time,
+            "tp": engine.tp,
+            "fp": engine.fp,
+            "fn": engine.fn,
+            "coverage_sum": engine.coverage_sum,
+            "coverage_samples": engine.coverage_samples,
+            "last_coverage": engine.last_coverage,
+            "response_sketches": engine.response_sketches.to_dict(),
+        }
+
+
+def _shard_worker(spec: ShardSpec, config: RunConfig, inbox_spec: dict, outbox_spec: dict, conn) -> None:
+    inbox = ShardMailbox.attach(inbox_spec)
+    outbox = ShardMailbox.attach(outbox_spec)
+    try:
+        runner = ShardRunner(spec, config)
+        conn.send(("ready", spec.index))
+        while True:
+            command, tick, risk_threshold = conn.recv()
+            if command == "stop":
+                runner.world.alerts.flush()
+                conn.send(("metrics", runner.metrics_payload()))
+                break
+            runner.apply_inbox(inbox, risk_threshold)
+            runner.step(tick)
+            runner.fill_outbox(outbox)
+            conn.send(("done", tick))
+    except Exception:
+        # The coordinator re-raises this instead of waiting on a shard that will never answer.
+        conn.send(("error", traceback.format_exc()))
+    finally:
+        inbox.close()
+        outbox.close()
+
+
+def merge_shard_metrics(payloads: list[dict]) -> MetricsEngine:
+    merged = MetricsEngine()
+    total_zones = max(1, sum(payload["zones"] for payload in payloads))
+    for payload in payloads:
+        for name in ("incidents_total", "incidents_prevented", "resolved_incidents", "total_response_time", "tp", "fp", "fn"):
+            setattr(merged, name, getattr(merged, name) + payload[name])
+        # Coverage is a share of zones, so each shard weighs by how many zones it owns.
+        weight = payload["zones"] / total_zones
+        merged.coverage_sum += payload["coverage_sum"] * weight
+        merged.last_coverage += payload["last_coverage"] * weight
+        merged.coverage_samples = max(merged.coverage_samples, payload["coverage_samples"])
+
+        sketches = ResponseTimeSketches.from_dict(payload["response_sketches"])
+        ox, oy = payload["zone_offset"]
+        sketches.by_zone = {(zx + ox, zy + oy): sketch for (zx, zy), sketch in sketches.by_zone.items()}
+        merged.response_sketches.merge(sketches)
+    return merged
+
+
+@dataclass
+class ShardedSimulation:
+    # Coordinator: owns the mailboxes, routes crossing units and halos, broadcasts the fleet view,
+    # lends free units to incidents another shard could not staff (or left to a closer unit of
+    # another shard), and makes the preventive moves over the whole fleet. Every decision is on
+    # the previous tick's view, and every unit is owned by exactly one shard at a time.
+    config: RunConfig
+    template: World
+    shards_x: int = 2
+    shards_y: int = 2
+    # Farthest a unit is lent across a shard edge; None lends from anywhere on the map.
+    handoff_radius: float | None = None
+    # Longest wait for one shard reply before the run is abandoned.
+    reply_timeout: float = 300.0
+    grid: ShardGrid = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.grid = ShardGrid.split(self.template.partition, self.shards_x, self.shards_y)
+        if self.handoff_radius is None:
+            self.handoff_radius = math.inf
+        # Halo units only add to the neighbour's coverage, so the widest coverage radius is enough.
+        coverage_radius = max((patrol.coverage_radius for patrol in self.template.patrols), default=0.0)
+        self.halo_width = max(coverage_radius, self.template.service_radius())
+
+    def _specs(self) -> list[ShardSpec]:
+        template = self.template
+        by_shard: dict[int, list[np.ndarray]] = {}
+        for patrol in template.patrols:
+            index = self.grid.shard_for_point(patrol.x, patrol.y)
+            by_shard.setdefault(index, []).append(_patrol_record(patrol, (0.0, 0.0), index, patrol.home_zone))
+
+        specs = []
+        for index in range(self.grid.shard_count):
+            ox, oy = self.grid.zone_offset(index)
+            cols, rows = self.grid.zone_shape(index)
+            base_risk = {(zx, zy): template.crime_field.risk((zx + ox, zy + oy)) for zx in range(cols) for zy in range(rows)}
+            records = by_shard.get(index, [])
+            specs.append(
+                ShardSpec(
+                    index=index,
+                    grid=self.grid,
+                    base_risk=base_risk,
+                    mechanic_base=template.mechanic_base,
+                    gas_stations=list(template.gas_stations),
+                    patrols=np.array(records, dtype=PATROL_DTYPE) if records else np.zeros(0, PATROL_DTYPE),
+                    halo_width=self.halo_width,
+                )
+            )
+        return specs
+
+    def _route_halo(self, halo: np.ndarray) -> list[np.ndarray]:
+        routed = []
+        for index in range(self.grid.shard_count):
+            x0, y0, x1, y1 = self.grid.bounds(index)
+            reach = self.halo_width
+            mask = (
+                (halo["shard"] != index)
+                & (halo["x"] >= x0 - reach)
+                & (halo["x"] <= x1 + reach)
+                & (halo["y"] >= y0 - reach)
+                & (halo["y"] <= y1 + reach)
+            )
+            routed.append(halo[mask])
+        return routed
+
+    def _match(self, requests: np.ndarray, fleet: np.ndarray) -> list[list[tuple]]:
+        releases: list[list[tuple]] = [[] for _ in range(self.grid.shard_count)]
+        candidates = fleet[fleet["lendable"]]
+        if not len(requests) or not len(candidates):
+            return releases
+        used = np.zeros(len(candidates), dtype=bool)
+        # Same order as the dispatch queue: severity first, then age.
+        for request in requests[np.lexsort((requests["created_tick"], -requests["severity"]))]:
+            shard, incident_id = int(request["shard"]), int(request["incident_id"])
+            missing = int(request["missing"])
+            distance = np.hypot(candidates["x"] - request["x"], candidates["y"] - request["y"])
+            eligible = (~used) & (candidates["shard"] != shard) & (distance <= self.handoff_radius)
+            if not eligible.any():
+                continue
+            eta = np.where(eligible, distance / candidates["speed"], np.inf)
+            for pick in np.argsort(eta, kind="stable")[:missing]:
+                if not eligible[pick]:
+                    break
+                used[pick] = True
+                releases[int(candidates["shard"][pick])].append((int(candidates["patrol_id"][pick]), shard, incident_id))
+        return releases
+
+    def _rebalance(
+        self, requests: np.ndarray, fleet: np.ndarray, risk: np.ndarray
+    ) -> tuple[list[list[tuple]], float | None]:
+        # IntelligentDispatcher.rebalance_preventive over the whole fleet and risk map. Returns the
+        # preventive orders per owning shard and the fleet-wide high-risk threshold.
+        orders: list[list[tuple]] = [[] for _ in range(self.grid.shard_count)]
+        if not len(risk):
+            return orders, None
+        threshold = float(risk["risk"].mean() + 1.2 * risk["risk"].std())
+        zones = risk[risk["predicted"] & (risk["risk"] >= threshold)]
+        zones = zones[np.lexsort((zones["zone"], -zones["risk"]))]
+        if not len(zones):
+            return orders, threshold
+
+        cap = max(1, int(max(1, len(fleet)) * 0.25))
+        surplus = int(fleet["dispatchable"].sum()) - int(requests["missing"].sum())
+        if surplus <= 1:
+            return orders, threshold
+        cap = min(cap, max(1, surplus - 1))
+        available_slots = cap - int(fleet["preventive"].sum())
+        if available_slots <= 0:
+            return orders, threshold
+
+        usable = fleet["eligible"].copy()
+        # The nearest free unit of each of the three most urgent incidents stays put.
+        dispatchable = fleet[fleet["dispatchable"]]
+        if len(dispatchable):
+            for request in requests[np.lexsort((requests["created_tick"], -requests["severity"]))][:3]:
+                eta = np.hypot(dispatchable["x"] - request["x"], dispatchable["y"] - request["y"]) / dispatchable["speed"]
+                usable &= fleet["patrol_id"] != dispatchable["patrol_id"][int(np.argmin(eta))]
+
+        present = fleet[fleet["present"]]
+        gap_threshold = max(300.0, self.grid.cell_size * 4.8)
+        for zone in zones["zone"].tolist():
+            if available_slots <= 0:
+                break
+            cx, cy = self.grid.zone_center_id(zone)
+            # Regla operativa real: patrullaje predictivo solo dentro del sector operativo.
+            in_sector = np.hypot(fleet["home_x"] - cx, fleet["home_y"] - cy) <= fleet["operational_radius"]
+            distance = np.where(usable & in_sector, np.hypot(fleet["x"] - cx, fleet["y"] - cy), np.inf)
+            pick = int(np.argmin(distance))
+            if math.isinf(distance[pick]):
+                continue
+            unit = fleet[pick]
+            others = present[present["patrol_id"] != unit["patrol_id"]]
+            if not len(others) or np.hypot(others["x"] - unit["x"], others["y"] - unit["y"]).min() > gap_threshold:
+                continue
+            orders[int(unit["shard"])].append((int(unit["patrol_id"]), cx, cy))
+            usable[pick] = False
+            available_slots -= 1
+        return orders, threshold
+
+    def _exchange(self, inboxes: list[ShardMailbox], outboxes: list[ShardMailbox]) -> float | None:
+        # Between two steps: reads every outbox, plans lending and preventive moves, and fills the
+        # inboxes. Returns the risk threshold for the next step.
+        migrants = np.concatenate([outbox.read("migrants") for outbox in outboxes])
+        requests = np.concatenate([outbox.read("requests") for outbox in outboxes])
+        halo = np.concatenate([outbox.read("halo") for outbox in outboxes])
+        fleet = np.concatenate([outbox.read("fleet") for outbox in outboxes])
+        risk = np.concatenate([outbox.read("risk") for outbox in outboxes])
+        offers = np.concatenate([outbox.read("offers") for outbox in outboxes])
+        releases = self._match(requests, fleet)
+        handed = []
+        for shard_releases in releases:
+            for patrol_id, dest, incident_id in shard_releases:
+                # From now on the unit answers to the incident's shard and is no longer free.
+                lent = fleet["patrol_id"] == patrol_id
+                fleet["shard"][lent] = dest
+                for flag in ("dispatchable", "lendable", "eligible", "preventive", "present"):
+                    fleet[flag][lent] = False
+                record = offers[offers["patrol_id"] == patrol_id][0].copy()
+                record["dest"] = dest
+                record["assign_incident"] = incident_id
+                record["target_x"] = record["target_y"] = np.nan
+                handed.append(record)
+        if handed:
+            migrants = np.concatenate([migrants, np.array(handed, dtype=PATROL_DTYPE)])
+        orders, threshold = self._rebalance(requests, fleet, risk)
+
+        for index, (inbox, ghosts) in enumerate(zip(inboxes, self._route_halo(halo))):
+            inbox.write("migrants", migrants[migrants["dest"] == index])
+            inbox.write("halo", ghosts)
+            inbox.write("releases", _records(releases[index], RELEASE_DTYPE))
+            inbox.write("fleet", fleet[fleet["shard"] != index])
+            inbox.write("orders", _records(orders[index], ORDER_DTYPE))
+        # A lone shard already sees the whole risk map on its own step.
+        return threshold if self.grid.shard_count > 1 else None
+
+    def _command(self, index: int, conn, process, message: tuple) -> None:
+        try:
+            conn.send(message)
+        except OSError:
+            raise RuntimeError(f"shard {index}: el proceso cerro el canal (codigo {process.exitcode})") from None
+
+    def _reply(self, index: int, conn, process) -> tuple:
+        # Polls so a shard that died (or hangs) surfaces as an error instead of blocking recv().
+        deadline = time.monotonic() + self.reply_timeout
+        while True:
+            if conn.poll(1.0):
+                try:
+                    message = conn.recv()
+                except (EOFError, OSError):
+                    process.join(timeout=1.0)
+                    raise RuntimeError(f"shard {index}: el proceso cerro el canal (codigo {process.exitcode})") from None
+                if message[0] == "error":
+                    raise RuntimeError(f"shard {index} fallo:\n{message[1]}")
+                return message
+            if process.exitcode is not None and not conn.poll(0):
+                raise RuntimeError(f"shard {index}: el proceso termino con codigo {process.exitcode} sin responder")
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"shard {index}: sin respuesta tras {self.reply_timeout:.0f}s")
+
+    def run(self) -> MetricsEngine:
+        count = self.grid.shard_count
+        # Every section must fit the whole fleet (twice over for migrants) and the whole risk map.
+        capacity = max(256, 2 * len(self.template.patrols), self.grid.cols * self.grid.rows)
+        inboxes = [ShardMailbox(capacity) for _ in range(count)]
+        outboxes = [ShardMailbox(capacity) for _ in range(count)]
+        context = multiprocessing.get_context("spawn")
+        pipes = []
+        processes = []
+        finished = False
+        try:
+            for spec, inbox, outbox in zip(self._specs(), inboxes, outboxes):
+                parent, child = context.Pipe()
+                process = context.Process(
+                    target=_shard_worker, args=(spec, self.config, inbox.spec(), outbox.spec(), child), daemon=True
+                )
+                process.start()
+                # Only the worker holds the child end, so its exit shows up as EOF here.
+                child.close()
+                pipes.append(parent)
+                processes.append(process)
+            for index, conn in enumerate(pipes):
+                self._reply(index, conn, processes[index])
+
+            sim_clock = SimulationClock(tick_seconds=1.0)
+            risk_threshold = None
+            while sim_clock.current_tick < self.config.ticks:
+                tick = sim_clock.tick()
+                for index, conn in enumerate(pipes):
+                    self._command(index, conn, processes[index], ("step", tick, risk_threshold))
+                for index, conn in enumerate(pipes):
+                    self._reply(index, conn, processes[index])
+                risk_threshold = self._exchange(inboxes, outboxes)
+
+            payloads = []
+            for index, conn in enumerate(pipes):
+                self._command(index, conn, processes[index], ("stop", 0, None))
+                payloads.append(self._reply(index, conn, processes[index])[1])
+            finished = True
+            return merge_shard_metrics(payloads)
+        finally:
+            for process in processes:
+                # After a failure the other shards are waiting for a command that will not come.
+                process.join(timeout=5.0 if finished else 0.0)
+                if process.is_alive():
+                    process.terminate()
+                    process.join(timeout=5.0)
+            for conn in pipes:
+                conn.close()
+            for mailbox in inboxes + outboxes:
+                mailbox.close()
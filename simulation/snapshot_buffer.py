@@ -0,0 +1,272 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from simulation.patrol import PatrolState
+
+STATE_CODES = {state: code for code, state in enumerate(PatrolState)}
+STATES_BY_CODE = list(PatrolState)
+
+# meta slots
+_TICK, _PATROLS, _INCIDENTS, _COLS, _ROWS, _CELL, _LAYOUT, _WIDTH, _HEIGHT, _MECH_X, _MECH_Y, _GAS = range(12)
+_MAX_GAS_STATIONS = 4
+_META_SIZE = _GAS + 1 + 2 * _MAX_GAS_STATIONS
+_PATROL_FIELDS = 5  # patrol_id, x, y, state, coverage_radius
+_INCIDENT_FIELDS = 3  # x, y, required_responders
+
+
+class SnapshotBuffer:
+    # Double-buffered per-tick snapshot in shared memory.
+    # The writer fills the back slot and then flips `front`; each slot carries a seqlock
+    # counter (odd while being written) so readers never copy a torn snapshot.
+
+    def __init__(
+        self,
+        name: str | None = None,
+        max_patrols: int = 4096,
+        max_incidents: int = 4096,
+        max_zones: int = 4096,
+        create: bool = True,
+    ) -> None:
+        self.max_patrols = max_patrols
+        self.max_incidents = max_incidents
+        self.max_zones = max_zones
+        self._slot_floats = _META_SIZE + max_patrols * _PATROL_FIELDS + max_incidents * _INCIDENT_FIELDS + max_zones
+        size = 8 * 4 + 2 * 8 * self._slot_floats
+        if create:
+            self._shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+        self._owner = create
+        buf = self._shm.buf
+        # header: published sequence, front slot, slot seqlocks
+        self._header = np.ndarray((4,), dtype=np.int64, buffer=buf)
+        self._slots = [
+            np.ndarray((self._slot_floats,), dtype=np.float64, buffer=buf, offset=32 + slot * 8 * self._slot_floats)
+            for slot in range(2)
+        ]
+        if create:
+            self._header[:] = 0
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def spec(self) -> dict:
+        return {
+            "name": self.name,
+            "max_patrols": self.max_patrols,
+            "max_incidents": self.max_incidents,
+            "max_zones": self.max_zones,
+        }
+
+    @classmethod
+    def attach(cls, spec: dict) -> SnapshotBuffer:
+        return cls(create=False, **spec)
+
+    @property
+    def sequence(self) -> int:
+        return int(self._header[0])
+
+    def publish(self, world, tick: int) -> None:
+        back = 1 - int(self._header[1])
+        slot = self._slots[back]
+        lock = 2 + back
+        self._header[lock] += 1
+
+        patrols = world.patrols[: self.max_patrols]
+        incidents = [incident for incident in world.incidents.values() if incident.active][: self.max_incidents]
+        partition = world.partition
+        zone_count = min(self.max_zones, partition.cols * partition.rows)
+
+        meta = slot[:_META_SIZE]
+        meta[_TICK] = tick
+        meta[_PATROLS] = len(patrols)
+        meta[_INCIDENTS] = len(incidents)
+        meta[_COLS] = partition.cols
+        meta[_ROWS] = partition.rows
+        meta[_CELL] = partition.cell_size
+        meta[_LAYOUT] = world.layout_version
+        meta[_WIDTH] = world.width
+        meta[_HEIGHT] = world.height
+        meta[_MECH_X], meta[_MECH_Y] = world.mechanic_base
+        stations = world.gas_stations[:_MAX_GAS_STATIONS]
+        meta[_GAS] = len(stations)
+        for index, (gx, gy) in enumerate(stations):
+            meta[_GAS + 1 + 2 * index] = gx
+            meta[_GAS + 2 + 2 * index] = gy
+
+        offset = _META_SIZE
+        if patrols:
+            block = np.array(
+                [(p.patrol_id, p.x, p.y, STATE_CODES[p.state], p.coverage_radius) for p in patrols], dtype=np.float64
+            )
+            slot[offset : offset + block.size] = block.ravel()
+        offset += self.max_patrols * _PATROL_FIELDS
+        if incidents:
+            block = np.array([(i.x, i.y, i.required_responders) for i in incidents], dtype=np.float64)
+            slot[offset : offset + block.size] = block.ravel()
+        offset += self.max_incidents * _INCIDENT_FIELDS
+
+        risk = slot[offset : offset + zone_count]
+        risk[:] = 0.0
+        # Risk map ids are the same flat index as the slot.
+        for index, value in world.risk_map.id_items():
+            if index < zone_count:
+                risk[index] = value
+
+        self._header[lock] += 1
+        self._header[1] = back
+        self._header[0] += 1
+
+    def read(self) -> WorldSnapshot | None:
+        for _ in range(8):
+            if self._header[0] == 0:
+                return None
+            front = int(self._header[1])
+            lock = 2 + front
+            before = int(self._header[lock])
+            if before % 2:
+                continue
+            data = self._slots[front].copy()
+            sequence = int(self._header[0])
+            if int(self._header[lock]) == before:
+                return WorldSnapshot.from_array(data, sequence, self.max_patrols, self.max_incidents)
+        return None
+
+    def close(self) -> None:
+        self._header = None
+        self._slots = []
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+
+@dataclass
+class PartitionView:
+    cols: int
+    rows: int
+    cell_size: float
+    width: float
+    height: float
+
+    def zone_bounds(self, zone: tuple[int, int]) -> tuple[float, float, float, float]:
+        zx, zy = zone
+        x0 = zx * self.cell_size
+        y0 = zy * self.cell_size
+        return (x0, y0, min(self.width, x0 + self.cell_size), min(self.height, y0 + self.cell_size))
+
+    def valid_zone(self, zone: tuple[int, int]) -> bool:
+        zx, zy = zone
+        return 0 <= zx < self.cols and 0 <= zy < self.rows
+
+
+@dataclass
+class PatrolView:
+    patrol_id: int
+    x: float
+    y: float
+    state: PatrolState
+    coverage_radius: float
+
+
+@dataclass
+class IncidentView:
+    x: float
+    y: float
+    required_responders: int
+    assigned_patrol_ids: tuple[int, ...] = ()
+
+
+@dataclass
+class WorldSnapshot:
+    # Read-only stand-in for World with just what Renderer needs.
+    sequence: int
+    tick: int
+    width: float
+    height: float
+    partition: PartitionView
+    layout_version: int
+    mechanic_base: tuple[float, float]
+    gas_stations: list[tuple[float, float]]
+    patrols: list[PatrolView] = field(default_factory=list)
+    incidents: list[IncidentView] = field(default_factory=list)
+    risk_map: dict[tuple[int, int], float] = field(default_factory=dict)
+
+    def active_incidents(self) -> list[IncidentView]:
+        return self.incidents
+
+    @classmethod
+    def from_array(cls, data: np.ndarray, sequence: int, max_patrols: int, max_incidents: int) -> WorldSnapshot:
+        meta = data[:_META_SIZE]
+        cols, rows = int(meta[_COLS]), int(meta[_ROWS])
+        width, height = float(meta[_WIDTH]), float(meta[_HEIGHT])
+        offset = _META_SIZE
+        n_patrols = int(meta[_PATROLS])
+        patrol_block = data[offset : offset + n_patrols * _PATROL_FIELDS].reshape(n_patrols, _PATROL_FIELDS)
+        offset += max_patrols * _PATROL_FIELDS
+        n_incidents = int(meta[_INCIDENTS])
+        incident_block = data[offset : offset + n_incidents * _INCIDENT_FIELDS].reshape(n_incidents, _INCIDENT_FIELDS)
+        offset += max_incidents * _INCIDENT_FIELDS
+        risk = data[offset : offset + cols * rows]
+
+        risk_map = {}
+        for index in np.flatnonzero(risk):
+            risk_map[(int(index) % cols, int(index) // cols)] = float(risk[index])
+
+        return cls(
+            sequence=sequence,
+            tick=int(meta[_TICK]),
+            width=width,
+            height=height,
+            partition=PartitionView(cols, rows, float(meta[_CELL]), width, height),
+            layout_version=int(meta[_LAYOUT]),
+            mechanic_base=(float(meta[_MECH_X]), float(meta[_MECH_Y])),
+            gas_stations=[
+                (float(meta[_GAS + 1 + 2 * i]), float(meta[_GAS + 2 + 2 * i])) for i in range(int(meta[_GAS]))
+            ],
+            patrols=[
+                PatrolView(int(row[0]), float(row[1]), float(row[2]), STATES_BY_CODE[int(row[3])], float(row[4]))
+                for row in patrol_block
+            ],
+            incidents=[IncidentView(float(row[0]), float(row[1]), int(row[2])) for row in incident_block],
+            risk_map=risk_map,
+        )
+
+    def interpolated(self, previous: WorldSnapshot | None, alpha: float) -> WorldSnapshot:
+        # Positions blend from the previous snapshot towards this one; everything else is current.
+        if previous is None or alpha >= 1.0:
+            return self
+        alpha = max(0.0, alpha)
+        before = {p.patrol_id: p for p in previous.patrols}
+        patrols = []
+        for patrol in self.patrols:
+            old = before.get(patrol.patrol_id)
+            if old is None:
+                patrols.append(patrol)
+                continue
+            patrols.append(
+                PatrolView(
+                    patrol.patrol_id,
+                    old.x + (patrol.x - old.x) * alpha,
+                    old.y + (patrol.y - old.y) * alpha,
+                    patrol.state,
+                    patrol.coverage_radius,
+                )
+            )
+        return WorldSnapshot(
+            sequence=self.sequence,
+            tick=self.tick,
+            width=self.width,
+            height=self.height,
+            partition=self.partition,
+            layout_version=self.layout_version,
+            mechanic_base=self.mechanic_base,
+            gas_stations=self.gas_stations,
+            patrols=patrols,
+            incidents=self.incidents,
+            risk_map=self.risk_map,
+        )
@@ -1,5 +1,7 @@
-﻿import math
-from dataclasses import dataclass
+﻿import heapq
+import math
+from dataclasses import dataclass, field
+from typing import ClassVar
 
 
 @dataclass
@@ -12,6 +14,9 @@ class AdaptiveSpatialPartition:
     max_zones: int = 220
     reference_area: float = 1_000_000.0
 
+    # Every zone of the grid exists; see QuadtreePartition for the sparse variant.
+    lazy: ClassVar[bool] = False
+
     def __post_init__(self) -> None:
         self.recalculate(self.width, self.height, self.unit_count)
 
@@ -33,6 +38,7 @@ class AdaptiveSpatialPartition:
         self.cell_size = max(8.0, math.sqrt(area / target_zones))
         self.cols = max(1, int(math.ceil(self.width / self.cell_size)))
         self.rows = max(1, int(math.ceil(self.height / self.cell_size)))
+        self._reset_zone_ids()
 
     def point_to_zone(self, x: float, y: float) -> tuple[int, int]:
         clamped_x = min(max(x, 0.0), self.width - 1e-6)
@@ -41,6 +47,45 @@ class AdaptiveSpatialPartition:
         zone_y = int(clamped_y // self.cell_size)
         return (zone_x, zone_y)
 
+    # ---------- flat zone ids ----------
+    # zy * cols + zx, the same flat index ZoneEtaTable uses. Ids are only meaningful for the
+    # grid they were taken on; state keyed by them moves with ZoneRemap like tuple-keyed state.
+
+    def _reset_zone_ids(self) -> None:
+        # iter_zones order, and neighbour id lists per radius, for the current grid.
+        self._zone_ids = [zy * self.cols + zx for zx in range(self.cols) for zy in range(self.rows)]
+        self._neighbor_ids: dict[int, list[list[int]]] = {}
+
+    def zone_id(self, zone: tuple[int, int]) -> int:
+        return zone[1] * self.cols + zone[0]
+
+    def zone_of(self, zone_id: int) -> tuple[int, int]:
+        return (zone_id % self.cols, zone_id // self.cols)
+
+    def point_to_zone_id(self, x: float, y: float) -> int:
+        clamped_x = min(max(x, 0.0), self.width - 1e-6)
+        clamped_y = min(max(y, 0.0), self.height - 1e-6)
+        return int(clamped_y // self.cell_size) * self.cols + int(clamped_x // self.cell_size)
+
+    def zone_center_id(self, zone_id: int) -> tuple[float, float]:
+        return self.zone_center((zone_id % self.cols, zone_id // self.cols))
+
+    def iter_zone_ids(self) -> list[int]:
+        return self._zone_ids
+
+    def neighbor_ids(self, zone_id: int, radius: int = 1) -> list[int]:
+        # Same order as neighbor_zones. Shared lists; do not mutate.
+        table = self._neighbor_ids.get(radius)
+        if table is None:
+            table = self._neighbor_ids[radius] = [
+                [self.zone_id(zone) for zone in self.neighbor_zones(self.zone_of(zone_id), radius)]
+                for zone_id in range(self.cols * self.rows)
+            ]
+        return table[zone_id]
+
+    def is_live_id(self, zone_id: int) -> bool:
+        return 0 <= zone_id < self.cols * self.rows
+
     def zone_bounds(self, zone: tuple[int, int]) -> tuple[float, float, float, float]:
         zx, zy = zone
         x0 = zx * self.cell_size
@@ -66,3 +111,234 @@ class AdaptiveSpatialPartition:
                 if self.valid_zone(nz):
                     neighbors.append(nz)
         return neighbors
+
+    def iter_zones(self):
+        for zx in range(self.cols):
+            for zy in range(self.rows):
+                yield (zx, zy)
+
+    def zone_count(self) -> int:
+        return self.cols * self.rows
+
+    def is_live(self, zone: tuple[int, int]) -> bool:
+        return self.valid_zone(zone)
+
+    def touch(self, zone: tuple[int, int], radius: int = 0) -> None:
+        pass
+
+
+@dataclass
+class QuadtreePartition:
+    # Fixed fine leaves over a large map. A leaf only exists once something touches it (a patrol,
+    # an incident, a crime hotspot); every level above keeps how many live leaves it holds, so
+    # region queries, coarse totals and nearest-zone searches skip empty land entirely.
+    width: float
+    height: float
+    unit_count: int
+    leaf_size: float = 100.0
+
+    lazy: ClassVar[bool] = True
+
+    # Live leaves by flat id (zy * cols + zx).
+    _leaves: set[int] = field(default_factory=set, init=False, repr=False)
+    _levels: list[dict[tuple[int, int], int]] = field(default_factory=list, init=False, repr=False)
+    _ordered: list[tuple[int, int]] = field(default_factory=list, init=False, repr=False)
+    _ordered_ids: list[int] = field(default_factory=list, init=False, repr=False)
+    _pending: list[tuple[int, int]] = field(default_factory=list, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.cols = 0
+        self.rows = 0
+        self.recalculate(self.width, self.height, self.unit_count)
+
+    def recalculate(self, width: float | None = None, height: float | None = None, unit_count: int | None = None) -> None:
+        if width is not None:
+            self.width = max(1.0, width)
+        if height is not None:
+            self.height = max(1.0, height)
+        if unit_count is not None:
+            self.unit_count = max(1, unit_count)
+
+        # Leaf size is fixed, so adding units never reshapes the tree.
+        self.cell_size = max(1.0, self.leaf_size)
+        cols = max(1, int(math.ceil(self.width / self.cell_size)))
+        rows = max(1, int(math.ceil(self.height / self.cell_size)))
+        if (cols, rows) == (self.cols, self.rows):
+            return
+        self.cols, self.rows = cols, rows
+        self.depth = max(0, math.ceil(math.log2(max(cols, rows))))
+        leaves = [zone for zone in self.iter_zones() if self.valid_zone(zone)]
+        self._leaves = set()
+        self._levels = [{} for _ in range(self.depth + 1)]
+        self._ordered = []
+        self._ordered_ids = []
+        self._pending = []
+        for zone in leaves:
+            self._add_leaf(zone)
+
+    def point_to_zone(self, x: float, y: float) -> tuple[int, int]:
+        clamped_x = min(max(x, 0.0), self.width - 1e-6)
+        clamped_y = min(max(y, 0.0), self.height - 1e-6)
+        return (int(clamped_x // self.cell_size), int(clamped_y // self.cell_size))
+
+    # ---------- flat zone ids (see AdaptiveSpatialPartition) ----------
+
+    def zone_id(self, zone: tuple[int, int]) -> int:
+        return zone[1] * self.cols + zone[0]
+
+    def zone_of(self, zone_id: int) -> tuple[int, int]:
+        return (zone_id % self.cols, zone_id // self.cols)
+
+    def point_to_zone_id(self, x: float, y: float) -> int:
+        clamped_x = min(max(x, 0.0), self.width - 1e-6)
+        clamped_y = min(max(y, 0.0), self.height - 1e-6)
+        return int(clamped_y // self.cell_size) * self.cols + int(clamped_x // self.cell_size)
+
+    def zone_center_id(self, zone_id: int) -> tuple[float, float]:
+        return self.zone_center((zone_id % self.cols, zone_id // self.cols))
+
+    def neighbor_ids(self, zone_id: int, radius: int = 1) -> list[int]:
+        # Not tabulated: a fine grid over a large map would make the table bigger than the tree.
+        return [self.zone_id(zone) for zone in self.neighbor_zones(self.zone_of(zone_id), radius)]
+
+    def zone_bounds(self, zone: tuple[int, int]) -> tuple[float, float, float, float]:
+        zx, zy = zone
+        x0 = zx * self.cell_size
+        y0 = zy * self.cell_size
+        return (x0, y0, min(self.width, x0 + self.cell_size), min(self.height, y0 + self.cell_size))
+
+    def zone_center(self, zone: tuple[int, int]) -> tuple[float, float]:
+        x0, y0, x1, y1 = self.zone_bounds(zone)
+        return ((x0 + x1) * 0.5, (y0 + y1) * 0.5)
+
+    def valid_zone(self, zone: tuple[int, int]) -> bool:
+        zx, zy = zone
+        return 0 <= zx < self.cols and 0 <= zy < self.rows
+
+    def neighbor_zones(self, zone: tuple[int, int], radius: int = 1) -> list[tuple[int, int]]:
+        zx, zy = zone
+        neighbors: list[tuple[int, int]] = []
+        for dx in range(-radius, radius + 1):
+            for dy in range(-radius, radius + 1):
+                nz = (zx + dx, zy + dy)
+                if self.valid_zone(nz):
+                    neighbors.append(nz)
+        return neighbors
+
+    # ---------- live leaves ----------
+
+    def touch(self, zone: tuple[int, int], radius: int = 0) -> None:
+        zx, zy = zone
+        for ix in range(max(0, zx - radius), min(self.cols - 1, zx + radius) + 1):
+            for iy in range(max(0, zy - radius), min(self.rows - 1, zy + radius) + 1):
+                if iy * self.cols + ix not in self._leaves:
+                    self._add_leaf((ix, iy))
+
+    def _add_leaf(self, zone: tuple[int, int]) -> None:
+        zx, zy = zone
+        self._leaves.add(zy * self.cols + zx)
+        self._pending.append(zone)
+        for level in range(1, self.depth + 1):
+            key = (zx >> level, zy >> level)
+            counts = self._levels[level]
+            counts[key] = counts.get(key, 0) + 1
+
+    def is_live(self, zone: tuple[int, int]) -> bool:
+        # Off-grid tuples would alias a real leaf's id.
+        return self.valid_zone(zone) and zone[1] * self.cols + zone[0] in self._leaves
+
+    def is_live_id(self, zone_id: int) -> bool:
+        return zone_id in self._leaves
+
+    def zone_count(self) -> int:
+        return len(self._leaves)
+
+    def empty_count(self) -> int:
+        return self.cols * self.rows - len(self._leaves)
+
+    def iter_zones(self) -> list[tuple[int, int]]:
+        # Same (zx, zy) order as the dense grid. The list is replaced, never mutated, so callers
+        # may touch new leaves while iterating over it.
+        if self._pending:
+            self._ordered = sorted(self._ordered + self._pending)
+            self._ordered_ids = [zy * self.cols + zx for zx, zy in self._ordered]
+            self._pending = []
+        return self._ordered
+
+    def iter_zone_ids(self) -> list[int]:
+        self.iter_zones()
+        return self._ordered_ids
+
+    def _node_live(self, level: int, ix: int, iy: int) -> bool:
+        if level == 0:
+            return self.is_live((ix, iy))
+        return (ix, iy) in self._levels[level]
+
+    def _node_box(self, level: int, ix: int, iy: int) -> tuple[float, float, float, float]:
+        span = self.cell_size * (1 << level)
+        return (ix * span, iy * span, min(self.width, (ix + 1) * span), min(self.height, (iy + 1) * span))
+
+    def _children(self, level: int, ix: int, iy: int):
+        for cx in (2 * ix, 2 * ix + 1):
+            for cy in (2 * iy, 2 * iy + 1):
+                if self._node_live(level - 1, cx, cy):
+                    yield cx, cy
+
+    # ---------- queries ----------
+
+    def zones_in_region(self, x0: float, y0: float, x1: float, y1: float) -> list[tuple[int, int]]:
+        zones: list[tuple[int, int]] = []
+        stack = [(self.depth, 0, 0)] if self._leaves else []
+        while stack:
+            level, ix, iy = stack.pop()
+            bx0, by0, bx1, by1 = self._node_box(level, ix, iy)
+            if bx1 <= x0 or bx0 >= x1 or by1 <= y0 or by0 >= y1:
+                continue
+            if level == 0:
+                zones.append((ix, iy))
+                continue
+            for cx, cy in self._children(level, ix, iy):
+                stack.append((level - 1, cx, cy))
+        return zones
+
+    def region_total(self, values: dict[tuple[int, int], float], x0: float, y0: float, x1: float, y1: float) -> float:
+        # e.g. total risk in a district: region_total(world.risk_map, ...).
+        return sum(values.get(zone, 0.0) for zone in self.zones_in_region(x0, y0, x1, y1))
+
+    def level_totals(self, values: dict[tuple[int, int], float], level: int) -> dict[tuple[int, int], float]:
+        # Per-zone values summed into the cells of a coarser level (cell side = leaf * 2**level).
+        totals: dict[tuple[int, int], float] = {}
+        for (zx, zy), value in values.items():
+            key = (zx >> level, zy >> level)
+            totals[key] = totals.get(key, 0.0) + value
+        return totals
+
+    def live_count(self, level: int, cell: tuple[int, int]) -> int:
+        if level == 0:
+            return int(self.is_live(cell))
+        return self._levels[level].get(cell, 0)
+
+    def nearest_zones(self, x: float, y: float):
+        # Live leaves by increasing centre distance: best-first over the tree, using the distance
+        # to a node's box as the lower bound for every leaf under it.
+        if not self._leaves:
+            return
+        if self.depth == 0:
+            cx, cy = self.zone_center((0, 0))
+            yield math.hypot(x - cx, y - cy), (0, 0)
+            return
+        heap = [(0.0, self.depth, 0, 0)]
+        while heap:
+            distance, level, ix, iy = heapq.heappop(heap)
+            if level == 0:
+                yield distance, (ix, iy)
+                continue
+            for cx, cy in self._children(level, ix, iy):
+                if level == 1:
+                    zx, zy = self.zone_center((cx, cy))
+                    heapq.heappush(heap, (math.hypot(x - zx, y - zy), 0, cx, cy))
+                    continue
+                bx0, by0, bx1, by1 = self._node_box(level - 1, cx, cy)
+                dx = max(bx0 - x, 0.0, x - bx1)
+                dy = max(by0 - y, 0.0, y - by1)
+                heapq.heappush(heap, (math.hypot(dx, dy), level - 1, cx, cy))
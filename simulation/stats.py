@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import math
+import statistics
+
+_NORMAL = statistics.NormalDist()
+
+
+def t_quantile(p: float, df: float) -> float:
+    # Cornish-Fisher expansion of the Student t quantile around the normal one.
+    z = _NORMAL.inv_cdf(p)
+    if math.isinf(df) or df > 1e6:
+        return z
+    df = max(1.0, df)
+    z3 = z**3
+    z5 = z**5
+    z7 = z**7
+    g1 = (z3 + z) / 4.0
+    g2 = (5.0 * z5 + 16.0 * z3 + 3.0 * z) / 96.0
+    g3 = (3.0 * z7 + 19.0 * z5 + 17.0 * z3 - 15.0 * z) / 384.0
+    g4 = (79.0 * z**9 + 776.0 * z7 + 1482.0 * z5 - 1920.0 * z3 - 945.0 * z) / 92160.0
+    return z + g1 / df + g2 / df**2 + g3 / df**3 + g4 / df**4
+
+
+def mean_confidence_interval(values: list[float], confidence: float = 0.95) -> tuple[float, float, float]:
+    n = len(values)
+    if n == 0:
+        return (0.0, 0.0, 0.0)
+    mean = statistics.fmean(values)
+    if n == 1:
+        return (mean, -math.inf, math.inf)
+    half = t_quantile(0.5 + confidence / 2.0, n - 1) * statistics.stdev(values) / math.sqrt(n)
+    return (mean, mean - half, mean + half)
+
+
+def welch_t(a: list[float], b: list[float]) -> tuple[float, float]:
+    # t statistic for mean(a) - mean(b) and Welch-Satterthwaite degrees of freedom.
+    na, nb = len(a), len(b)
+    if na < 2 or nb < 2:
+        return (0.0, 1.0)
+    va = statistics.variance(a) / na
+    vb = statistics.variance(b) / nb
+    diff = statistics.fmean(a) - statistics.fmean(b)
+    se2 = va + vb
+    if se2 <= 0.0:
+        if diff == 0.0:
+            return (0.0, float(na + nb - 2))
+        return (math.copysign(math.inf, diff), float(na + nb - 2))
+    denom = (va**2 / max(1, na - 1)) + (vb**2 / max(1, nb - 1))
+    df = (se2**2 / denom) if denom > 0.0 else float(na + nb - 2)
+    return (diff / math.sqrt(se2), df)
@@ -1,76 +1,256 @@
 from __future__ import annotations
 
+import bisect
 import math
 import random
+from itertools import accumulate
 from collections import defaultdict
 from dataclasses import dataclass, field
 
+from simulation.incident_source import BaseIncidentSource
+from simulation.zone_map import ZoneArrayMap, zone_history_map
+
 
 @dataclass
-class StochasticUrbanSimulator:
+class StochasticUrbanSimulator(BaseIncidentSource):
     seed: int | None = None
     base_intensity: float = 120.0
     contagion_weight: float = 0.35
     decay: float = 0.05
     alpha: float = 0.12
+    # Scales the arrival rate only; severities still follow the calibrated lambda.
+    intensity_scale: float = 1.0
 
-    recent_events: dict[tuple[int, int], list[int]] = field(default_factory=lambda: defaultdict(list))
+    # (tick, weight) per zone; weights drop below 1 only when a repartition splits a zone. Laid on
+    # the world's grid as a ZoneArrayMap the first time incidents are generated.
+    recent_events: ZoneArrayMap | dict[tuple[int, int], list[tuple[int, float]]] = field(default_factory=lambda: defaultdict(list))
+    # Lazy partitions only: past events per zone id as one decayed weight, valued at _excitation_tick.
+    _excitation: dict[int, float] = field(default_factory=dict, init=False, repr=False)
+    _excitation_tick: int = field(default=0, init=False, repr=False)
+    # Per-tick loop: last tick the whole history was trimmed to the forget horizon.
+    _forgotten_tick: int = field(default=0, init=False, repr=False)
+    # Event-driven runs only: next candidate arrival (in ticks, continuous) and the zone table it draws from.
+    _candidate_time: float | None = field(default=None, init=False, repr=False)
+    _candidate_table: tuple | None = field(default=None, init=False, repr=False)
 
     def __post_init__(self) -> None:
         self._rng = random.Random(self.seed)
 
     def generate_incidents(self, world, tick: int) -> list[tuple[float, float, int]]:
         generated: list[tuple[float, float, int]] = []
+        partition = world.partition
+        recent = self.recent_events = zone_history_map(partition, self.recent_events)
+        # Without this every contagion sum would walk all events since the start of the run.
+        horizon = self._forget_horizon()
+        if tick - self._forgotten_tick >= horizon:
+            self._forgotten_tick = tick
+            for zone_id, history in recent.id_items():
+                if history and tick - history[0][0] > horizon:
+                    recent.set_id(zone_id, [event for event in history if tick - event[0] <= horizon])
 
-        # SUE is ground truth and must be independent from dispatcher/predictor mode.
-        for zx in range(world.partition.cols):
-            for zy in range(world.partition.rows):
-                zone = (zx, zy)
+        # On a lazy partition contagion is spread once from the recent events instead of being
+        # gathered per live leaf.
+        influence = self._spread_influence(partition, tick) if partition.lazy else None
 
-                lam = self._zone_lambda(world, zone, tick)
+        # SUE is ground truth and must be independent from dispatcher/predictor mode.
+        for zone_id in partition.iter_zone_ids():
+            lam = self._zone_lambda(world, zone_id, tick, influence)
 
-                # Poisson probability for at least one event in interval.
-                DT_HOURS = 1.0 / 3600.0
-                p = 1 - math.exp(-lam * DT_HOURS)
+            # Poisson probability for at least one event in interval.
+            DT_HOURS = 1.0 / 3600.0
+            p = 1 - math.exp(-self.intensity_scale * lam * DT_HOURS)
 
-                if self._rng.random() > p:
-                    continue
+            if self._rng.random() > p:
+                continue
 
-                x0, y0, x1, y1 = world.partition.zone_bounds(zone)
-                x = self._rng.uniform(x0, x1)
-                y = self._rng.uniform(y0, y1)
-                severity = self._sample_severity(lam)
+            zone = partition.zone_of(zone_id)
+            x0, y0, x1, y1 = partition.zone_bounds(zone)
+            x = self._rng.uniform(x0, x1)
+            y = self._rng.uniform(y0, y1)
+            severity = self._sample_severity(lam)
 
-                generated.append((x, y, severity))
-                self.register_incident(zone, tick)
+            generated.append((x, y, severity))
+            recent.list_id(zone_id).append((tick, 1.0))
+            # Contagion reaches two zones out; on a lazy partition those leaves must be live.
+            partition.touch(zone, radius=2)
+            if influence is not None:
+                self._excitation[zone_id] = self._excitation.get(zone_id, 0.0) + 1.0
 
+        if partition.lazy:
+            generated.extend(self._empty_land_incidents(world, tick))
         return generated
 
+    def _spread_influence(self, partition, tick: int) -> dict[int, float]:
+        factor = math.exp(-self.decay * (tick - self._excitation_tick))
+        self._excitation_tick = tick
+        self._excitation = {zone_id: weight * factor for zone_id, weight in self._excitation.items() if weight * factor > 1e-6}
+
+        # Only zones on the grid are ever read back, so the 5x5 spread is clipped at the edges.
+        cols, rows = partition.cols, partition.rows
+        influence: dict[int, float] = {}
+        for zone_id, weight in self._excitation.items():
+            zx, zy = zone_id % cols, zone_id // cols
+            for ix in range(max(0, zx - 2), min(cols - 1, zx + 2) + 1):
+                for iy in range(max(0, zy - 2), min(rows - 1, zy + 2) + 1):
+                    key = iy * cols + ix
+                    influence[key] = influence.get(key, 0.0) + weight
+        return influence
+
     def register_incident(self, zone: tuple[int, int], tick: int) -> None:
-        self.recent_events[zone].append(tick)
+        history = self.recent_events.get(zone)
+        if history is None:
+            history = self.recent_events[zone] = []
+        history.append((tick, 1.0))
+
+    def remap_zones(self, remap) -> None:
+        # Only the dense grid is ever repartitioned, so the lazy-only _excitation stays empty.
+        self.recent_events = ZoneArrayMap(remap.new.cols, remap.new.rows, items=remap.split_events(self.recent_events))
+
+    def _empty_land_incidents(self, world, tick: int) -> list[tuple[float, float, int]]:
+        # Leaves that are not live carry no contagion and a base risk below crime_field.live_risk.
+        # Candidates are drawn as one Poisson count at that bound over all empty leaves and then
+        # thinned to each leaf's own rate, which gives the same law as visiting every leaf.
+        partition = world.partition
+        empty = partition.empty_count()
+        if empty <= 0:
+            return []
+        DT_HOURS = 1.0 / 3600.0
+        hour_factor = self._hour_factor(tick)
+        bound = 1 - math.exp(-self.intensity_scale * world.crime_field.live_risk * hour_factor * DT_HOURS)
+        candidates = self._poisson(empty * bound)
+
+        generated: list[tuple[float, float, int]] = []
+        cols, rows = partition.cols, partition.rows
+        for _ in range(candidates):
+            zone_id = -1
+            for _attempt in range(64):
+                zx = self._rng.randrange(cols)
+                candidate = self._rng.randrange(rows) * cols + zx
+                if not partition.is_live_id(candidate):
+                    zone_id = candidate
+                    break
+            if zone_id < 0:
+                continue
+
+            lam = world.crime_field.risk_id(zone_id) * hour_factor
+            p = 1 - math.exp(-self.intensity_scale * lam * DT_HOURS)
+            if self._rng.random() * bound > p:
+                continue
+
+            zone = partition.zone_of(zone_id)
+            x0, y0, x1, y1 = partition.zone_bounds(zone)
+            x = self._rng.uniform(x0, x1)
+            y = self._rng.uniform(y0, y1)
+            generated.append((x, y, self._sample_severity(lam)))
+            self.recent_events.list_id(zone_id).append((tick, 1.0))
+            partition.touch(zone, radius=2)
+            self._excitation[zone_id] = self._excitation.get(zone_id, 0.0) + 1.0
+        return generated
+
+    def _poisson(self, mean: float) -> int:
+        # Knuth's method in slices, so exp(-mean) never underflows.
+        count = 0
+        while mean > 0:
+            step = min(mean, 30.0)
+            limit = math.exp(-step)
+            product = self._rng.random()
+            while product > limit:
+                count += 1
+                product *= self._rng.random()
+            mean -= step
+        return count
+
+    # Past events weigh less than this in the contagion sum once they are old enough to forget.
+    _FORGET_WEIGHT = 1e-9
+
+    def _forget_horizon(self) -> float:
+        return math.log(1.0 / self._FORGET_WEIGHT) / max(self.decay, 1e-9)
+
+    # -------------------- event-driven runs --------------------
+
+    def next_event_tick(self, world, tick: int) -> int | None:
+        # Candidates arrive as one Poisson stream at the peak-hour, full-contagion bound of every
+        # zone; event_incidents thins each one back to λ(z,t). Same law as the per-tick loop,
+        # without visiting the zones on ticks that bring nothing.
+        if self._candidate_time is None:
+            self._candidate_time = tick + self._candidate_gap(world)
+        if math.isinf(self._candidate_time):
+            return None
+        return max(tick + 1, math.ceil(self._candidate_time))
+
+    def event_incidents(self, world, tick: int) -> list[tuple[float, float, int]]:
+        generated: list[tuple[float, float, int]] = []
+        recent = self.recent_events = zone_history_map(world.partition, self.recent_events)
+        zone_ids, cumulative, peak = self._candidate_zones(world)
+        while self._candidate_time is not None and self._candidate_time <= tick:
+            self._candidate_time += self._candidate_gap(world)
+            index = bisect.bisect_right(cumulative, self._rng.random() * cumulative[-1])
+            zone_id = zone_ids[min(index, len(zone_ids) - 1)]
+            self._forget_events(world, zone_id, tick)
+            lam = self._zone_lambda(world, zone_id, tick)
+            if self._rng.random() * world.crime_field.risk_id(zone_id) * peak > lam:
+                continue
+
+            x0, y0, x1, y1 = world.partition.zone_bounds(world.partition.zone_of(zone_id))
+            x = self._rng.uniform(x0, x1)
+            y = self._rng.uniform(y0, y1)
+            generated.append((x, y, self._sample_severity(lam)))
+            recent.list_id(zone_id).append((tick, 1.0))
+        return generated
+
+    def _candidate_zones(self, world) -> tuple[list[int], list[float], float]:
+        key = (world.layout_version, id(world.crime_field))
+        if self._candidate_table is None or self._candidate_table[0] != key:
+            zones = list(world.partition.iter_zone_ids())
+            cumulative = list(accumulate(world.crime_field.risk_id(zone_id) for zone_id in zones))
+            peak = max(self._hour_factor(hour) for hour in range(24)) * (1 + self.contagion_weight)
+            self._candidate_table = (key, zones, cumulative, peak)
+        return self._candidate_table[1:]
+
+    def _candidate_gap(self, world) -> float:
+        _, cumulative, peak = self._candidate_zones(world)
+        DT_HOURS = 1.0 / 3600.0
+        rate = self.intensity_scale * peak * (cumulative[-1] if cumulative else 0.0) * DT_HOURS
+        return self._rng.expovariate(rate) if rate > 0 else math.inf
+
+    def _forget_events(self, world, zone_id: int, tick: int) -> None:
+        # The neighbourhood history is trimmed as it is read, so weeks of simulated time do not
+        # make each contagion sum longer.
+        horizon = self._forget_horizon()
+        recent = self.recent_events
+        for nid in world.partition.neighbor_ids(zone_id, radius=2):
+            history = recent.slots[nid]
+            if history and tick - history[0][0] > horizon:
+                recent.set_id(nid, [event for event in history if tick - event[0] <= horizon])
 
     # -------------------- λ(z,t) --------------------
 
-    def _zone_lambda(self, world, zone: tuple[int, int], tick: int) -> float:
+    def _zone_lambda(self, world, zone_id: int, tick: int, influence: dict[int, float] | None = None) -> float:
 
-        spatial = world.crime_field.risk(zone)
+        spatial = world.crime_field.risk_id(zone_id)
         hour_factor = self._hour_factor(tick)
-        contagion = self._contagion(world, zone, tick)
-        total_zones = world.partition.cols * world.partition.rows
+        if influence is None:
+            contagion = self._contagion(world, zone_id, tick)
+        else:
+            contagion = 1 - math.exp(-influence.get(zone_id, 0.0) * self.alpha)
         lam = self.base_intensity / self.base_intensity
 
         return lam * spatial * hour_factor * (1 + self.contagion_weight * contagion)
 
-    def _contagion(self, world, zone: tuple[int, int], tick: int) -> float:
+    def _contagion(self, world, zone_id: int, tick: int) -> float:
         influence = 0.0
+        slots = self.recent_events.slots
 
-        for nz in world.partition.neighbor_zones(zone, radius=2):
-            for event_tick in self.recent_events.get(nz, []):
+        for nid in world.partition.neighbor_ids(zone_id, radius=2):
+            history = slots[nid]
+            if not history:
+                continue
+            for event_tick, weight in history:
                 dt = tick - event_tick
                 if dt <= 0:
                     continue
 
-                influence += math.exp(-self.decay * dt)
+                influence += weight * math.exp(-self.decay * dt)
 
         # NORMALIZACION (la clave)
         influence = 1 - math.exp(-influence * self.alpha)
@@ -17,3 +17,6 @@ class TelemetryBus:
         while not self._queue.empty():
             packets.append(self._queue.get_nowait())
         return packets
+
+    def pending(self) -> int:
+        return self._queue.qsize()
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import numpy as np
+
+FIELDS = (
+    "tick",
+    "active_incidents",
+    "unmet_responders",
+    "dispatchable_units",
+    "coverage_percent",
+    "alerts",
+    "mean_fuel",
+    "mean_mech",
+)
+
+
+class KpiTimeSeries:
+    # Preallocated column-major ring buffer; recording never allocates after construction.
+
+    def __init__(self, capacity: int = 86_400, window: int = 300) -> None:
+        self.capacity = max(1, capacity)
+        self.window = max(1, min(window, self.capacity))
+        self._data = np.zeros((len(FIELDS), self.capacity), dtype=np.float64)
+        self._row = np.zeros(len(FIELDS), dtype=np.float64)
+        self._window_sum = np.zeros(len(FIELDS), dtype=np.float64)
+        self._window_sumsq = np.zeros(len(FIELDS), dtype=np.float64)
+        self._head = 0
+        self._size = 0
+        self._alerts_seen = 0
+        self.total_recorded = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def record(self, world, tick: int) -> None:
+        # Constant time: World and the coordinator keep every count and sum up to date.
+        fleet = max(1, len(world.patrols))
+        resources = world.fleet_resources
+
+        alerts_total = world.alerts.total
+        new_alerts = alerts_total - self._alerts_seen
+        self._alerts_seen = alerts_total
+
+        row = self._row
+        row[0] = tick
+        row[1] = world.active_incident_count()
+        row[2] = world.unmet_responders
+        row[3] = world.central_coordinator.dispatchable_count
+        row[4] = world.metrics_engine.last_coverage
+        row[5] = new_alerts
+        row[6] = resources.fuel / fleet
+        row[7] = resources.mech / fleet
+        self.append(row)
+
+    def append(self, row: np.ndarray) -> None:
+        # Windowed aggregates are maintained incrementally: add the new sample, drop the one leaving.
+        if self._size >= self.window:
+            leaving = self._data[:, (self._head - self.window) % self.capacity]
+            self._window_sum -= leaving
+            self._window_sumsq -= leaving * leaving
+        self._data[:, self._head] = row
+        self._window_sum += row
+        self._window_sumsq += row * row
+        self._head = (self._head + 1) % self.capacity
+        if self._size < self.capacity:
+            self._size += 1
+        self.total_recorded += 1
+
+    def column(self, name: str) -> np.ndarray:
+        index = FIELDS.index(name)
+        if self._size < self.capacity:
+            return self._data[index, : self._size].copy()
+        return np.concatenate((self._data[index, self._head :], self._data[index, : self._head]))
+
+    def window_stats(self) -> dict[str, dict[str, float]]:
+        n = min(self._size, self.window)
+        if n == 0:
+            return {}
+        mean = self._window_sum / n
+        var = np.maximum(0.0, self._window_sumsq / n - mean * mean)
+        std = np.sqrt(var)
+        last = self._data[:, (self._head - 1) % self.capacity]
+        return {
+            name: {"mean": float(mean[i]), "std": float(std[i]), "last": float(last[i])}
+            for i, name in enumerate(FIELDS)
+            if name != "tick"
+        }
+
+    def export(self, file_path: str) -> None:
+        np.savez_compressed(file_path, **{name: self.column(name) for name in FIELDS})
+
+    @staticmethod
+    def load(file_path: str) -> dict[str, np.ndarray]:
+        with np.load(file_path) as data:
+            return {name: data[name] for name in data.files}
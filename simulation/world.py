@@ -3,24 +3,61 @@ from __future__ import annotations
 from dataclasses import dataclass, field
 import math
 import random
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Callable
+
+import numpy as np
 
 from simulation.incident import Incident
-from simulation.patrol import Patrol, PatrolState
+from simulation.patrol import FleetResources, Patrol, PatrolState
 from simulation.spatial import AdaptiveSpatialPartition
-from simulation.central_coordinator import CentralCoordinator
+from simulation.central_coordinator import MECH_CODES, CentralCoordinator, UnitOperationalState
+from simulation.alert_store import AlertStore, AlertType
 from simulation.audit_logger import AuditLogger
 from simulation.metrics_engine import MetricsEngine
+from simulation.phase_profiler import PHASES
 from simulation.edge_twin import EdgeTwin
 from simulation.telemetry_bus import TelemetryBus
 from simulation.telemetry_emitter import TelemetryEmitter
-from simulation.telemetry_packet import TelemetryPacket
 from simulation.crime_field import CrimeField
+from simulation.zone_eta_table import ZoneEtaTable
+from simulation.zone_map import ZoneArrayMap
+from simulation.zone_remap import ZoneGrid, ZoneRemap
 
 if TYPE_CHECKING:
     from simulation.dispatcher import BaseDispatcher
+    from simulation.incident_source import BaseIncidentSource
+    from simulation.phase_profiler import PhaseProfiler
     from simulation.predictor import RiskPredictor
-    from simulation.sue import StochasticUrbanSimulator
+    from simulation.road_network import RoadNetwork
+    from simulation.run_recorder import RunRecorder
+    from simulation.timeseries import KpiTimeSeries
+
+
+@dataclass
+class TickContext:
+    # What one tick's phases share: their inputs, the high-risk zones risk_prediction hands to
+    # rebalancing and metrics, and the optional profiler the phases report counts to.
+    tick: int
+    dt: float
+    predictor: RiskPredictor
+    dispatcher: BaseDispatcher
+    sue: BaseIncidentSource | None = None
+    profiler: PhaseProfiler | None = None
+    predicted_high_risk: list[tuple[int, int]] = field(default_factory=list)
+    # Set by engines that compute coverage for many worlds at once (ensemble).
+    coverage: float | None = None
+
+    def count(self, name: str, amount: int = 1) -> None:
+        if self.profiler is not None:
+            self.profiler.count(name, amount)
+
+
+SERVICE_FLOW_STATES = frozenset({PatrolState.REFUELING, PatrolState.MAINTENANCE, PatrolState.EMERGENCY_RETURN})
+# Salud mecanica estimada por codigo de estado (OK, WARN, CRITICAL).
+MECH_HEALTH = (1.0, 0.45, 0.15)
+MECH_HEALTH_ARRAY = np.array(MECH_HEALTH)
+# Zone cover counts, and per unit the position it was counted at and the zone ids it adds.
+PatrolCover = tuple[dict[int, int], dict[int, tuple[tuple[float, float] | None, list[int]]]]
 
 
 @dataclass
@@ -30,8 +67,10 @@ class World:
     partition: AdaptiveSpatialPartition
     patrols: list[Patrol] = field(default_factory=list)
     incidents: dict[int, Incident] = field(default_factory=dict)
-    risk_map: dict[tuple[int, int], float] = field(default_factory=dict)
-    zone_incident_counts: dict[tuple[int, int], int] = field(default_factory=dict)
+    # Indexed by flat zone id; any (zx, zy) mapping given here is laid on the grid in __post_init__.
+    risk_map: ZoneArrayMap = field(default_factory=dict)
+    # Counts become fractional once a repartition shares a zone's tally out by area.
+    zone_incident_counts: ZoneArrayMap = field(default_factory=dict)
     next_incident_id: int = 1
     next_patrol_id: int = 1
     mechanic_base: tuple[float, float] = (0.0, 0.0)
@@ -42,12 +81,35 @@ class World:
     audit_logger: AuditLogger = field(default_factory=AuditLogger)
     metrics_engine: MetricsEngine = field(default_factory=MetricsEngine)
     risk_high_threshold: float = 1.6
+    # None keeps the legacy behaviour of drawing from the global random module.
+    spawn_rng: random.Random | None = None
+    phase_profiler: PhaseProfiler | None = None
+    timeseries: KpiTimeSeries | None = None
+    recorder: RunRecorder | None = None
+    # Bumped whenever the partition or the service bases change; caches key on it.
+    layout_version: int = 0
+    # None keeps straight-line travel for trips, ETAs and service-station choices.
+    road_network: RoadNetwork | None = None
+    # (x, y, radius) of units owned by a neighbouring shard; they only count towards coverage.
+    halo_patrols: list[tuple[float, float, float]] = field(default_factory=list)
+    _eta_table: ZoneEtaTable | None = field(default=None, init=False, repr=False)
+    _eta_table_key: tuple | None = field(default=None, init=False, repr=False)
+    # Repartitions not yet applied to the predictor and SUE, which World.step receives as arguments.
+    _zone_remaps: list[ZoneRemap] = field(default_factory=list, init=False, repr=False)
+    # Running totals for per-tick KPIs: active incidents in creation order, their missing
+    # responders, and the fleet's fuel and mechanical health. Kept up to date where incidents
+    # are created, assigned and closed, and where patrols join or leave.
+    _active_incidents: dict[int, Incident] = field(default_factory=dict, init=False, repr=False)
+    unmet_responders: int = field(default=0, init=False)
+    fleet_resources: FleetResources = field(default_factory=FleetResources, init=False, repr=False)
+    _patrols_by_id: dict[int, Patrol] = field(default_factory=dict, init=False, repr=False)
+    # Patrol cover per coverage radius during a patrol update pass; None outside a pass.
+    _patrol_cover: dict[float, PatrolCover] | None = field(default=None, init=False, repr=False)
 
     telemetry_bus: TelemetryBus = field(default_factory=TelemetryBus)
     central_coordinator: CentralCoordinator = field(default_factory=CentralCoordinator)
     telemetry_emitters: dict[str, TelemetryEmitter] = field(default_factory=dict)
     edge_twins: dict[str, EdgeTwin] = field(default_factory=dict)
-    edge_alerts: list[dict] = field(default_factory=list)
 
     fuel_low_threshold: float = 0.14
     fuel_critical_threshold: float = 0.04
@@ -62,15 +124,51 @@ class World:
 
     def __post_init__(self) -> None:
         self.crime_field = CrimeField(self.partition)
+        self.risk_map = ZoneArrayMap.for_partition(self.partition, self.risk_map)
+        self.zone_incident_counts = ZoneArrayMap.for_partition(self.partition, self.zone_incident_counts)
+        for incident in self.incidents.values():
+            if incident.active:
+                self._active_incidents[incident.incident_id] = incident
+                self.unmet_responders += incident.missing_responders()
+        for patrol in self.patrols:
+            self.fleet_resources.add(patrol)
+            self._patrols_by_id[patrol.patrol_id] = patrol
+
+    @property
+    def alerts(self) -> AlertStore:
+        # Edge and disconnect alerts share the coordinator's bounded store.
+        return self.central_coordinator.alerts
 
     def recalculate_zones(self) -> None:
+        previous = ZoneGrid.of(self.partition)
         self.partition.recalculate(self.width, self.height, max(1, len(self.patrols)))
+        self.layout_version += 1
+        current = ZoneGrid.of(self.partition)
+        if current != previous:
+            self._remap_zone_state(ZoneRemap(previous, current))
         coverage = self.service_radius()
         operational = self.operational_radius()
         for patrol in self.patrols:
             patrol.coverage_radius = coverage
             patrol.operational_radius = operational
 
+    def _remap_zone_state(self, remap: ZoneRemap) -> None:
+        # Every (zx, zy) key refers to the old grid; move it instead of leaving it stale.
+        self.risk_map = ZoneArrayMap.for_partition(self.partition, remap.split(self.risk_map))
+        self.zone_incident_counts = ZoneArrayMap.for_partition(self.partition, remap.split(self.zone_incident_counts))
+        self.crime_field.remap_zones(remap)
+        self.metrics_engine.remap_zones(remap)
+        for patrol in self.patrols:
+            patrol.home_zone = remap.zone(patrol.home_zone)
+        self._zone_remaps.append(remap)
+
+    def _apply_zone_remaps(self, predictor: RiskPredictor, sue: BaseIncidentSource | None) -> None:
+        for remap in self._zone_remaps:
+            predictor.remap_zones(remap)
+            if sue is not None:
+                sue.remap_zones(remap)
+        self._zone_remaps.clear()
+
     def service_radius(self) -> float:
         return 2.5 * self.partition.cell_size
 
@@ -81,6 +179,7 @@ class World:
         bx = min(max(0.0, x), self.width)
         by = min(max(0.0, y), self.height)
         self.mechanic_base = (bx, by)
+        self.layout_version += 1
 
     def set_gas_stations(self, stations: list[tuple[float, float]]) -> None:
         normalized: list[tuple[float, float]] = []
@@ -89,6 +188,7 @@ class World:
             sy = min(max(0.0, y), self.height)
             normalized.append((sx, sy))
         self.gas_stations = normalized[:4]
+        self.layout_version += 1
 
     # Backward compatibility helper for old calls.
     def set_service_bases(self, bases: list[tuple[float, float]]) -> None:
@@ -107,24 +207,65 @@ class World:
             )
 
     def add_patrol(self, patrol: Patrol) -> None:
-        patrol.home_zone = self.zone_for_point(patrol.x, patrol.y)
-        patrol.coverage_radius = self.service_radius()
-        patrol.operational_radius = self.operational_radius()
-        self.patrols.append(patrol)
-        self.next_patrol_id = max(self.next_patrol_id, patrol.patrol_id + 1)
-        self.telemetry_emitters[patrol.unit_id] = TelemetryEmitter()
-        self.edge_twins[patrol.unit_id] = EdgeTwin(unit_id=patrol.unit_id)
-        self.central_coordinator.register_unit(patrol.patrol_id, patrol.unit_id)
+        self.add_patrols([patrol])
+
+    def add_patrols(self, patrols: list[Patrol]) -> None:
+        # Registers the whole batch and repartitions once; home zones are taken on the final grid.
+        for patrol in patrols:
+            self.patrols.append(patrol)
+            self.fleet_resources.add(patrol)
+            self._patrols_by_id[patrol.patrol_id] = patrol
+            self.next_patrol_id = max(self.next_patrol_id, patrol.patrol_id + 1)
+            self.telemetry_emitters[patrol.unit_id] = TelemetryEmitter()
+            self.edge_twins[patrol.unit_id] = EdgeTwin(unit_id=patrol.unit_id)
+            self.central_coordinator.register_unit(patrol.patrol_id, patrol.unit_id)
+        self.recalculate_zones()
+        for patrol in patrols:
+            patrol.home_zone = self.zone_for_point(patrol.x, patrol.y)
+
+    def remove_patrol(self, patrol_id: int) -> Patrol | None:
+        patrol = self._patrol_by_id(patrol_id)
+        if patrol is None:
+            return None
+        self.patrols.remove(patrol)
+        del self._patrols_by_id[patrol_id]
+        self.fleet_resources.remove(patrol)
+        # Only the incident it is still responding to loses it; a unit that already finished on
+        # scene keeps counting there, as it would had it stayed.
+        incident = self.incidents.get(patrol.target_incident_id) if patrol.target_incident_id is not None else None
+        if incident is not None and incident.active:
+            self._unassign_from_incident(incident, patrol_id)
+        self.telemetry_emitters.pop(patrol.unit_id, None)
+        self.edge_twins.pop(patrol.unit_id, None)
+        self.central_coordinator.unregister_unit(patrol_id)
         self.recalculate_zones()
+        return patrol
+
+    def travel_distance(self, a: tuple[float, float], b: tuple[float, float]) -> float:
+        if self.road_network is None:
+            return math.hypot(a[0] - b[0], a[1] - b[1])
+        return self.road_network.travel_distance(a, b)
+
+    def zone_eta_table(self) -> ZoneEtaTable:
+        key = (self.layout_version, id(self.road_network))
+        if self._eta_table is None or self._eta_table_key != key:
+            self._eta_table = ZoneEtaTable(self)
+            self._eta_table_key = key
+        return self._eta_table
 
     def zone_for_point(self, x: float, y: float) -> tuple[int, int]:
         return self.partition.point_to_zone(x, y)
 
+    def zone_id_for_point(self, x: float, y: float) -> int:
+        return self.partition.point_to_zone_id(x, y)
+
     def create_incident(self, x: float, y: float, severity: int, tick: int) -> Incident:
         x = min(max(0.0, x), self.width)
         y = min(max(0.0, y), self.height)
         severity = max(1, min(5, severity))
         zone = self.zone_for_point(x, y)
+        zone_id = self.partition.zone_id(zone)
+        self.partition.touch(zone)
         required_responders = self._required_responders(zone, severity)
         incident = Incident(
             incident_id=self.next_incident_id,
@@ -135,14 +276,29 @@ class World:
             required_responders=required_responders,
         )
         self.incidents[incident.incident_id] = incident
-        self.zone_incident_counts[zone] = self.zone_incident_counts.get(zone, 0) + 1
-        anticipated = self.risk_map.get(zone, 0.0) >= self.risk_high_threshold
-        self.metrics_engine.record_incident_created(tick, zone, anticipated)
+        self._active_incidents[incident.incident_id] = incident
+        self.unmet_responders += incident.missing_responders()
+        self.zone_incident_counts.add_id(zone_id, 1)
+        anticipated = self.risk_map.get_id(zone_id, 0.0) >= self.risk_high_threshold
+        self.metrics_engine.record_incident_created(tick, zone_id, anticipated)
         self.next_incident_id += 1
         return incident
 
     def active_incidents(self) -> list[Incident]:
-        return [incident for incident in self.incidents.values() if incident.active]
+        return list(self._active_incidents.values())
+
+    def active_incident_count(self) -> int:
+        return len(self._active_incidents)
+
+    def _assign_to_incident(self, incident: Incident, patrol_id: int) -> None:
+        before = incident.missing_responders()
+        incident.assign_patrol(patrol_id)
+        self.unmet_responders += incident.missing_responders() - before
+
+    def _unassign_from_incident(self, incident: Incident, patrol_id: int) -> None:
+        before = incident.missing_responders()
+        incident.unassign_patrol(patrol_id)
+        self.unmet_responders += incident.missing_responders() - before
 
     def step(
         self,
@@ -150,28 +306,86 @@ class World:
         dt: float,
         predictor: RiskPredictor,
         dispatcher: BaseDispatcher,
-        sue: StochasticUrbanSimulator | None = None,
+        sue: BaseIncidentSource | None = None,
     ) -> None:
-        if sue is not None:
-            self._generate_stochastic_incidents(sue, tick)
-        self._update_patrols(dt, tick, predictor)
-        self._resolve_stalled_incidents(tick, predictor)
-        self._emit_telemetry(tick)
-        self._consume_telemetry(tick)
+        if self._zone_remaps:
+            self._apply_zone_remaps(predictor, sue)
+        ctx = TickContext(tick, dt, predictor, dispatcher, sue, profiler=self.phase_profiler)
+        if ctx.profiler is not None:
+            ctx.profiler.begin_tick(tick)
+        self.run_phases(ctx, STEP_PHASES)
+        if ctx.profiler is not None:
+            ctx.profiler.end_tick()
+
+    def run_phases(self, ctx: TickContext, phases: tuple[tuple[str, Callable[[World, TickContext], None]], ...]) -> None:
+        # The one place phases run, so every engine gets the profiler laps for free.
+        profiler = ctx.profiler
+        for name, phase in phases:
+            phase(self, ctx)
+            if profiler is not None:
+                profiler.lap(name)
+
+    # ---------- step phases (see STEP_PHASES) ----------
+
+    def _phase_incident_generation(self, ctx: TickContext) -> None:
+        if ctx.sue is not None:
+            ctx.count("incidents_created", self._generate_stochastic_incidents(ctx.sue, ctx.tick))
+
+    def _phase_patrol_updates(self, ctx: TickContext) -> None:
+        self._update_patrols(ctx.dt, ctx.tick, ctx.predictor)
+
+    def _phase_stalled_resolution(self, ctx: TickContext) -> None:
+        self._resolve_stalled_incidents(ctx.tick, ctx.predictor)
+
+    def _phase_telemetry_emit(self, ctx: TickContext) -> None:
+        alerts_before = self.alerts.total
+        self._emit_telemetry(ctx.tick)
+        ctx.count("edge_alerts", self.alerts.total - alerts_before)
+
+    def _phase_telemetry_consume(self, ctx: TickContext) -> None:
+        alerts_before = self.alerts.total
+        ctx.count("packets_ingested", self._consume_telemetry(ctx.tick))
+        ctx.count("disconnect_alerts", self.alerts.total - alerts_before)
+
+    def _phase_dynamic_capacity(self, ctx: TickContext) -> None:
         self._manage_dynamic_patrol_capacity()
-        self._dispatch_incidents(dispatcher, tick)
-        if self.operating_mode == "intelligent":
-            predictor.update_risk_map(self, tick)
-            predicted_high_risk = predictor.high_risk_zones(self)
-            if hasattr(dispatcher, "filter_high_risk_zones"):
-                predicted_high_risk = dispatcher.filter_high_risk_zones(self, predicted_high_risk)
-            if hasattr(dispatcher, "rebalance_preventive"):
-                dispatcher.rebalance_preventive(self, predicted_high_risk)
-            high_risk_zones = set(predicted_high_risk)
-        else:
-            self.risk_map = {}
-            high_risk_zones = set()
-        self.metrics_engine.update_tick(self, tick, high_risk_zones)
+        if self._zone_remaps:
+            self._apply_zone_remaps(ctx.predictor, ctx.sue)
+
+    def _phase_dispatch(self, ctx: TickContext) -> None:
+        attempts, assignments = self._dispatch_incidents(ctx.dispatcher, ctx.tick)
+        ctx.count("dispatch_attempts", attempts)
+        ctx.count("assignments", assignments)
+
+    def _phase_risk_prediction(self, ctx: TickContext) -> None:
+        ctx.predicted_high_risk = self._predict_risk(ctx.tick, ctx.predictor, ctx.dispatcher)
+        ctx.count("risk_zones", len(self.risk_map))
+        ctx.count("high_risk_zones", len(ctx.predicted_high_risk))
+
+    def _phase_rebalancing(self, ctx: TickContext) -> None:
+        self._rebalance(ctx.dispatcher, ctx.predicted_high_risk)
+
+    def _phase_metrics(self, ctx: TickContext) -> None:
+        self.metrics_engine.update_tick(self, ctx.tick, set(ctx.predicted_high_risk), coverage=ctx.coverage)
+        if self.timeseries is not None:
+            self.timeseries.record(self, ctx.tick)
+        if self.recorder is not None:
+            self.recorder.record(self, ctx.tick)
+
+    def _predict_risk(self, tick: int, predictor: RiskPredictor, dispatcher: BaseDispatcher) -> list[tuple[int, int]]:
+        if self.operating_mode != "intelligent":
+            if self.risk_map:
+                self.risk_map = self.risk_map.like()
+            return []
+        predictor.update_risk_map(self, tick)
+        predicted_high_risk = predictor.high_risk_zones(self)
+        if hasattr(dispatcher, "filter_high_risk_zones"):
+            predicted_high_risk = dispatcher.filter_high_risk_zones(self, predicted_high_risk)
+        return predicted_high_risk
+
+    def _rebalance(self, dispatcher: BaseDispatcher, predicted_high_risk: list[tuple[int, int]]) -> None:
+        if self.operating_mode == "intelligent" and hasattr(dispatcher, "rebalance_preventive"):
+            dispatcher.rebalance_preventive(self, predicted_high_risk)
 
     def _resolve_stalled_incidents(self, tick: int, predictor: RiskPredictor) -> None:
         # Prevent incidents from staying active forever when quorum cannot be completed.
@@ -183,7 +397,9 @@ class World:
             # After sustained waiting, relax required responders to current feasible level.
             if age >= 70 and incident.required_responders > 1:
                 feasible = max(1, max(arrived, assigned))
+                before = incident.missing_responders()
                 incident.required_responders = min(incident.required_responders, feasible)
+                self.unmet_responders += incident.missing_responders() - before
 
             # If at least one unit is already on-scene and incident is old, close by degraded protocol.
             close_age = 25 if self.operating_mode == "intelligent" else 110
@@ -195,9 +411,11 @@ class World:
             if age >= 180 and incident.active:
                 self._resolve_incident(incident, tick, predictor)
 
-    def _generate_stochastic_incidents(self, sue: StochasticUrbanSimulator, tick: int) -> None:
-        for x, y, severity in sue.generate_incidents(self, tick):
+    def _generate_stochastic_incidents(self, sue: BaseIncidentSource, tick: int) -> int:
+        generated = sue.generate_incidents(self, tick)
+        for x, y, severity in generated:
             self.create_incident(x, y, severity, tick)
+        return len(generated)
 
     def _emit_telemetry(self, tick: int) -> None:
         unix_timestamp = 1_700_000_000 + tick
@@ -221,50 +439,35 @@ class World:
 
             emitter.emit(packet, self.telemetry_bus)
 
-    def _consume_telemetry(self, tick: int) -> None:
+    def _consume_telemetry(self, tick: int) -> int:
         unix_timestamp = 1_700_000_000 + tick
-        self.central_coordinator.consume_telemetry_bus(self.telemetry_bus, unix_timestamp)
+        ingested = self.central_coordinator.consume_telemetry_bus(self.telemetry_bus, unix_timestamp)
         self._apply_disconnect_states()
+        return ingested
 
-    def _register_edge_alerts(self, patrol: Patrol, timestamp: int, alerts: list[str]) -> None:
-        for message in alerts:
-            self.edge_alerts.append(
-                {
-                    "timestamp": timestamp,
-                    "unit_id": patrol.unit_id,
-                    "patrol_id": patrol.patrol_id,
-                    "alert": message,
-                    "action": "ALERT_ONLY",
-                }
-            )
+    def _register_edge_alerts(self, patrol: Patrol, timestamp: int, alerts: list[tuple[AlertType, tuple[float, ...]]]) -> None:
+        store = self.alerts
+        for kind, payload in alerts:
+            store.append(kind, patrol.patrol_id, timestamp, payload)
 
-    def telemetry_for_patrol(self, patrol_id: int) -> TelemetryPacket | None:
-        state = self.central_coordinator.get_state_by_patrol_id(patrol_id)
-        if state is None:
-            return None
-        return TelemetryPacket(
-            unit_id=state.unit_id,
-            timestamp=state.timestamp,
-            position=state.position,
-            speed=state.speed,
-            fuel_level=state.fuel_level,
-            engine_temperature=state.engine_temperature,
-            tire_pressure=state.tire_pressure,
-            mechanical_status=state.mechanical_status,
-            patrol_state=state.patrol_state,
-        )
+    def telemetry_for_patrol(self, patrol_id: int) -> UnitOperationalState | None:
+        # Live view of the coordinator's state, updated in place on ingest; treat as read-only.
+        return self.central_coordinator.get_state_by_patrol_id(patrol_id)
 
     def _apply_disconnect_states(self) -> None:
         # Disconnects remain as central alerts/flags only; no forced local shutdown.
         return
 
-    def _dispatch_incidents(self, dispatcher: BaseDispatcher, tick: int) -> None:
+    def _dispatch_incidents(self, dispatcher: BaseDispatcher, tick: int) -> tuple[int, int]:
         unix_timestamp = 1_700_000_000 + tick
+        attempts = 0
+        assignments = 0
         for incident in self._prioritized_incidents():
-            while incident.needs_more_units():
+            while self._needs_more_units(incident):
+                attempts += 1
                 previous_state = self._audit_state_snapshot(incident, None)
                 event_received = self._audit_event_payload(incident)
-                patrol_id = dispatcher.select_patrol(self, incident, excluded_patrol_ids=incident.assigned_patrol_ids)
+                patrol_id = self._select_responder(dispatcher, incident)
                 if patrol_id is None:
                     posterior_state = self._audit_state_snapshot(incident, None)
                     self.audit_logger.log_entry(
@@ -284,8 +487,9 @@ class World:
                 if patrol.state == PatrolState.PREVENTIVE_PATROL:
                     patrol.target_x = None
                     patrol.target_y = None
-                incident.assign_patrol(patrol_id)
+                self._assign_to_incident(incident, patrol_id)
                 patrol.assign_to_incident(incident.incident_id, incident.pos)
+                assignments += 1
                 posterior_state = self._audit_state_snapshot(incident, patrol_id)
                 self.audit_logger.log_entry(
                     timestamp=unix_timestamp,
@@ -296,12 +500,18 @@ class World:
                     posterior_state=posterior_state,
                     score_calculated=score,
                 )
+        return attempts, assignments
+
+    def _needs_more_units(self, incident: Incident) -> bool:
+        # Overridden by shard worlds, which also count the units other shards are lending.
+        return incident.needs_more_units()
+
+    def _select_responder(self, dispatcher: BaseDispatcher, incident: Incident) -> int | None:
+        # Overridden by shard worlds, which leave the slot to a closer unit of another shard.
+        return dispatcher.select_patrol(self, incident, excluded_patrol_ids=incident.assigned_patrol_ids)
 
     def _patrol_by_id(self, patrol_id: int) -> Patrol | None:
-        for patrol in self.patrols:
-            if patrol.patrol_id == patrol_id:
-                return patrol
-        return None
+        return self._patrols_by_id.get(patrol_id)
 
     def _audit_event_payload(self, incident: Incident) -> dict:
         zone = self.zone_for_point(incident.x, incident.y)
@@ -346,45 +556,54 @@ class World:
         return prioritized
 
     def _incident_priority(self, incident: Incident) -> float:
-        zone = self.zone_for_point(incident.x, incident.y)
-        zone_risk = self.risk_map.get(zone, 0.0)
-        zone_history = self.zone_incident_counts.get(zone, 0)
+        zone_id = self.zone_id_for_point(incident.x, incident.y)
+        zone_risk = self.risk_map.get_id(zone_id, 0.0)
+        zone_history = self.zone_incident_counts.get_id(zone_id, 0)
         unmet = max(0, incident.required_responders - len(incident.assigned_patrol_ids))
         return (4.0 * incident.severity) + (1.8 * zone_risk) + (0.45 * zone_history) + (2.0 * unmet)
 
     def _update_patrols(self, dt: float, tick: int, predictor: RiskPredictor) -> None:
+        needs = self._service_needs()
+        lazy_zones = self.partition.lazy
+        self._patrol_cover = {}
         for patrol in self.patrols:
             if patrol.state == PatrolState.OUT_OF_SERVICE:
                 continue
 
-            self._ensure_service_policy(patrol)
+            self._ensure_service_policy(patrol, needs.get(patrol.patrol_id))
+            if self.road_network is not None:
+                self._ensure_route(patrol)
 
             if patrol.has_target():
                 arrived = patrol.update_motion(dt)
+                if lazy_zones:
+                    self.partition.touch(self.zone_for_point(patrol.x, patrol.y))
                 if arrived:
                     self._handle_arrival(patrol, tick, predictor)
 
             patrol.update_task()
             patrol.cool_down_idle()
             self._ensure_patrolling_behavior(patrol, tick)
+            self._refresh_patrol_cover(patrol)
+        self._patrol_cover = None
 
-    def _ensure_service_policy(self, patrol: Patrol) -> None:
-        in_service_flow = patrol.state in {
-            PatrolState.REFUELING,
-            PatrolState.MAINTENANCE,
-            PatrolState.EMERGENCY_RETURN,
-        }
-        if in_service_flow:
+    def _ensure_route(self, patrol: Patrol) -> None:
+        if not patrol.has_target():
+            if patrol.route_target is not None:
+                patrol.clear_route()
             return
+        target = (patrol.target_x, patrol.target_y)
+        if patrol.route_target != target:
+            patrol.route = self.road_network.route(patrol.pos, target)
+            patrol.route_target = target
 
-        telemetry = self.telemetry_for_patrol(patrol.patrol_id)
-        if telemetry is None:
+    def _ensure_service_policy(self, patrol: Patrol, need_kind: str | None) -> None:
+        if need_kind is None or patrol.state in SERVICE_FLOW_STATES:
             return
 
-        need_kind = self._service_need_kind(patrol, telemetry)
-        if need_kind is None:
-            return
-        critical = telemetry.fuel_level <= self.fuel_critical_threshold or telemetry.mechanical_status == "CRITICAL"
+        fleet = self.central_coordinator.fleet
+        slot = fleet.slots[patrol.patrol_id]
+        critical = bool(fleet.fuel[slot] <= self.fuel_critical_threshold or fleet.mech[slot] == MECH_CODES["CRITICAL"])
 
         objective = self._patrol_objective_point(patrol)
         service_target = self._service_target_for(patrol, need_kind, objective)
@@ -392,7 +611,7 @@ class World:
         if patrol.state == PatrolState.RESPONDING and patrol.target_incident_id is not None:
             incident = self.incidents.get(patrol.target_incident_id)
             if incident and incident.active:
-                incident.unassign_patrol(patrol.patrol_id)
+                self._unassign_from_incident(incident, patrol.patrol_id)
             patrol.target_incident_id = None
 
         patrol.set_service_target(service_target, emergency=critical)
@@ -406,17 +625,55 @@ class World:
             return (patrol.target_x, patrol.target_y)
         return None
 
-    def _service_need_kind(self, patrol: Patrol, telemetry: TelemetryPacket) -> str | None:
-        if telemetry.fuel_level <= self.fuel_low_threshold:
-            return "fuel"
-        if telemetry.mechanical_status == "CRITICAL":
-            return "mechanical"
+    def _service_needs(self) -> dict[int, str]:
+        # Fuel/mechanical check for the whole fleet as array expressions over the coordinator's
+        # columns; the station comes from the zone table, distances from each reported position.
+        # Objectives are read before any patrol moves this tick.
+        fleet = self.central_coordinator.fleet
+        slots: list[int] = []
+        objective_x: list[float] = []
+        objective_y: list[float] = []
+        for patrol in self.patrols:
+            if patrol.state == PatrolState.OUT_OF_SERVICE or patrol.state in SERVICE_FLOW_STATES:
+                continue
+            slot = fleet.slots.get(patrol.patrol_id)
+            if slot is None or not fleet.reported[slot]:
+                continue
+            objective = self._patrol_objective_point(patrol)
+            slots.append(slot)
+            objective_x.append(math.nan if objective is None else objective[0])
+            objective_y.append(math.nan if objective is None else objective[1])
+        if not slots:
+            return {}
+
+        index = np.array(slots, dtype=np.intp)
+        fuel = fleet.fuel[index]
+        mech = fleet.mech[index]
+        station_distance, mechanic_distance = self._service_distances(
+            fleet.x[index], fleet.y[index], np.array(objective_x), np.array(objective_y)
+        )
 
-        if self._predictive_fuel_needed(patrol, telemetry):
-            return "fuel"
-        if self._predictive_mech_needed(patrol, telemetry):
-            return "mechanical"
-        return None
+        margin = self.predictive_margin_factor
+        fuel_after_arrival = fuel - (station_distance * self.fuel_consumption_per_unit * margin + self.predictive_fuel_reserve)
+        mech_after_arrival = MECH_HEALTH_ARRAY[mech] - (mechanic_distance * self.mech_wear_per_unit * margin + self.predictive_mech_reserve)
+        mech_critical = mech == MECH_CODES["CRITICAL"]
+        # Same precedence as checking one unit at a time: low fuel, critical mechanics, then margins.
+        needs_fuel = (fuel <= self.fuel_low_threshold) | (~mech_critical & (fuel_after_arrival <= self.fuel_critical_threshold))
+        needs_mech = ~needs_fuel & (mech_critical | (mech_after_arrival <= self.mech_critical_threshold))
+
+        patrol_ids = fleet.patrol_ids[index]
+        needs = dict.fromkeys(patrol_ids[needs_fuel].tolist(), "fuel")
+        needs.update(dict.fromkeys(patrol_ids[needs_mech].tolist(), "mechanical"))
+        return needs
+
+    def _service_distances(self, xs: np.ndarray, ys: np.ndarray, ox: np.ndarray, oy: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        # Per unit: distance to the station it would refuel at (objective NaN when it has none)
+        # and to the mechanic base.
+        table = self.zone_eta_table()
+        zones = table.point_indices(xs, ys)
+        has_objective = ~np.isnan(ox)
+        objective_zones = np.where(has_objective, table.point_indices(np.nan_to_num(ox), np.nan_to_num(oy)), -1)
+        return table.service_distances(xs, ys, zones, objective_zones)
 
     def _service_target_for(self, patrol: Patrol, need_kind: str, objective: tuple[float, float] | None = None) -> tuple[float, float]:
         if need_kind == "fuel":
@@ -424,33 +681,12 @@ class World:
         return self.mechanic_base
 
     def _best_gas_station_for(self, patrol: Patrol, objective: tuple[float, float] | None = None) -> tuple[float, float]:
-        stations = self.gas_stations or [self.mechanic_base]
+        table = self.zone_eta_table()
         px, py = self._patrol_position_for_planning(patrol)
-        best = stations[0]
-        best_cost = float("inf")
-        for station in stations:
-            cost = math.hypot(px - station[0], py - station[1])
-            if objective is not None:
-                cost += 0.2 * math.hypot(station[0] - objective[0], station[1] - objective[1])
-            if cost < best_cost:
-                best_cost = cost
-                best = station
-        return best
-
-    def _predictive_fuel_needed(self, patrol: Patrol, telemetry: TelemetryPacket) -> bool:
-        target = self._best_gas_station_for(patrol, self._patrol_objective_point(patrol))
-        distance = math.hypot(telemetry.position[0] - target[0], telemetry.position[1] - target[1])
-        fuel_needed = distance * self.fuel_consumption_per_unit
-        fuel_after_arrival = telemetry.fuel_level - (fuel_needed * self.predictive_margin_factor + self.predictive_fuel_reserve)
-        return fuel_after_arrival <= self.fuel_critical_threshold
-
-    def _predictive_mech_needed(self, patrol: Patrol, telemetry: TelemetryPacket) -> bool:
-        target = self.mechanic_base
-        distance = math.hypot(telemetry.position[0] - target[0], telemetry.position[1] - target[1])
-        mech_needed = distance * self.mech_wear_per_unit
-        mech_health = 1.0 if telemetry.mechanical_status == "OK" else (0.45 if telemetry.mechanical_status == "WARN" else 0.15)
-        mech_after_arrival = mech_health - (mech_needed * self.predictive_margin_factor + self.predictive_mech_reserve)
-        return mech_after_arrival <= self.mech_critical_threshold
+        zone = self.zone_for_point(px, py)
+        if objective is None:
+            return table.best_station(zone)
+        return table.best_station_for(zone, self.zone_for_point(objective[0], objective[1]))
 
     def _handle_arrival(self, patrol: Patrol, tick: int, predictor: RiskPredictor) -> None:
         if patrol.state == PatrolState.RESPONDING and patrol.target_incident_id is not None:
@@ -465,9 +701,11 @@ class World:
     def _resolve_incident(self, incident: Incident, tick: int, predictor: RiskPredictor) -> None:
         incident.active = False
         incident.resolved_tick = tick
+        if self._active_incidents.pop(incident.incident_id, None) is not None:
+            self.unmet_responders -= incident.missing_responders()
         zone = self.zone_for_point(incident.x, incident.y)
         predictor.record_incident(zone, incident.severity, tick)
-        self.metrics_engine.record_incident_resolved(incident.created_tick, tick)
+        self.metrics_engine.record_incident_resolved(incident.created_tick, tick, incident.severity, zone, self.operating_mode)
 
         for patrol in self.patrols:
             if patrol.target_incident_id != incident.incident_id:
@@ -496,12 +734,13 @@ class World:
                 dispatchable_now += 1
         shortfall = max(0, pending_demand - dispatchable_now)
         creatable = max(0, self.max_patrols - len(self.patrols))
-        for _ in range(min(shortfall, creatable)):
-            self._spawn_dynamic_patrol()
+        spawned = [self._dynamic_patrol() for _ in range(min(shortfall, creatable))]
+        if spawned:
+            self.add_patrols(spawned)
 
         self._send_dynamic_reserve_to_base()
 
-    def _spawn_dynamic_patrol(self) -> None:
+    def _dynamic_patrol(self) -> Patrol:
         if self.mechanic_base == (0.0, 0.0):
             self.set_service_bases([])
         base = self.mechanic_base
@@ -509,7 +748,7 @@ class World:
             patrol_id=self.next_patrol_id,
             x=base[0],
             y=base[1],
-            speed=random.uniform(47.0, 72.0),
+            speed=self._rng().uniform(47.0, 72.0),
             fuel_level=1.0,
             mechanical_health=1.0,
             state=PatrolState.IDLE,
@@ -517,7 +756,7 @@ class World:
             is_dynamic=True,
         )
         self.next_patrol_id += 1
-        self.add_patrol(patrol)
+        return patrol
 
     def _send_dynamic_reserve_to_base(self) -> None:
         for patrol in self.patrols:
@@ -554,44 +793,89 @@ class World:
         if tick % self.patrol_retarget_interval_ticks != 0 and patrol.state in {PatrolState.PATROLLING, PatrolState.PREVENTIVE_PATROL}:
             return
 
-        target_zone = self._select_patrol_target_zone(patrol)
-        target = self.partition.zone_center(target_zone)
-        patrol.set_patrol_target(target)
+        patrol.set_patrol_target(self._select_patrol_target(patrol))
+
+    def _select_patrol_target(self, patrol: Patrol) -> tuple[float, float]:
+        # Overridden by shard worlds, whose targets may lie in another shard.
+        return self.partition.zone_center(self._select_patrol_target_zone(patrol))
 
     def _patrol_position_for_planning(self, patrol: Patrol) -> tuple[float, float]:
-        telemetry = self.telemetry_for_patrol(patrol.patrol_id)
-        if telemetry is not None:
-            return telemetry.position
+        state = self.central_coordinator.get_state_by_patrol_id(patrol.patrol_id)
+        if state is not None:
+            return state.position
         return (patrol.x, patrol.y)
 
     def _select_patrol_target_zone(self, patrol: Patrol) -> tuple[int, int]:
-        patrol_positions = [
-            self._patrol_position_for_planning(p)
-            for p in self.patrols
-            if p.patrol_id != patrol.patrol_id and p.state not in {PatrolState.OUT_OF_SERVICE, PatrolState.EMERGENCY_RETURN}
-        ]
         px, py = self._patrol_position_for_planning(patrol)
         best_zone = self.zone_for_point(px, py)
+        centers = self.zone_eta_table().centers
+        cover_counts = self._other_patrols_cover(patrol)
+        if self.partition.lazy:
+            proximity_scale = max(1.0, self.partition.cell_size * 8.0)
+            return self._nearest_patrol_target_zone(px, py, cover_counts, proximity_scale, best_zone)
+        best_id = best_patrol_zone_id(self.partition, centers, cover_counts, px, py)
+        return best_zone if best_id < 0 else self.partition.zone_of(best_id)
+
+    def _other_patrols_cover(self, patrol: Patrol) -> dict[int, int]:
+        # Cover counts of every other unit. In a patrol update pass they are built once and kept
+        # current unit by unit (_refresh_patrol_cover) instead of rescanning the fleet for each
+        # target; the unit's own zones stay out until its update is over.
+        radius = patrol.coverage_radius
+        passes = self._patrol_cover
+        cover = None if passes is None else passes.get(radius)
+        if cover is None:
+            cover = ({}, {})
+            for other in self.patrols:
+                self._set_patrol_cover(cover, other, radius, other.patrol_id != patrol.patrol_id)
+            if passes is not None:
+                passes[radius] = cover
+        else:
+            self._set_patrol_cover(cover, patrol, radius, False)
+        return cover[0]
+
+    def _refresh_patrol_cover(self, patrol: Patrol) -> None:
+        for radius, cover in (self._patrol_cover or {}).items():
+            self._set_patrol_cover(cover, patrol, radius, True)
+
+    def _set_patrol_cover(self, cover: PatrolCover, patrol: Patrol, radius: float, counted: bool) -> None:
+        counts, zones_by_unit = cover
+        position = None
+        if counted and patrol.state not in {PatrolState.OUT_OF_SERVICE, PatrolState.EMERGENCY_RETURN}:
+            position = self._patrol_position_for_planning(patrol)
+        previous = zones_by_unit.get(patrol.patrol_id)
+        # Reported positions only change between passes, so most refreshes find nothing to do.
+        if previous is not None and previous[0] == position:
+            return
+        for zone_id in previous[1] if previous is not None else ():
+            counts[zone_id] -= 1
+        zone_ids = [] if position is None else patrol_cover_zone_ids(self.partition, self.zone_eta_table().centers, position, radius)
+        for zone_id in zone_ids:
+            counts[zone_id] = counts.get(zone_id, 0) + 1
+        zones_by_unit[patrol.patrol_id] = (position, zone_ids)
+
+    def _nearest_patrol_target_zone(
+        self,
+        px: float,
+        py: float,
+        cover_counts: dict[int, int],
+        proximity_scale: float,
+        best_zone: tuple[int, int],
+    ) -> tuple[int, int]:
+        # Same score over live leaves only, visited nearest first: once an uncovered zone at
+        # this distance could not win, nothing farther away can either.
+        cols = self.partition.cols
         best_score = -10e9
-
-        for zx in range(self.partition.cols):
-            for zy in range(self.partition.rows):
-                zone = (zx, zy)
-                cx, cy = self.partition.zone_center(zone)
-                cover_count = 0
-                for ox, oy in patrol_positions:
-                    if math.hypot(ox - cx, oy - cy) <= patrol.coverage_radius:
-                        cover_count += 1
-
-                uncovered_bonus = 5.0 if cover_count == 0 else (1.2 if cover_count == 1 else 0.0)
-                overcrowded_penalty = max(0, cover_count - 1) * 2.6
-                proximity_penalty = math.hypot(px - cx, py - cy) / max(1.0, self.partition.cell_size * 8.0)
-                # Base coverage behavior. Intelligent mode adds predictive rebalancing separately in dispatcher.
-                score = (2.2 * uncovered_bonus) - (1.8 * overcrowded_penalty) - proximity_penalty
-                if score > best_score:
-                    best_score = score
-                    best_zone = zone
-
+        for distance, (zx, zy) in self.partition.nearest_zones(px, py):
+            proximity = distance / proximity_scale
+            if 11.0 - proximity <= best_score:
+                break
+            cover_count = cover_counts.get(zy * cols + zx, 0)
+            uncovered_bonus = 5.0 if cover_count == 0 else (1.2 if cover_count == 1 else 0.0)
+            overcrowded_penalty = max(0, cover_count - 1) * 2.6
+            score = (2.2 * uncovered_bonus) - (1.8 * overcrowded_penalty) - proximity
+            if score > best_score:
+                best_score = score
+                best_zone = (zx, zy)
         return best_zone
 
     def _required_responders(self, zone: tuple[int, int], severity: int) -> int:
@@ -603,22 +887,93 @@ class World:
             responders += 1
         if zone_history >= 7:
             responders += 1
-        return min(max(1, responders), max(1, len(self.patrols)))
+        return min(max(1, responders), max(1, self.fleet_size()))
+
+    def fleet_size(self) -> int:
+        # Overridden by shard worlds, which own only part of the fleet.
+        return len(self.patrols)
 
     def all_relevant_zones(self) -> set[tuple[int, int]]:
-        zones = set(self.risk_map.keys())
+        return {self.partition.zone_of(zone_id) for zone_id in self.relevant_zone_ids()}
+
+    def relevant_zone_ids(self) -> set[int]:
+        point_id = self.partition.point_to_zone_id
+        zones = set(self.risk_map.ids())
         for patrol in self.patrols:
             px, py = self._patrol_position_for_planning(patrol)
-            zones.add(self.zone_for_point(px, py))
+            zones.add(point_id(px, py))
         for incident in self.active_incidents():
-            zones.add(self.zone_for_point(incident.x, incident.y))
-        zones.add(self.zone_for_point(self.mechanic_base[0], self.mechanic_base[1]))
+            zones.add(point_id(incident.x, incident.y))
+        zones.add(point_id(self.mechanic_base[0], self.mechanic_base[1]))
         for gx, gy in self.gas_stations:
-            zones.add(self.zone_for_point(gx, gy))
+            zones.add(point_id(gx, gy))
         return zones
 
     def random_zone(self) -> tuple[int, int]:
+        rng = self._rng()
         return (
-            random.randint(0, max(0, self.partition.cols - 1)),
-            random.randint(0, max(0, self.partition.rows - 1)),
+            rng.randint(0, max(0, self.partition.cols - 1)),
+            rng.randint(0, max(0, self.partition.rows - 1)),
         )
+
+    def _rng(self):
+        return self.spawn_rng if self.spawn_rng is not None else random
+
+
+def patrol_cover_zone_ids(partition, centers, position: tuple[float, float], radius: float) -> list[int]:
+    # Zone ids a unit covers; only zones whose centre falls inside its radius box can qualify.
+    cols, rows = partition.cols, partition.rows
+    cell = partition.cell_size
+    ox, oy = position
+    zone_ids = []
+    for zx in range(max(0, int((ox - radius) // cell)), min(cols - 1, int((ox + radius) // cell)) + 1):
+        for zy in range(max(0, int((oy - radius) // cell)), min(rows - 1, int((oy + radius) // cell)) + 1):
+            cx, cy = centers[zy * cols + zx]
+            if math.hypot(ox - cx, oy - cy) <= radius:
+                zone_ids.append(zy * cols + zx)
+    return zone_ids
+
+
+def patrol_cover_counts(partition, centers, positions, radius: float) -> dict[int, int]:
+    # Units covering each zone id.
+    cover_counts: dict[int, int] = {}
+    for position in positions:
+        for zone_id in patrol_cover_zone_ids(partition, centers, position, radius):
+            cover_counts[zone_id] = cover_counts.get(zone_id, 0) + 1
+    return cover_counts
+
+
+def best_patrol_zone_id(partition, centers, cover_counts: dict[int, int], px: float, py: float) -> int:
+    # Patrol target score over a dense grid; -1 when no zone scores above the floor.
+    proximity_scale = max(1.0, partition.cell_size * 8.0)
+    best_score = -10e9
+    best_id = -1
+    for zone_id in partition.iter_zone_ids():
+        cover_count = cover_counts.get(zone_id, 0)
+        uncovered_bonus = 5.0 if cover_count == 0 else (1.2 if cover_count == 1 else 0.0)
+        overcrowded_penalty = max(0, cover_count - 1) * 2.6
+        # Base coverage behavior. Intelligent mode adds predictive rebalancing separately in dispatcher.
+        base_score = (2.2 * uncovered_bonus) - (1.8 * overcrowded_penalty)
+        # The proximity penalty is never negative, so this zone cannot beat the best one.
+        if base_score <= best_score:
+            continue
+        cx, cy = centers[zone_id]
+        score = base_score - math.hypot(px - cx, py - cy) / proximity_scale
+        if score > best_score:
+            best_score = score
+            best_id = zone_id
+    return best_id
+
+
+# World.step in execution order, as (profiler phase name, phase). Other engines run slices of
+# it through World.run_phases and swap in their own versions of single phases.
+STEP_PHASES: tuple[tuple[str, Callable[[World, TickContext], None]], ...] = tuple(
+    (name, getattr(World, f"_phase_{name}")) for name in PHASES
+)
+STEP_PHASE_BY_NAME = dict(STEP_PHASES)
+
+
+def step_phases(first: str, last: str) -> tuple[tuple[str, Callable[[World, TickContext], None]], ...]:
+    # STEP_PHASES from `first` to `last`, both included.
+    names = [name for name, _ in STEP_PHASES]
+    return STEP_PHASES[names.index(first) : names.index(last) + 1]
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import math
+
+import numpy as np
+
+
+class _LazyCenters(dict):
+    # Zone centres by flat index, computed on first use for partitions too large to enumerate.
+
+    def __init__(self, partition) -> None:
+        super().__init__()
+        self._partition = partition
+
+    def __missing__(self, index: int) -> tuple[float, float]:
+        cols = self._partition.cols
+        center = self._partition.zone_center((index % cols, index // cols))
+        self[index] = center
+        return center
+
+
+class ZoneEtaTable:
+    # Zone-centre travel distances for one layout. Rows and station choices are filled lazily
+    # and the whole table is dropped when World.layout_version changes.
+
+    def __init__(self, world) -> None:
+        partition = world.partition
+        self.cols = partition.cols
+        self.rows = partition.rows
+        self.lazy = partition.lazy
+        self.width = partition.width
+        self.height = partition.height
+        self.cell_size = partition.cell_size
+        if self.lazy:
+            self.centers = _LazyCenters(partition)
+        else:
+            self.centers = [partition.zone_center((i % self.cols, i // self.cols)) for i in range(self.cols * self.rows)]
+        self.stations = list(world.gas_stations or [world.mechanic_base])
+        self.mechanic_base = world.mechanic_base
+        self._travel = world.travel_distance
+        self._straight = world.road_network is None
+        self._distance_rows: dict[int, list[float]] = {}
+        self._distance_pairs: dict[tuple[int, int], float] = {}
+        self._station_rows: dict[int, list[float]] = {}
+        self._best_station: dict[int, tuple[float, float]] = {}
+        self._objective_station: dict[tuple[int, int], tuple[float, float]] = {}
+
+    def index(self, zone: tuple[int, int]) -> int:
+        zx = min(max(zone[0], 0), self.cols - 1)
+        zy = min(max(zone[1], 0), self.rows - 1)
+        return zy * self.cols + zx
+
+    def point_indices(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        # Vector form of partition.point_to_zone_id.
+        zx = np.clip(xs, 0.0, self.width - 1e-6) // self.cell_size
+        zy = np.clip(ys, 0.0, self.height - 1e-6) // self.cell_size
+        zx = np.minimum(zx.astype(np.int64), self.cols - 1)
+        zy = np.minimum(zy.astype(np.int64), self.rows - 1)
+        return zy * self.cols + zx
+
+    def distance(self, origin: tuple[int, int], destination: tuple[int, int]) -> float:
+        source = self.index(origin)
+        if self.lazy:
+            # Full rows would span every leaf of the map; keep only the pairs actually asked for.
+            key = (source, self.index(destination))
+            distance = self._distance_pairs.get(key)
+            if distance is None:
+                distance = self._travel(self.centers[key[0]], self.centers[key[1]])
+                self._distance_pairs[key] = distance
+            return distance
+        row = self._distance_rows.get(source)
+        if row is None:
+            center = self.centers[source]
+            row = [self._travel(center, other) for other in self.centers]
+            self._distance_rows[source] = row
+        return row[self.index(destination)]
+
+    def _station_distances(self, zone_index: int) -> list[float]:
+        row = self._station_rows.get(zone_index)
+        if row is None:
+            center = self.centers[zone_index]
+            row = [self._travel(center, station) for station in self.stations]
+            self._station_rows[zone_index] = row
+        return row
+
+    def best_station(self, zone: tuple[int, int]) -> tuple[float, float]:
+        # Voronoi cell lookup: nearest station to the zone centre.
+        index = self.index(zone)
+        station = self._best_station.get(index)
+        if station is None:
+            distances = self._station_distances(index)
+            station = self.stations[min(range(len(distances)), key=distances.__getitem__)]
+            self._best_station[index] = station
+        return station
+
+    def best_station_for(self, zone: tuple[int, int], objective_zone: tuple[int, int]) -> tuple[float, float]:
+        # Same detour cost as the per-patrol loop it replaces: reach the station, then 0.2x the way on.
+        key = (self.index(zone), self.index(objective_zone))
+        station = self._objective_station.get(key)
+        if station is None:
+            to_station = self._station_distances(key[0])
+            onward = self._station_distances(key[1])
+            best_cost = math.inf
+            for candidate, first, second in zip(self.stations, to_station, onward):
+                cost = first + 0.2 * second
+                if cost < best_cost:
+                    best_cost = cost
+                    station = candidate
+            self._objective_station[key] = station
+        return station
+
+    def service_distances(
+        self, xs: np.ndarray, ys: np.ndarray, zones: np.ndarray, objective_zones: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray]:
+        # Per unit: the station best_station (objective -1) or best_station_for would pick for its
+        # zone, from the same cached rows, then the distances from the unit's exact position to
+        # that station and to the mechanic base.
+        needed = np.unique(np.concatenate((zones, objective_zones[objective_zones >= 0])))
+        matrix = np.array([self._station_distances(index) for index in needed.tolist()]).reshape(len(needed), len(self.stations))
+        cost = matrix[np.searchsorted(needed, zones)]
+        has_objective = objective_zones >= 0
+        cost[has_objective] += 0.2 * matrix[np.searchsorted(needed, objective_zones[has_objective])]
+        # argmin keeps the first of equal costs, like the scalar lookups.
+        stations = np.array(self.stations)[np.argmin(cost, axis=1)]
+        mx, my = self.mechanic_base
+        if self._straight:
+            return np.hypot(stations[:, 0] - xs, stations[:, 1] - ys), np.hypot(mx - xs, my - ys)
+        positions = list(zip(xs.tolist(), ys.tolist()))
+        to_station = [self._travel(position, (sx, sy)) for position, (sx, sy) in zip(positions, stations.tolist())]
+        to_mechanic = [self._travel(position, (mx, my)) for position in positions]
+        return np.array(to_station), np.array(to_mechanic)
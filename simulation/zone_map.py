@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+from collections.abc import Iterator, MutableMapping
+from typing import Any, Mapping
+
+
+class _SparseSlots(dict):
+    # Missing ids read as None, like an empty slot of the dense list, without being inserted.
+
+    def __missing__(self, zone_id: int) -> None:
+        return None
+
+
+class ZoneArrayMap(MutableMapping):
+    # Per-zone state indexed by flat zone id (zy * cols + zx). On a dense grid `slots` is a list
+    # with one entry per zone, None where nothing is stored; on a lazy partition it is a dict of
+    # the ids actually set, which reads missing ids as None too. Hot paths read and write
+    # `slots` or the *_id methods directly.
+    #
+    # The (zx, zy) mapping interface is the compatibility layer for the renderer, ZoneRemap and
+    # any caller written against the old tuple-keyed dicts. It iterates in insertion order like
+    # those dicts did, and keys off the grid are simply never present. Values cannot be None.
+
+    __slots__ = ("cols", "rows", "sparse", "slots", "_order")
+
+    def __init__(self, cols: int, rows: int, sparse: bool = False, items: Mapping[tuple[int, int], Any] | None = None) -> None:
+        self.cols = cols
+        self.rows = rows
+        self.sparse = sparse
+        self.slots: list[Any] | _SparseSlots = _SparseSlots() if sparse else [None] * (cols * rows)
+        # Dense only: ids in insertion order (a dict keeps its own).
+        self._order: list[int] = []
+        if items:
+            for zone, value in items.items():
+                zone_id = self.zone_id(zone)
+                if zone_id >= 0:
+                    self.set_id(zone_id, value)
+
+    @classmethod
+    def for_partition(cls, partition, items: Mapping[tuple[int, int], Any] | None = None) -> ZoneArrayMap:
+        return cls(partition.cols, partition.rows, sparse=partition.lazy, items=items)
+
+    def like(self, items: Mapping[tuple[int, int], Any] | None = None) -> ZoneArrayMap:
+        # Empty (or refilled) map on the same grid.
+        return ZoneArrayMap(self.cols, self.rows, sparse=self.sparse, items=items)
+
+    def fits(self, partition) -> bool:
+        return self.cols == partition.cols and self.rows == partition.rows
+
+    # ---------- ids ----------
+
+    def zone_id(self, zone: tuple[int, int]) -> int:
+        zx, zy = zone
+        if 0 <= zx < self.cols and 0 <= zy < self.rows:
+            return zy * self.cols + zx
+        return -1
+
+    def get_id(self, zone_id: int, default: Any = None) -> Any:
+        value = self.slots[zone_id]
+        return default if value is None else value
+
+    def set_id(self, zone_id: int, value: Any) -> None:
+        slots = self.slots
+        if not self.sparse and slots[zone_id] is None:
+            self._order.append(zone_id)
+        slots[zone_id] = value
+
+    def add_id(self, zone_id: int, amount: float) -> None:
+        value = self.slots[zone_id]
+        self.set_id(zone_id, amount if value is None else value + amount)
+
+    def list_id(self, zone_id: int) -> list:
+        # Per-zone history list, created on first use (defaultdict(list) style).
+        history = self.slots[zone_id]
+        if history is None:
+            history = []
+            self.set_id(zone_id, history)
+        return history
+
+    def del_id(self, zone_id: int) -> None:
+        if self.slots[zone_id] is None:
+            raise KeyError(zone_id)
+        if self.sparse:
+            del self.slots[zone_id]
+        else:
+            self.slots[zone_id] = None
+            self._order.remove(zone_id)
+
+    def ids(self) -> list[int]:
+        return list(self.slots) if self.sparse else list(self._order)
+
+    def id_items(self) -> Iterator[tuple[int, Any]]:
+        if self.sparse:
+            return iter(list(self.slots.items()))
+        slots = self.slots
+        return ((zone_id, slots[zone_id]) for zone_id in list(self._order))
+
+    # ---------- (zx, zy) compatibility ----------
+
+    def __len__(self) -> int:
+        return len(self.slots) if self.sparse else len(self._order)
+
+    def __iter__(self) -> Iterator[tuple[int, int]]:
+        cols = self.cols
+        for zone_id in self.ids():
+            yield (zone_id % cols, zone_id // cols)
+
+    def __contains__(self, zone: object) -> bool:
+        try:
+            zone_id = self.zone_id(zone)
+        except (TypeError, ValueError):
+            return False
+        return zone_id >= 0 and self.slots[zone_id] is not None
+
+    def __getitem__(self, zone: tuple[int, int]) -> Any:
+        zone_id = self.zone_id(zone)
+        value = self.slots[zone_id] if zone_id >= 0 else None
+        if value is None:
+            raise KeyError(zone)
+        return value
+
+    def get(self, zone: tuple[int, int], default: Any = None) -> Any:
+        zone_id = self.zone_id(zone)
+        if zone_id < 0:
+            return default
+        return self.get_id(zone_id, default)
+
+    def __setitem__(self, zone: tuple[int, int], value: Any) -> None:
+        zone_id = self.zone_id(zone)
+        if zone_id < 0:
+            raise KeyError(f"zone {zone} is outside the {self.cols}x{self.rows} grid")
+        if value is None:
+            raise ValueError("ZoneArrayMap cannot store None")
+        self.set_id(zone_id, value)
+
+    def __delitem__(self, zone: tuple[int, int]) -> None:
+        zone_id = self.zone_id(zone)
+        if zone_id < 0:
+            raise KeyError(zone)
+        self.del_id(zone_id)
+
+    def clear(self) -> None:
+        if self.sparse:
+            self.slots.clear()
+            return
+        for zone_id in self._order:
+            self.slots[zone_id] = None
+        self._order = []
+
+    def copy(self) -> ZoneArrayMap:
+        return self.like(self)
+
+    def __repr__(self) -> str:
+        return f"ZoneArrayMap({self.cols}x{self.rows}, {dict(self.items())!r})"
+
+
+def zone_history_map(partition, history: Mapping[tuple[int, int], Any] | None) -> ZoneArrayMap:
+    # Rebinds per-zone state kept by a component that is built before it sees a World (SUE,
+    # predictor): plain dicts and maps from another grid are re-keyed by (zx, zy).
+    if isinstance(history, ZoneArrayMap) and history.fits(partition):
+        return history
+    return ZoneArrayMap.for_partition(partition, items=history or None)
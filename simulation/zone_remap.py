@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class ZoneGrid:
+    width: float
+    height: float
+    cell_size: float
+    cols: int
+    rows: int
+
+    @classmethod
+    def of(cls, partition) -> ZoneGrid:
+        return cls(partition.width, partition.height, partition.cell_size, partition.cols, partition.rows)
+
+
+def _axis_shares(old_cell: float, old_count: int, new_cell: float, new_count: int, extent: float) -> list[list[tuple[int, float, float]]]:
+    # For every old cell on one axis: (new index, share of the old cell, share of the new cell).
+    shares: list[list[tuple[int, float, float]]] = []
+    for i in range(old_count):
+        a0 = i * old_cell
+        a1 = min(extent, a0 + old_cell)
+        row = []
+        for j in range(max(0, int(a0 // new_cell)), min(new_count - 1, int(a1 // new_cell)) + 1):
+            b0 = j * new_cell
+            b1 = min(extent, b0 + new_cell)
+            overlap = min(a1, b1) - max(a0, b0)
+            if overlap > 1e-9:
+                row.append((j, overlap / max(a1 - a0, 1e-9), overlap / max(b1 - b0, 1e-9)))
+        shares.append(row)
+    return shares
+
+
+class ZoneRemap:
+    # Area weights from one zone grid to another over the same map. Both grids are axis aligned,
+    # so an (old, new) weight is the product of one x and one y overlap; the two axis tables are
+    # built once and every zone-keyed structure is then moved in a single pass over its entries.
+
+    def __init__(self, old: ZoneGrid, new: ZoneGrid) -> None:
+        self.old = old
+        self.new = new
+        width = max(old.width, new.width)
+        height = max(old.height, new.height)
+        self._x = _axis_shares(old.cell_size, old.cols, new.cell_size, new.cols, width)
+        self._y = _axis_shares(old.cell_size, old.rows, new.cell_size, new.rows, height)
+
+    def _weights(self, zone: tuple[int, int]):
+        zx, zy = zone
+        if not (0 <= zx < self.old.cols and 0 <= zy < self.old.rows):
+            return
+        for nx, old_x, new_x in self._x[zx]:
+            for ny, old_y, new_y in self._y[zy]:
+                yield (nx, ny), old_x * old_y, new_x * new_y
+
+    def split(self, values: dict[tuple[int, int], float]) -> dict[tuple[int, int], float]:
+        # Totals (incident counts, accumulated risk): each old value is shared out by area.
+        moved: dict[tuple[int, int], float] = {}
+        for zone, value in values.items():
+            for target, share, _ in self._weights(zone):
+                moved[target] = moved.get(target, 0.0) + value * share
+        return moved
+
+    def average(self, values: dict[tuple[int, int], float]) -> dict[tuple[int, int], float]:
+        # Levels (base risk): area-weighted mean of the old zones under each new one.
+        sums: dict[tuple[int, int], float] = {}
+        areas: dict[tuple[int, int], float] = {}
+        for zone, value in values.items():
+            for target, _, coverage in self._weights(zone):
+                sums[target] = sums.get(target, 0.0) + value * coverage
+                areas[target] = areas.get(target, 0.0) + coverage
+        return {target: total / areas[target] for target, total in sums.items()}
+
+    def split_events(self, events: dict[tuple[int, int], list[tuple[int, float]]]) -> dict[tuple[int, int], list[tuple[int, float]]]:
+        # (tick, weight) histories: every event follows its zone's area, with the weight scaled.
+        moved: dict[tuple[int, int], list[tuple[int, float]]] = {}
+        for zone, history in events.items():
+            for target, share, _ in self._weights(zone):
+                moved.setdefault(target, []).extend((tick, weight * share) for tick, weight in history)
+        return moved
+
+    def zone(self, zone: tuple[int, int]) -> tuple[int, int]:
+        # Single-zone labels (home zones, incident tallies): the new zone under the old centre.
+        zx, zy = zone
+        x = min((zx + 0.5) * self.old.cell_size, self.new.width - 1e-6)
+        y = min((zy + 0.5) * self.old.cell_size, self.new.height - 1e-6)
+        return (
+            min(self.new.cols - 1, max(0, int(max(x, 0.0) // self.new.cell_size))),
+            min(self.new.rows - 1, max(0, int(max(y, 0.0) // self.new.cell_size))),
+        )
@@ -0,0 +1,218 @@
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from benchmark import _percentile
+from main import build_simulation
+from simulation.memory_report import current_rss_mb
+from simulation.rng_streams import RngStreams
+from simulation.scenario import PRESETS, STATION_LAYOUTS, TICKS_PER_HOUR, SurgeSource, generate_scenario, station_positions, write_crime_raster
+
+
+def build_soak(spec, raster_dir: str):
+    raster = None
+    if spec.hotspots_per_km2:
+        raster = str(write_crime_raster(spec, Path(raster_dir) / f"{spec.name}_crime.npy"))
+    config = spec.run_config(crime_raster=raster)
+    world, predictor, dispatcher, sue = build_simulation(config)
+    streams = RngStreams(spec.seed)
+    base, stations = station_positions(spec, streams.stream("scenario_stations"))
+    world.set_mechanic_base(*base)
+    world.set_gas_stations(stations)
+    source = SurgeSource(sue, spec.surges, streams.stream("scenario_surges"))
+    return world, predictor, dispatcher, source
+
+
+def backlog(world) -> dict:
+    active = world.active_incidents()
+    return {
+        "active_incidents": len(active),
+        "unmet_responders": sum(max(0, i.required_responders - len(i.assigned_patrol_ids)) for i in active),
+        "telemetry_pending": world.telemetry_bus.pending(),
+        "alerts_stored": len(world.alerts),
+        "alerts_overwritten": world.alerts.overwritten,
+        "incident_records": len(world.incidents),
+    }
+
+
+def surge_affected(surges, first_tick: int, last_tick: int, window_ticks: int) -> bool:
+    # A window overlaps a surge, or the window after it while its backlog drains.
+    return any(
+        surge.start_tick <= last_tick and surge.start_tick + surge.duration_ticks + window_ticks > first_tick
+        for surge in surges
+    )
+
+
+def soak(world, predictor, dispatcher, source, ticks: int, window_ticks: int, max_seconds: float) -> list[dict]:
+    windows: list[dict] = []
+    latencies: list[float] = []
+    first_tick = 1
+    run_start = time.perf_counter()
+    for tick in range(1, ticks + 1):
+        start = time.perf_counter()
+        world.step(tick, 1.0, predictor, dispatcher, sue=source)
+        latencies.append(time.perf_counter() - start)
+
+        out_of_time = time.perf_counter() - run_start > max_seconds
+        if tick % window_ticks == 0 or tick == ticks or out_of_time:
+            ordered = sorted(latencies)
+            row = {
+                "tick": tick,
+                "sim_hours": tick / TICKS_PER_HOUR,
+                "surge": surge_affected(source.surges, first_tick, tick, window_ticks),
+                "latency_ms_p50": _percentile(ordered, 0.50) * 1000.0,
+                "latency_ms_p90": _percentile(ordered, 0.90) * 1000.0,
+                "latency_ms_p99": _percentile(ordered, 0.99) * 1000.0,
+                "latency_ms_max": ordered[-1] * 1000.0,
+                "rss_mb": current_rss_mb(),
+                "incidents_total": world.metrics_engine.incidents_total,
+                **backlog(world),
+            }
+            windows.append(row)
+            latencies = []
+            first_tick = tick + 1
+            print(
+                f"t={tick:>7} ({row['sim_hours']:6.2f}h)  p50 {row['latency_ms_p50']:8.2f}ms  "
+                f"p99 {row['latency_ms_p99']:8.2f}ms  rss {row['rss_mb']:8.1f}MB  "
+                f"activos {row['active_incidents']:>5}  sin cubrir {row['unmet_responders']:>5}",
+                flush=True,
+            )
+        if out_of_time:
+            print(f"tope de {max_seconds:.0f}s alcanzado en el tick {tick}", file=sys.stderr)
+            break
+    return windows
+
+
+def _fit(rows: list[dict], name: str) -> dict | None:
+    # Least-squares fit against simulated hours, after the first window's allocation warm-up
+    # when there are enough windows to fit without it.
+    rows = rows[1:] if len(rows) >= 4 else rows
+    hours = np.array([row["sim_hours"] for row in rows])
+    if len(rows) < 3 or np.ptp(hours) == 0:
+        return None
+    design = np.column_stack((np.ones(len(rows)), hours))
+    coefficients = np.linalg.lstsq(design, np.array([float(row[name]) for row in rows]), rcond=None)[0]
+    slope = float(coefficients[1])
+    start = float(design[0] @ coefficients)
+    growth = slope * float(hours[-1] - hours[0])
+    return {
+        "windows": len(rows),
+        "slope_per_hour": slope,
+        "absolute_growth": growth,
+        "relative_growth": growth / start if start > 1e-9 else 0.0,
+    }
+
+
+def trends(windows: list[dict]) -> dict:
+    # Latency is fitted over the windows clear of surges only: a surge's backlog makes ticks
+    # slower without anything leaking.
+    calm = [row for row in windows if not row["surge"]]
+    result = {}
+    for name in ("latency_ms_p50", "latency_ms_p90"):
+        fit = _fit(calm, name)
+        if fit is not None:
+            result[name] = fit
+    for name in ("rss_mb", "active_incidents", "incident_records"):
+        fit = _fit(windows, name)
+        if fit is not None:
+            result[name] = fit
+    return result
+
+
+def failures(fits: dict, latency_growth: float, latency_growth_ms: float | None, rss_mb_per_hour: float) -> list[str]:
+    found = []
+    for name in ("latency_ms_p50", "latency_ms_p90"):
+        fit = fits.get(name)
+        if not fit:
+            continue
+        # The absolute limit only adds a way to fail; it never excuses relative growth.
+        if fit["relative_growth"] > latency_growth:
+            found.append(
+                f"{name} crece {fit['relative_growth']:.0%} ({fit['absolute_growth']:.2f} ms) en las ventanas sin picos "
+                f"(tope {latency_growth:.0%})"
+            )
+        elif latency_growth_ms is not None and fit["absolute_growth"] > latency_growth_ms:
+            found.append(
+                f"{name} crece {fit['absolute_growth']:.2f} ms ({fit['relative_growth']:.0%}) en las ventanas sin picos "
+                f"(tope {latency_growth_ms:.2f} ms)"
+            )
+    fit = fits.get("rss_mb")
+    if fit and fit["slope_per_hour"] > rss_mb_per_hour:
+        found.append(f"RSS crece {fit['slope_per_hour']:.1f} MB por hora simulada (tope {rss_mb_per_hour:.1f})")
+    return found
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Prueba de resistencia con escenarios sinteticos a gran escala")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="smoke")
+    parser.add_argument("--hours", type=float, default=None, help="horas simuladas (por defecto, las del preset)")
+    parser.add_argument("--fleet", type=int, default=None, help="cantidad de unidades (por defecto, la del preset)")
+    parser.add_argument("--mode", choices=["reactive", "intelligent"], default="intelligent")
+    parser.add_argument("--stations", choices=STATION_LAYOUTS, default="corners", help="disposicion de base y estaciones")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument(
+        "--window-ticks", type=int, default=None, help="ticks por ventana de medicion (por defecto, una hora o 1/12 de la corrida si es mas corta)"
+    )
+    parser.add_argument("--max-seconds", type=float, default=float("inf"), help="tope de tiempo real")
+    parser.add_argument("--latency-growth", type=float, default=0.5, help="crecimiento relativo de latencia tolerado")
+    parser.add_argument(
+        "--latency-growth-ms", type=float, default=None, help="tope adicional de crecimiento absoluto de latencia, en ms"
+    )
+    parser.add_argument("--rss-growth-mb", type=float, default=25.0, help="MB por hora simulada tolerados")
+    parser.add_argument("--output", type=str, default="soak_results.json")
+    args = parser.parse_args()
+
+    spec = generate_scenario(args.preset, args.seed, args.hours, args.fleet, args.mode, args.stations)
+    print(
+        f"escenario {spec.name}: {spec.width}x{spec.height} m, {spec.patrol_count} unidades, "
+        f"{spec.hours:g} h ({spec.ticks} ticks), {len(spec.surges)} picos",
+        flush=True,
+    )
+    with tempfile.TemporaryDirectory() as raster_dir:
+        build_start = time.perf_counter()
+        world, predictor, dispatcher, source = build_soak(spec, raster_dir)
+        build_seconds = time.perf_counter() - build_start
+        window_ticks = args.window_ticks or min(TICKS_PER_HOUR, spec.ticks // 12)
+        windows = soak(world, predictor, dispatcher, source, spec.ticks, max(1, window_ticks), args.max_seconds)
+
+    fits = trends(windows)
+    problems = failures(fits, args.latency_growth, args.latency_growth_ms, args.rss_growth_mb)
+    report = {
+        "scenario": {
+            "preset": spec.name,
+            "width": spec.width,
+            "height": spec.height,
+            "patrol_count": spec.patrol_count,
+            "hours": spec.hours,
+            "mode": spec.mode,
+            "seed": spec.seed,
+            "stations": spec.station_layout,
+            "surges": len(spec.surges),
+            "burst_incidents": source.burst_incidents,
+        },
+        "build_seconds": build_seconds,
+        "windows": windows,
+        "trends": fits,
+        "failures": problems,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    if "latency_ms_p50" not in fits:
+        # A run too short (or too full of surges) to fit a trend proves nothing; it must not pass
+        # as a clean soak.
+        print("FALLO: ventanas sin picos insuficientes para estimar tendencias (se necesitan al menos 4)", file=sys.stderr)
+        sys.exit(2)
+    if problems:
+        for problem in problems:
+            print(f"FALLO: {problem}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+import argparse
+import itertools
+import json
+import random
+import statistics
+from dataclasses import dataclass, field
+from multiprocessing import Pool, cpu_count
+
+from main import run_headless
+from result_cache import ResultCache
+from simulation.run_config import RunConfig
+from simulation.stats import mean_confidence_interval, t_quantile, welch_t
+
+
+def grid_space(space: dict[str, list]) -> list[dict]:
+    names = list(space.keys())
+    return [dict(zip(names, values)) for values in itertools.product(*(space[name] for name in names))]
+
+
+def random_space(space: dict[str, tuple[float, float]], samples: int, seed: int = 0) -> list[dict]:
+    rng = random.Random(seed)
+    return [{name: rng.uniform(low, high) for name, (low, high) in space.items()} for _ in range(samples)]
+
+
+def latin_hypercube_space(space: dict[str, tuple[float, float]], samples: int, seed: int = 0) -> list[dict]:
+    rng = random.Random(seed)
+    points: list[dict] = [{} for _ in range(samples)]
+    for name, (low, high) in space.items():
+        strata = list(range(samples))
+        rng.shuffle(strata)
+        for point, stratum in zip(points, strata):
+            u = (stratum + rng.random()) / samples
+            point[name] = low + u * (high - low)
+    return points
+
+
+@dataclass
+class Candidate:
+    index: int
+    params: dict
+    config: RunConfig
+    values: list[float] = field(default_factory=list)
+    active: bool = True
+    dropped_at_seeds: int | None = None
+
+    def mean(self) -> float:
+        return statistics.fmean(self.values) if self.values else float("nan")
+
+
+def _run_job(job):
+    index, config = job
+    return index, config.seed, run_headless(config)
+
+
+class SweepEngine:
+    def __init__(
+        self,
+        base_config: RunConfig,
+        points: list[dict],
+        kpi: str = "avg_response_time",
+        minimize: bool = True,
+        batch_seeds: int = 5,
+        min_seeds: int = 5,
+        max_seeds: int = 30,
+        alpha: float = 0.05,
+        workers: int | None = None,
+        cache: ResultCache | None = None,
+    ) -> None:
+        self.base_config = base_config
+        self.kpi = kpi
+        self.minimize = minimize
+        self.batch_seeds = max(1, batch_seeds)
+        self.min_seeds = max(3, min_seeds)
+        self.max_seeds = max(self.min_seeds, max_seeds)
+        self.alpha = alpha
+        self.workers = workers or max(1, cpu_count() - 1)
+        self.cache = cache
+        self.candidates = [
+            Candidate(index=index, params=params, config=base_config.with_params(params))
+            for index, params in enumerate(points)
+        ]
+        self.simulated_ticks = 0
+        self.cached_runs = 0
+        max_looks = max(1, -(-(self.max_seeds - self.min_seeds) // self.batch_seeds) + 1)
+        # Bonferroni over interim looks keeps the overall false-drop rate below alpha.
+        self.look_alpha = alpha / max_looks
+
+    def run(self) -> dict:
+        seeds_done = 0
+        with Pool(self.workers) as pool:
+            while seeds_done < self.max_seeds and self._active():
+                batch = min(self.batch_seeds, self.max_seeds - seeds_done)
+                seeds = [self.base_config.seed + seeds_done + offset for offset in range(batch)]
+                self._run_batch(pool, seeds)
+                seeds_done += batch
+                if seeds_done >= self.min_seeds:
+                    self._drop_worse(seeds_done)
+                if len(self._active()) <= 1:
+                    break
+        return self.report(seeds_done)
+
+    def _active(self) -> list[Candidate]:
+        return [candidate for candidate in self.candidates if candidate.active]
+
+    def _run_batch(self, pool, seeds: list[int]) -> None:
+        jobs = []
+        for candidate in self._active():
+            for seed in seeds:
+                config = candidate.config.with_params({"seed": seed})
+                cached = self.cache.get(config) if self.cache is not None else None
+                if cached is not None:
+                    candidate.values.append(cached[self.kpi])
+                    self.cached_runs += 1
+                else:
+                    jobs.append((candidate.index, config))
+
+        for index, seed, metrics in pool.imap_unordered(_run_job, jobs):
+            candidate = self.candidates[index]
+            candidate.values.append(metrics[self.kpi])
+            self.simulated_ticks += candidate.config.ticks
+            if self.cache is not None:
+                self.cache.put(candidate.config.with_params({"seed": seed}), metrics)
+
+    def _drop_worse(self, seeds_done: int) -> None:
+        active = self._active()
+        best = min(active, key=lambda c: c.mean()) if self.minimize else max(active, key=lambda c: c.mean())
+        for candidate in active:
+            if candidate is best:
+                continue
+            a, b = (candidate.values, best.values) if self.minimize else (best.values, candidate.values)
+            t_stat, df = welch_t(a, b)
+            critical = t_quantile(1.0 - self.look_alpha, df)
+            if t_stat > critical:
+                candidate.active = False
+                candidate.dropped_at_seeds = seeds_done
+
+    def report(self, seeds_done: int) -> dict:
+        ranked = sorted(self.candidates, key=lambda c: c.mean(), reverse=not self.minimize)
+        total_runs = sum(len(c.values) for c in self.candidates)
+        brute_force_ticks = len(self.candidates) * self.max_seeds * self.base_config.ticks
+        rows = []
+        for candidate in ranked:
+            mean, low, high = mean_confidence_interval(candidate.values)
+            rows.append(
+                {
+                    "params": candidate.params,
+                    "runs": len(candidate.values),
+                    "mean": mean,
+                    "ci95": [low, high],
+                    "active": candidate.active,
+                    "dropped_at_seeds": candidate.dropped_at_seeds,
+                }
+            )
+        return {
+            "kpi": self.kpi,
+            "minimize": self.minimize,
+            "seeds_used": seeds_done,
+            "total_runs": total_runs,
+            "cached_runs": self.cached_runs,
+            "simulated_ticks": self.simulated_ticks,
+            "brute_force_ticks": brute_force_ticks,
+            "candidates": rows,
+        }
+
+
+def _parse_number(text: str) -> int | float:
+    # Like json.load: integers stay int (patrol_count=8,16), anything with a point or exponent is float.
+    text = text.strip()
+    if "." in text or "e" in text.lower():
+        return float(text)
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+
+def _parse_inline_space(entries: list[str]) -> dict:
+    # name=v1,v2,v3 (grid) or name=low:high (random / lhs)
+    space: dict = {}
+    for entry in entries:
+        name, _, values = entry.partition("=")
+        if ":" in values:
+            low, high = values.split(":", 1)
+            space[name] = (_parse_number(low), _parse_number(high))
+        else:
+            space[name] = [_parse_number(v) for v in values.split(",")]
+    return space
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Barrido de parametros con parada temprana secuencial")
+    parser.add_argument("--space", type=str, default=None, help="JSON con {parametro: [valores]} o {parametro: [min, max]}")
+    parser.add_argument("--param", action="append", default=[], help="name=v1,v2 (grid) o name=min:max")
+    parser.add_argument("--design", choices=["grid", "random", "lhs"], default="grid")
+    parser.add_argument("--samples", type=int, default=16)
+    parser.add_argument("--mode", choices=["reactive", "intelligent"], default="intelligent")
+    parser.add_argument("--ticks", type=int, default=3600)
+    parser.add_argument("--kpi", type=str, default="avg_response_time")
+    parser.add_argument("--maximize", action="store_true")
+    parser.add_argument("--batch-seeds", type=int, default=5)
+    parser.add_argument("--min-seeds", type=int, default=5)
+    parser.add_argument("--max-seeds", type=int, default=30)
+    parser.add_argument("--alpha", type=float, default=0.05)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument("--output", type=str, default="sweep_results.json")
+    args = parser.parse_args()
+
+    space: dict = {}
+    if args.space:
+        with open(args.space, encoding="utf-8") as f:
+            space.update(json.load(f))
+    space.update(_parse_inline_space(args.param))
+    if not space:
+        parser.error("no parameter space given (--space / --param)")
+
+    if args.design == "grid":
+        points = grid_space(space)
+    elif args.design == "random":
+        points = random_space({k: tuple(v) for k, v in space.items()}, args.samples, args.seed)
+    else:
+        points = latin_hypercube_space({k: tuple(v) for k, v in space.items()}, args.samples, args.seed)
+
+    engine = SweepEngine(
+        RunConfig(mode=args.mode, seed=args.seed, ticks=args.ticks),
+        points,
+        kpi=args.kpi,
+        minimize=not args.maximize,
+        batch_seeds=args.batch_seeds,
+        min_seeds=args.min_seeds,
+        max_seeds=args.max_seeds,
+        alpha=args.alpha,
+        workers=args.workers,
+        cache=None if args.no_cache else ResultCache(),
+    )
+    report = engine.run()
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"{len(points)} configuraciones, {report['total_runs']} corridas ({report['cached_runs']} en cache)")
+    print(f"ticks simulados: {report['simulated_ticks']} / fuerza bruta: {report['brute_force_ticks']}")
+    for row in report["candidates"][:5]:
+        print(f"{row['mean']:.3f} [{row['ci95'][0]:.3f}, {row['ci95'][1]:.3f}] n={row['runs']} {row['params']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,42 @@
 ﻿from dataclasses import dataclass
 import pygame
 
+from ui.time_warp import SPEEDS
+
 
 @dataclass
 class ControlState:
     paused: bool = False
+    speed: float = 1.0
+    # "run until": a target tick typed after G, or the next incident surge (N).
+    target_tick: int | None = None
+    skip_to_surge: bool = False
+    tick_input: str | None = None
+    # Replay only: relative scrub requested since the last frame.
+    seek_offset: int = 0
+
+    @property
+    def skipping(self) -> bool:
+        return self.target_tick is not None or self.skip_to_surge
+
+    def faster(self) -> None:
+        self.speed = next((speed for speed in SPEEDS if speed > self.speed), SPEEDS[-1])
+
+    def slower(self) -> None:
+        self.speed = next((speed for speed in reversed(SPEEDS) if speed < self.speed), SPEEDS[0])
+
+    def cancel_skip(self) -> None:
+        self.target_tick = None
+        self.skip_to_surge = False
+
+    def skip_label(self) -> str | None:
+        if self.tick_input is not None:
+            return f"Ir a tick: {self.tick_input}_"
+        if self.target_tick is not None:
+            return f"Avanzando a tick {self.target_tick}"
+        if self.skip_to_surge:
+            return "Avanzando al siguiente pico"
+        return None
 
 
 class Controls:
@@ -14,9 +46,59 @@ class Controls:
                 return False
 
             if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_SPACE:
-                    control_state.paused = not control_state.paused
-                elif event.key == pygame.K_r:
-                    world.recalculate_zones()
+                if control_state.tick_input is not None:
+                    self._process_tick_input(event, control_state)
+                else:
+                    self._process_key(event, world, control_state)
 
         return True
+
+    def _process_key(self, event, world, control_state: ControlState) -> None:
+        if event.key == pygame.K_SPACE:
+            control_state.paused = not control_state.paused
+        elif event.key == pygame.K_r:
+            world.recalculate_zones()
+        elif event.key in (pygame.K_UP, pygame.K_PLUS, pygame.K_EQUALS, pygame.K_KP_PLUS):
+            control_state.faster()
+        elif event.key in (pygame.K_DOWN, pygame.K_MINUS, pygame.K_KP_MINUS):
+            control_state.slower()
+        elif event.key == pygame.K_g:
+            control_state.tick_input = ""
+        elif event.key == pygame.K_n:
+            control_state.cancel_skip()
+            control_state.skip_to_surge = True
+        elif event.key == pygame.K_ESCAPE:
+            control_state.cancel_skip()
+
+    def _process_tick_input(self, event, control_state: ControlState) -> None:
+        if event.key in (pygame.K_RETURN, pygame.K_KP_ENTER):
+            if control_state.tick_input:
+                control_state.cancel_skip()
+                control_state.target_tick = int(control_state.tick_input)
+            control_state.tick_input = None
+        elif event.key == pygame.K_ESCAPE:
+            control_state.tick_input = None
+        elif event.key == pygame.K_BACKSPACE:
+            control_state.tick_input = control_state.tick_input[:-1]
+        elif event.unicode.isdigit() and len(control_state.tick_input) < 9:
+            control_state.tick_input += event.unicode
+
+
+class ReplayControls(Controls):
+    # Left/Right: +-10 ticks, PageUp/PageDown: +-600, Home/End: start/end. No zone recalculation.
+    SEEK_KEYS = {
+        pygame.K_LEFT: -10,
+        pygame.K_RIGHT: 10,
+        pygame.K_PAGEDOWN: -600,
+        pygame.K_PAGEUP: 600,
+    }
+
+    def _process_key(self, event, world, control_state: ControlState) -> None:
+        if event.key in self.SEEK_KEYS:
+            control_state.seek_offset += self.SEEK_KEYS[event.key]
+        elif event.key == pygame.K_HOME:
+            control_state.target_tick = 0
+        elif event.key == pygame.K_END:
+            control_state.target_tick = world.last_tick
+        elif event.key not in (pygame.K_r, pygame.K_n):
+            super()._process_key(event, world, control_state)
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import numpy as np
 import pygame
 
 from simulation.patrol import PatrolState
@@ -11,6 +12,8 @@ class Renderer:
     TEXT = (220, 226, 232)
     SERVICE_ZONE = (80, 170, 250)
     GAS_STATION = (255, 215, 90)
+    COVERAGE = (80, 120, 165)
+    ROAD = (58, 64, 78)
 
     STATE_COLOR = {
         PatrolState.IDLE: (95, 220, 135),
@@ -28,71 +31,165 @@ class Renderer:
     def __init__(self, screen: pygame.Surface, font: pygame.font.Font):
         self.screen = screen
         self.font = font
+        # Grid, bases and their labels only change with the layout (see World.layout_version).
+        self._static_layer: pygame.Surface | None = None
+        self._static_key = None
+        self._heatmap: pygame.Surface | None = None
+        self._heatmap_key = None
+        self._text_cache: dict[str, tuple[str, pygame.Surface]] = {}
+        self._coverage_sprites: dict[int, pygame.Surface] = {}
+        self._patrol_sprites: dict[tuple[int, int, int], pygame.Surface] = {}
+        self._frame_key = None
+
+    def invalidate(self) -> None:
+        # Forces the next draw(), e.g. when positions are interpolated between ticks.
+        self._frame_key = None
+
+    def draw(self, world, tick: int, paused: bool, status: str = "") -> list[pygame.Rect]:
+        # Returns the dirty rects for pygame.display.update(); empty when nothing changed.
+        frame_key = (tick, paused, world.layout_version, status)
+        if frame_key == self._frame_key:
+            return []
+        self._frame_key = frame_key
 
-    def draw(self, world, tick: int, paused: bool) -> None:
         self.screen.fill(self.BG)
-        self._draw_zones(world)
-        self._draw_service_zone(world)
+        self._draw_zones(world, tick)
         self._draw_incidents(world)
         self._draw_patrols(world)
-        self._draw_hud(world, tick, paused)
+        self._draw_hud(world, tick, paused, status)
+        return [self.screen.get_rect()]
+
+    def _draw_zones(self, world, tick: int) -> None:
+        heatmap = self._risk_heatmap(world, tick)
+        if heatmap is not None:
+            self.screen.blit(heatmap, (0, 0))
+        self.screen.blit(self._static(world), (0, 0))
+
+    def _static(self, world) -> pygame.Surface:
+        key = (world.layout_version, self.screen.get_size())
+        if self._static_layer is None or key != self._static_key:
+            self._static_layer = self._build_static_layer(world)
+            self._static_key = key
+        return self._static_layer
+
+    def _build_static_layer(self, world) -> pygame.Surface:
+        layer = pygame.Surface(self.screen.get_size()).convert()
+        layer.fill(self.BG)
+        layer.set_colorkey(self.BG)
 
-    def _draw_zones(self, world) -> None:
         cell = int(max(6, world.partition.cell_size))
-
-        for zone, risk in world.risk_map.items():
-            x0, y0, x1, y1 = world.partition.zone_bounds(zone)
-            intensity = min(215, int(risk * 50))
-            red = min(255, 40 + intensity)
-            color = (red, 30, 30)
-            rect = pygame.Rect(int(x0), int(y0), int(x1 - x0), int(y1 - y0))
-            pygame.draw.rect(self.screen, color, rect)
-
         for col in range(world.partition.cols + 1):
             x = int(col * cell)
-            pygame.draw.line(self.screen, self.GRID, (x, 0), (x, int(world.height)), 1)
+            pygame.draw.line(layer, self.GRID, (x, 0), (x, int(world.height)), 1)
         for row in range(world.partition.rows + 1):
             y = int(row * cell)
-            pygame.draw.line(self.screen, self.GRID, (0, y), (int(world.width), y), 1)
-
-    def _draw_service_zone(self, world) -> None:
+            pygame.draw.line(layer, self.GRID, (0, y), (int(world.width), y), 1)
+
+        road_network = getattr(world, "road_network", None)
+        if road_network is not None:
+            nodes = road_network.nodes
+            for u, v in road_network.edges():
+                pygame.draw.line(layer, self.ROAD, nodes[u], nodes[v], 2)
+
+        self._draw_service_zone(layer, world)
+        return layer
+
+    def _risk_heatmap(self, world, tick: int) -> pygame.Surface | None:
+        if not world.risk_map:
+            return None
+        key = (tick, world.layout_version, id(world.risk_map))
+        if self._heatmap is not None and key == self._heatmap_key:
+            return self._heatmap
+
+        cols, rows = world.partition.cols, world.partition.rows
+        pixels = np.empty((cols, rows, 3), dtype=np.uint8)
+        pixels[:, :] = self.BG
+        zones = [zone for zone in world.risk_map if world.partition.valid_zone(zone)]
+        if zones:
+            xs = np.fromiter((zone[0] for zone in zones), dtype=np.intp, count=len(zones))
+            ys = np.fromiter((zone[1] for zone in zones), dtype=np.intp, count=len(zones))
+            risks = np.fromiter((world.risk_map[zone] for zone in zones), dtype=np.float64, count=len(zones))
+            intensity = np.minimum(215, (risks * 50).astype(np.int64))
+            pixels[xs, ys, 0] = np.minimum(255, 40 + intensity)
+            pixels[xs, ys, 1] = 30
+            pixels[xs, ys, 2] = 30
+
+        # One surfarray image per tick, scaled in a single blit instead of one rect per zone.
+        small = pygame.surfarray.make_surface(pixels)
+        size = (int(round(cols * world.partition.cell_size)), int(round(rows * world.partition.cell_size)))
+        self._heatmap = pygame.transform.scale(small, size)
+        self._heatmap_key = key
+        return self._heatmap
+
+    def _draw_service_zone(self, surface: pygame.Surface, world) -> None:
         mx, my = world.mechanic_base
-        pygame.draw.circle(self.screen, self.SERVICE_ZONE, (int(mx), int(my)), 13, width=2)
+        pygame.draw.circle(surface, self.SERVICE_ZONE, (int(mx), int(my)), 13, width=2)
         label = self.font.render("MECANICO", True, self.SERVICE_ZONE)
-        self.screen.blit(label, (int(mx) + 14, int(my) - 8))
+        surface.blit(label, (int(mx) + 14, int(my) - 8))
 
         for idx, (gx, gy) in enumerate(world.gas_stations, start=1):
-            pygame.draw.rect(self.screen, self.GAS_STATION, pygame.Rect(int(gx) - 7, int(gy) - 7, 14, 14), width=2)
+            pygame.draw.rect(surface, self.GAS_STATION, pygame.Rect(int(gx) - 7, int(gy) - 7, 14, 14), width=2)
             glabel = self.font.render(f"GAS {idx}", True, self.GAS_STATION)
-            self.screen.blit(glabel, (int(gx) + 10, int(gy) - 8))
+            surface.blit(glabel, (int(gx) + 10, int(gy) - 8))
+
+    def _coverage_sprite(self, radius: int) -> pygame.Surface:
+        sprite = self._coverage_sprites.get(radius)
+        if sprite is None:
+            size = radius * 2 + 2
+            sprite = pygame.Surface((size, size)).convert()
+            sprite.fill(self.BG)
+            sprite.set_colorkey(self.BG)
+            pygame.draw.circle(sprite, self.COVERAGE, (radius + 1, radius + 1), radius, width=1)
+            self._coverage_sprites[radius] = sprite
+        return sprite
+
+    def _patrol_sprite(self, color: tuple[int, int, int]) -> pygame.Surface:
+        sprite = self._patrol_sprites.get(color)
+        if sprite is None:
+            sprite = pygame.Surface((16, 16)).convert()
+            sprite.fill(self.BG)
+            sprite.set_colorkey(self.BG)
+            pygame.draw.circle(sprite, color, (8, 8), 7)
+            self._patrol_sprites[color] = sprite
+        return sprite
 
     def _draw_patrols(self, world) -> None:
+        blit = self.screen.blit
         for patrol in world.patrols:
             color = self.STATE_COLOR.get(patrol.state, self.STATE_COLOR[PatrolState.OUT_OF_SERVICE])
-            pygame.draw.circle(
-                self.screen,
-                (80, 120, 165),
-                (int(patrol.x), int(patrol.y)),
-                int(patrol.coverage_radius),
-                width=1,
-            )
-            pygame.draw.circle(self.screen, color, (int(patrol.x), int(patrol.y)), 7)
+            px, py = int(patrol.x), int(patrol.y)
+            radius = int(patrol.coverage_radius)
+            if radius > 0:
+                blit(self._coverage_sprite(radius), (px - radius - 1, py - radius - 1))
+            blit(self._patrol_sprite(color), (px - 8, py - 8))
 
     def _draw_incidents(self, world) -> None:
         for incident in world.active_incidents():
             radius = 7 + incident.required_responders
             pygame.draw.circle(self.screen, self.INCIDENT, (int(incident.x), int(incident.y)), radius, width=2)
 
-    def _draw_hud(self, world, tick: int, paused: bool) -> None:
+    def _text(self, slot: str, text: str) -> pygame.Surface:
+        # HUD surfaces are re-rendered only when their text changes.
+        cached = self._text_cache.get(slot)
+        if cached is not None and cached[0] == text:
+            return cached[1]
+        surface = self.font.render(text, True, self.TEXT)
+        self._text_cache[slot] = (text, surface)
+        return surface
+
+    def _draw_hud(self, world, tick: int, paused: bool, status: str) -> None:
         text = (
             f"Tick: {tick} | Patrols: {len(world.patrols)} | "
             f"Active incidents: {len(world.active_incidents())} | "
             f"Zone cell: {world.partition.cell_size:.1f} | "
             f"{'PAUSED' if paused else 'RUNNING'}"
         )
-        surface = self.font.render(text, True, self.TEXT)
-        self.screen.blit(surface, (10, 10))
+        if status:
+            text += f" | {status}"
+        self.screen.blit(self._text("status", text), (10, 10))
 
         help_text = "Incidentes: SUE automatico | Space: pausa | R: recalcular zonas"
-        help_surface = self.font.render(help_text, True, self.TEXT)
-        self.screen.blit(help_surface, (10, 34))
+        self.screen.blit(self._text("help", help_text), (10, 34))
+
+        warp_text = "+/-: velocidad | G: ir a tick | N: siguiente pico | Esc: cancelar"
+        self.screen.blit(self._text("warp", warp_text), (10, 58))
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import time
+
+BASE_TICKS_PER_SECOND = 10.0
+SPEEDS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+
+class SurgeDetector:
+    # A surge is a tick whose active-incident count jumps well above its recent average.
+
+    def __init__(self, ratio: float = 1.5, minimum: int = 4, smoothing: float = 0.02) -> None:
+        self.ratio = ratio
+        self.minimum = minimum
+        self.smoothing = smoothing
+        self.baseline: float | None = None
+
+    def update(self, active_incidents: int) -> bool:
+        if self.baseline is None:
+            self.baseline = float(active_incidents)
+            return False
+        surge = active_incidents >= max(self.minimum, self.ratio * self.baseline)
+        self.baseline += self.smoothing * (active_incidents - self.baseline)
+        return surge
+
+
+class TimeWarp:
+    # Paces world.step against wall time at `speed` x BASE_TICKS_PER_SECOND.
+    # If the simulation cannot keep up, the owed backlog is dropped instead of spiralling,
+    # renders are spaced out to free time for ticks, and `achieved_speed` reports the real rate.
+
+    def __init__(self, fps: int = 60, max_render_interval: float = 0.25) -> None:
+        self.frame_period = 1.0 / fps
+        self.max_render_interval = max_render_interval
+        self.render_interval = self.frame_period
+        self.accumulator = 0.0
+        self.achieved_speed: float | None = None
+        self.lagging = False
+        self._last_render = 0.0
+        self._window_start = time.perf_counter()
+        self._window_ticks = 0
+
+    def ticks_due(self, frame_dt: float, speed: float, paused: bool) -> int:
+        if paused:
+            self.accumulator = 0.0
+            self.achieved_speed = None
+            self._window_start = time.perf_counter()
+            self._window_ticks = 0
+            return 0
+        self.accumulator += frame_dt * BASE_TICKS_PER_SECOND * speed
+        due = int(self.accumulator)
+        self.accumulator -= due
+        return due
+
+    def sim_budget(self, now: float) -> float:
+        # Frames that will not be drawn give their whole slot to the simulation.
+        if self.should_render(now):
+            return self.frame_period * 0.75
+        return self.frame_period
+
+    def finish(self, due: int, ran: int) -> None:
+        self.lagging = ran < due
+        if self.lagging:
+            self.accumulator = 0.0
+            self.render_interval = min(self.max_render_interval, self.render_interval * 1.5)
+        else:
+            self.render_interval = max(self.frame_period, self.render_interval * 0.8)
+        self.count(ran)
+
+    def count(self, ticks: int) -> None:
+        self._window_ticks += ticks
+        now = time.perf_counter()
+        elapsed = now - self._window_start
+        if elapsed >= 0.5:
+            self.achieved_speed = self._window_ticks / (elapsed * BASE_TICKS_PER_SECOND)
+            self._window_start = now
+            self._window_ticks = 0
+
+    def should_render(self, now: float) -> bool:
+        return now - self._last_render >= self.render_interval - 1e-3
+
+    def rendered(self, now: float) -> None:
+        self._last_render = now
+
+
+def speed_status(speed: float, achieved: float | None, paused: bool, skip: str | None = None) -> str:
+    if skip:
+        return skip if achieved is None else f"{skip} (x{achieved:.0f})"
+    if paused or achieved is None:
+        return f"x{speed:g}"
+    # Mostramos la velocidad real cuando la simulacion no alcanza la pedida.
+    if achieved < speed * 0.9:
+        return f"x{speed:g} (real x{achieved:.1f})"
+    return f"x{speed:g}"